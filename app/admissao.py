@@ -0,0 +1,30 @@
+"""Controle de admissão pelo pool de conexões.
+
+A vaga de uma requisição é a conexão que ela retira do pool, e só enquanto a
+usa: respostas do cache, streams e uploads que ainda não chegaram ao banco não
+ocupam vaga. Com o pool esgotado, a requisição espera até POOL_TIMEOUT_SEGUNDOS
+e então recebe 503 com Retry-After.
+"""
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from app import config
+from app.metricas import requisicoes_rejeitadas
+
+ERRO_SOBRECARGA = "Servidor sobrecarregado; tente novamente em instantes."
+
+
+def _cabecalhos_retry() -> dict:
+    return {"Retry-After": str(config.ADMISSAO_RETRY_AFTER_SEGUNDOS)}
+
+
+def erro_pool_esgotado() -> HTTPException:
+    """503 para quando nenhuma conexão do pool ficou livre em POOL_TIMEOUT_SEGUNDOS."""
+    requisicoes_rejeitadas.incrementar(motivo="pool")
+    return HTTPException(status_code=503, detail=ERRO_SOBRECARGA, headers=_cabecalhos_retry())
+
+
+async def pool_esgotado(request: Request, erro: Exception) -> JSONResponse:
+    """Handler de sqlalchemy.exc.TimeoutError não tratado pelas rotas."""
+    excecao = erro_pool_esgotado()
+    return JSONResponse({"detail": excecao.detail}, status_code=excecao.status_code, headers=excecao.headers)
@@ -0,0 +1,144 @@
+from collections import defaultdict
+from datetime import date, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app import config, models, schemas
+
+Intervalo = Tuple[int, int]
+
+
+def minutos(horario: time) -> int:
+    return horario.hour * 60 + horario.minute
+
+
+def horario(minuto: int) -> time:
+    minuto = min(minuto, 24 * 60 - 1)
+    return time(minuto // 60, minuto % 60)
+
+
+ABERTURA = minutos(time.fromisoformat(config.AGENDA_ABERTURA))
+FECHAMENTO = minutos(time.fromisoformat(config.AGENDA_FECHAMENTO))
+
+
+def mesclar(intervalos: List[Intervalo]) -> List[Intervalo]:
+    """Une intervalos já ordenados pelo início em uma única passada."""
+    mesclados: List[Intervalo] = []
+    for inicio, fim in intervalos:
+        if mesclados and inicio <= mesclados[-1][1]:
+            if fim > mesclados[-1][1]:
+                mesclados[-1] = (mesclados[-1][0], fim)
+        else:
+            mesclados.append((inicio, fim))
+    return mesclados
+
+
+def livres(ocupados: List[Intervalo], abertura: int = ABERTURA, fechamento: int = FECHAMENTO) -> List[Intervalo]:
+    """Complemento dos intervalos ocupados (mesclados) dentro do horário de funcionamento."""
+    resultado = []
+    cursor = abertura
+    for inicio, fim in ocupados:
+        if inicio > cursor:
+            resultado.append((cursor, min(inicio, fechamento)))
+        cursor = max(cursor, fim)
+        if cursor >= fechamento:
+            break
+    if cursor < fechamento:
+        resultado.append((cursor, fechamento))
+    return [(inicio, fim) for inicio, fim in resultado if fim > inicio]
+
+
+def mascara(ocupados: List[Intervalo], granularidade: int, abertura: int = ABERTURA, fechamento: int = FECHAMENTO) -> int:
+    """Ocupação do dia como inteiro: o bit i indica que a faixa i (de `granularidade` minutos) tem reserva."""
+    faixas = quantidade_faixas(granularidade, abertura, fechamento)
+    resultado = 0
+    for inicio, fim in ocupados:
+        primeira = max(0, (inicio - abertura) // granularidade)
+        ultima = min(faixas, -(-(fim - abertura) // granularidade))
+        if ultima > primeira:
+            resultado |= (1 << ultima) - (1 << primeira)
+    return resultado
+
+
+def quantidade_faixas(granularidade: int, abertura: int = ABERTURA, fechamento: int = FECHAMENTO) -> int:
+    return -(-(fechamento - abertura) // granularidade)
+
+
+def bitmap_texto(valor: int, faixas: int) -> str:
+    """Bitmap em texto, uma posição por faixa a partir da abertura ('1' = ocupada)."""
+    return format(valor, f"0{faixas}b")[::-1] if faixas else ""
+
+
+def validar_periodo(inicio: date, fim: date):
+    if fim < inicio:
+        raise HTTPException(status_code=400, detail="Erro: A data final deve ser igual ou posterior à inicial.")
+    if (fim - inicio).days + 1 > config.AGENDA_MAX_DIAS:
+        raise HTTPException(status_code=400, detail=f"Erro: O período máximo da agenda é de {config.AGENDA_MAX_DIAS} dias.")
+
+
+def ocupacao(db: Session, sala_ids: List[int], inicio: date, fim: date) -> Dict[int, Dict[date, List[Intervalo]]]:
+    """Reservas das salas no período com uma única consulta ordenada, já mescladas por sala e dia."""
+    linhas = db.query(
+        models.Reservas.sala_id, models.Reservas.data_reserva, models.Reservas.hora_inicio, models.Reservas.hora_fim
+    ).filter(
+        models.Reservas.sala_id.in_(sala_ids),
+        models.Reservas.data_reserva >= inicio,
+        models.Reservas.data_reserva <= fim
+    ).order_by(models.Reservas.sala_id, models.Reservas.data_reserva, models.Reservas.hora_inicio).all()
+
+    por_sala: Dict[int, Dict[date, List[Intervalo]]] = defaultdict(lambda: defaultdict(list))
+    for sala_id, data_reserva, hora_inicio, hora_fim in linhas:
+        por_sala[sala_id][data_reserva].append((minutos(hora_inicio), minutos(hora_fim)))
+    return {
+        sala_id: {data_reserva: mesclar(intervalos) for data_reserva, intervalos in dias.items()}
+        for sala_id, dias in por_sala.items()
+    }
+
+
+def _intervalos(lista: List[Intervalo]) -> List[schemas.IntervaloAgenda]:
+    return [schemas.IntervaloAgenda(inicio=horario(inicio), fim=horario(fim)) for inicio, fim in lista]
+
+
+def montar_agenda(sala_id: int, dias_ocupados: Dict[date, List[Intervalo]], inicio: date, fim: date,
+                  granularidade: Optional[int]) -> schemas.AgendaSala:
+    """Intervalos livres/ocupados de cada dia ou, com `granularidade`, o bitmap de ocupação do dia."""
+    faixas = quantidade_faixas(granularidade) if granularidade else 0
+    dias = []
+    data_atual = inicio
+    while data_atual <= fim:
+        ocupados = dias_ocupados.get(data_atual, [])
+        if granularidade:
+            dias.append(schemas.DiaAgenda(data=data_atual, bitmap=bitmap_texto(mascara(ocupados, granularidade), faixas)))
+        else:
+            dias.append(schemas.DiaAgenda(data=data_atual, ocupados=_intervalos(ocupados), livres=_intervalos(livres(ocupados))))
+        data_atual += timedelta(days=1)
+    return schemas.AgendaSala(sala_id=sala_id, dias=dias)
+
+
+def contar_por_faixa(mascaras: List[int], faixas: int) -> List[int]:
+    """Quantas máscaras têm cada bit ligado: a ocupação do bloco faixa a faixa."""
+    return [sum((valor >> faixa) & 1 for valor in mascaras if valor) for faixa in range(faixas)]
+
+
+def montar_agenda_bloco(bloco_id: int, sala_ids: List[int], ocupados: Dict[int, Dict[date, List[Intervalo]]],
+                        inicio: date, fim: date, granularidade: int) -> schemas.AgendaBloco:
+    """Grade salas x dias x faixas do bloco, com o total de salas ocupadas por faixa em cada dia."""
+    faixas = quantidade_faixas(granularidade)
+    dias_sala: Dict[int, List[schemas.DiaAgenda]] = {sala_id: [] for sala_id in sala_ids}
+    ocupacao = []
+    data_atual = inicio
+    while data_atual <= fim:
+        mascaras = []
+        for sala_id in sala_ids:
+            valor = mascara(ocupados.get(sala_id, {}).get(data_atual, []), granularidade)
+            mascaras.append(valor)
+            dias_sala[sala_id].append(schemas.DiaAgenda(data=data_atual, bitmap=bitmap_texto(valor, faixas)))
+        ocupacao.append(schemas.OcupacaoDia(data=data_atual, salas_ocupadas=contar_por_faixa(mascaras, faixas)))
+        data_atual += timedelta(days=1)
+    return schemas.AgendaBloco(
+        bloco_id=bloco_id, abertura=horario(ABERTURA), fechamento=horario(FECHAMENTO), granularidade=granularidade,
+        salas=[schemas.AgendaSala(sala_id=sala_id, dias=dias) for sala_id, dias in dias_sala.items()],
+        ocupacao=ocupacao
+    )
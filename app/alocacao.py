@@ -0,0 +1,255 @@
+"""Alocação de salas em lote para o planejamento do semestre (POST /reservas/alocar).
+
+Cada demanda é uma recorrência, como em `/reservas/recorrentes`, mas sem sala: traz
+a capacidade mínima, os recursos exigidos e, opcionalmente, o bloco. As demandas
+formam um grafo de intervalos (duas conflitam se têm uma data em comum e horários
+sobrepostos) e alocar é colori-lo usando como cores as salas elegíveis de cada uma:
+
+1. em ordem de horário de início, a ordem em que a coloração gulosa de intervalos é
+   ótima, cada demanda recebe a sala livre de menor capacidade suficiente;
+2. cada demanda que sobrou busca um caminho aumentante curto, como em um
+   emparelhamento: uma sala bloqueada por uma única demanda já alocada é liberada
+   se essa demanda couber em outra sala.
+
+As reservas existentes são carregadas de uma vez e nunca são movidas.
+"""
+import uuid
+from collections import defaultdict
+from datetime import date, time
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import agenda, config, crud, eventos, models, ocupacao, recursos, schemas
+
+Chave = Tuple[int, date]
+
+
+def mascara(hora_inicio: time, hora_fim: time) -> int:
+    """Minutos do dia ocupados por [hora_inicio, hora_fim) como bits de um inteiro (segundos arredondam para fora)."""
+    fim = agenda.minutos(hora_fim) + bool(hora_fim.second or hora_fim.microsecond)
+    return (1 << fim) - (1 << agenda.minutos(hora_inicio))
+
+
+class Demanda:
+    def __init__(self, indice: int, dados: schemas.DemandaAlocacao, datas: List[date], candidatas: List[int]):
+        self.indice = indice
+        self.dados = dados
+        self.datas = datas
+        self.candidatas = candidatas
+        self.mascara = mascara(dados.hora_inicio, dados.hora_fim)
+        self.sala_id: Optional[int] = None
+
+
+class Alocador:
+    """Ocupação de cada (sala, data) como máscara de minutos: testar um horário é um AND por data."""
+
+    def __init__(self, demandas: List[Demanda], existentes: Dict[Chave, int]):
+        self.demandas = demandas
+        self._existentes = existentes
+        self._ocupado = dict(existentes)
+        self._alocadas: Dict[Chave, List[Demanda]] = defaultdict(list)
+
+    def livre(self, demanda: Demanda, sala_id: int) -> bool:
+        ocupado = self._ocupado
+        bits = demanda.mascara
+        for data in demanda.datas:
+            if ocupado.get((sala_id, data), 0) & bits:
+                return False
+        return True
+
+    def _marcar(self, demanda: Demanda, sala_id: int):
+        demanda.sala_id = sala_id
+        for data in demanda.datas:
+            chave = (sala_id, data)
+            self._ocupado[chave] = self._ocupado.get(chave, 0) | demanda.mascara
+            self._alocadas[chave].append(demanda)
+
+    def _desmarcar(self, demanda: Demanda):
+        for data in demanda.datas:
+            chave = (demanda.sala_id, data)
+            restantes = self._alocadas[chave]
+            restantes.remove(demanda)
+            ocupado = self._existentes.get(chave, 0)
+            for outra in restantes:
+                ocupado |= outra.mascara
+            self._ocupado[chave] = ocupado
+        demanda.sala_id = None
+
+    def _bloqueantes(self, demanda: Demanda, sala_id: int) -> Optional[Set[Demanda]]:
+        """Demandas alocadas na sala que impedem `demanda`; None se uma reserva existente a impede."""
+        existentes, bits = self._existentes, demanda.mascara
+        if any(existentes.get((sala_id, data), 0) & bits for data in demanda.datas):
+            return None
+        bloqueantes = set()
+        for data in demanda.datas:
+            bloqueantes.update(outra for outra in self._alocadas.get((sala_id, data), ()) if outra.mascara & bits)
+        return bloqueantes
+
+    def _aumentar(self, demanda: Demanda) -> bool:
+        for sala_id in demanda.candidatas:
+            bloqueantes = self._bloqueantes(demanda, sala_id)
+            if bloqueantes is None or len(bloqueantes) != 1:
+                continue
+            outra = bloqueantes.pop()
+            for destino in outra.candidatas:
+                if destino != sala_id and self.livre(outra, destino):
+                    self._desmarcar(outra)
+                    self._marcar(outra, destino)
+                    self._marcar(demanda, sala_id)
+                    return True
+        return False
+
+    def resolver(self):
+        ordem = sorted(self.demandas, key=lambda demanda: (demanda.dados.hora_inicio, demanda.dados.hora_fim, demanda.indice))
+        pendentes = []
+        for demanda in ordem:
+            sala_id = next((sala_id for sala_id in demanda.candidatas if self.livre(demanda, sala_id)), None)
+            if sala_id is None:
+                pendentes.append(demanda)
+            else:
+                self._marcar(demanda, sala_id)
+        for demanda in pendentes:
+            self._aumentar(demanda)
+
+
+def _etiquetas(pedidas: List[str]) -> Tuple[str, ...]:
+    return tuple(sorted({etiqueta for texto in pedidas for etiqueta in recursos.normalizar(texto)}))
+
+
+def _ocupacao_existente(db: Session, demandas: List[Demanda]) -> Dict[Chave, int]:
+    """Reservas já gravadas nas salas candidatas, no período e na faixa de horário das demandas, em uma consulta."""
+    if not demandas:
+        return {}
+    salas = {sala_id for demanda in demandas for sala_id in demanda.candidatas}
+    # Direto na conexão: são muitas linhas e nenhuma precisa virar entidade ORM.
+    linhas = db.connection().execute(select(
+        models.Reservas.sala_id, models.Reservas.data_reserva, models.Reservas.hora_inicio, models.Reservas.hora_fim
+    ).where(
+        models.Reservas.sala_id.in_(salas),
+        models.Reservas.data_reserva.between(min(demanda.datas[0] for demanda in demandas),
+                                             max(demanda.datas[-1] for demanda in demandas)),
+        models.Reservas.hora_inicio < max(demanda.dados.hora_fim for demanda in demandas),
+        models.Reservas.hora_fim > min(demanda.dados.hora_inicio for demanda in demandas)
+    ))
+    ocupado: Dict[Chave, int] = {}
+    mascaras: Dict[Tuple[time, time], int] = {}
+    for sala_id, data_reserva, hora_inicio, hora_fim in linhas:
+        bits = mascaras.get((hora_inicio, hora_fim))
+        if bits is None:
+            bits = mascaras[(hora_inicio, hora_fim)] = mascara(hora_inicio, hora_fim)
+        chave = (sala_id, data_reserva)
+        ocupado[chave] = ocupado.get(chave, 0) | bits
+    return ocupado
+
+
+def alocar(db: Session, pedido: schemas.AlocacaoCreate) -> Tuple[schemas.AlocacaoResultado, List[schemas.Reserva]]:
+    """Escolhe uma sala para cada demanda e, se pedido, grava as séries; devolve o resultado e as reservas criadas."""
+    # Demandas acima de RECORRENCIA_MAX_OCORRENCIAS são recusadas individualmente e não entram na soma.
+    ocorrencias = [crud.contar_ocorrencias(dados) for dados in pedido.demandas]
+    if sum(n for n in ocorrencias if n <= config.RECORRENCIA_MAX_OCORRENCIAS) > config.ALOCACAO_MAX_OCORRENCIAS:
+        raise HTTPException(status_code=400, detail=f"Erro: O pedido gera mais de {config.ALOCACAO_MAX_OCORRENCIAS} reservas; divida-o em partes menores.")
+    itens = [schemas.AlocacaoItem(indice=i) for i in range(len(pedido.demandas))]
+    cursos = dict(db.query(models.Coordenadores.id, models.Coordenadores.curso_id).filter(
+        models.Coordenadores.id.in_({dados.coordenador_id for dados in pedido.demandas})
+    ).all())
+    # Menor capacidade primeiro; no empate, a sala exclusiva, que só serve ao seu curso.
+    salas = sorted(
+        db.query(models.Salas.id, models.Salas.bloco_id, models.Salas.curso_id, models.Salas.capacidade,
+                 models.Salas.recursos, models.Salas.exclusivo).all(),
+        key=lambda sala: (sala.capacidade, not sala.exclusivo, sala.id)
+    )
+    capacidades = {sala.id: sala.capacidade for sala in salas}
+    etiquetas = {sala.id: set(recursos.normalizar(sala.recursos)) for sala in salas}
+
+    candidatas_por_perfil: Dict[tuple, List[int]] = {}
+    demandas = []
+    for i, dados in enumerate(pedido.demandas):
+        if dados.coordenador_id not in cursos:
+            itens[i].erro = "Erro: Coordenador não encontrado."
+            continue
+        if dados.hora_inicio >= dados.hora_fim:
+            itens[i].erro = "Erro: O horário de início deve ser anterior ao horário de fim."
+            continue
+        if ocorrencias[i] > config.RECORRENCIA_MAX_OCORRENCIAS:
+            itens[i].erro = crud.ERRO_RECORRENCIA_LONGA
+            continue
+        datas = crud.expandir_recorrencia(dados)
+        if not datas:
+            itens[i].erro = "Erro: A recorrência não gera nenhuma data."
+            continue
+        perfil = (dados.capacidade_min, _etiquetas(dados.recursos), dados.bloco_id, cursos[dados.coordenador_id])
+        if perfil not in candidatas_por_perfil:
+            capacidade_min, pedidas, bloco_id, curso_id = perfil
+            candidatas_por_perfil[perfil] = [
+                sala.id for sala in salas
+                if sala.capacidade >= capacidade_min
+                and (bloco_id is None or sala.bloco_id == bloco_id)
+                and (not sala.exclusivo or sala.curso_id == curso_id)
+                and etiquetas[sala.id].issuperset(pedidas)
+            ]
+        if not candidatas_por_perfil[perfil]:
+            itens[i].erro = "Erro: Nenhuma sala atende à capacidade, aos recursos e ao bloco pedidos."
+            continue
+        demandas.append(Demanda(i, dados, datas, candidatas_por_perfil[perfil]))
+
+    Alocador(demandas, _ocupacao_existente(db, demandas)).resolver()
+
+    alocadas = []
+    for demanda in demandas:
+        if demanda.sala_id is None:
+            itens[demanda.indice].erro = "Erro: Não há sala livre em todas as datas desse horário."
+        else:
+            itens[demanda.indice].sala_id = demanda.sala_id
+            itens[demanda.indice].reservas = len(demanda.datas)
+            alocadas.append(demanda)
+
+    resultado = schemas.AlocacaoResultado(
+        alocadas=len(alocadas),
+        nao_alocadas=len(itens) - len(alocadas),
+        aproveitamento=round(sum(
+            demanda.dados.capacidade_min / capacidades[demanda.sala_id] for demanda in alocadas
+        ) / len(alocadas), 4) if alocadas else None,
+        itens=itens
+    )
+    if not pedido.gravar or not alocadas:
+        return resultado, []
+    if pedido.tudo_ou_nada and len(alocadas) < len(itens):
+        for demanda in alocadas:
+            itens[demanda.indice].erro = "Não criada: outra demanda ficou sem sala."
+        resultado.alocadas = 0
+        resultado.nao_alocadas = len(itens)
+        return resultado, []
+
+    novas = []
+    for demanda in alocadas:
+        serie_id = str(uuid.uuid4())
+        itens[demanda.indice].serie_id = serie_id
+        novas.extend(
+            {
+                "sala_id": demanda.sala_id,
+                "coordenador_id": demanda.dados.coordenador_id,
+                "data_reserva": data_reserva,
+                "hora_inicio": demanda.dados.hora_inicio,
+                "hora_fim": demanda.dados.hora_fim,
+                "motivo": demanda.dados.motivo,
+                "serie_id": serie_id,
+            }
+            for data_reserva in demanda.datas
+        )
+    # INSERT em massa com RETURNING (em lotes de várias linhas); sem flush, os agregados são somados aqui.
+    try:
+        criadas = [schemas.Reserva.model_validate(reserva)
+                   for reserva in db.scalars(insert(models.Reservas).returning(models.Reservas), novas)]
+        if config.OCUPACAO_ATIVA:
+            ocupacao.aplicar(db.connection(), [
+                (novo["sala_id"], novo["data_reserva"], novo["hora_inicio"], novo["hora_fim"], 1) for novo in novas
+            ])
+        eventos.registrar(db, [eventos.evento("criada", reserva) for reserva in criadas])
+        db.commit()
+    except SQLAlchemyError as e:
+        raise crud.erro_ao_salvar(db, e)
+    return resultado, criadas
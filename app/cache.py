@@ -0,0 +1,168 @@
+import hashlib
+import importlib
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app import config
+from app.paginacao import CABECALHO_PROXIMO_CURSOR
+from app.serializacao import adaptador_lista
+
+
+@dataclass
+class RespostaCacheada:
+    corpo: bytes
+    etag: str
+    cabecalhos: Dict[str, str] = field(default_factory=dict)
+
+
+class BackendCache(ABC):
+    """Interface dos backends de cache.
+
+    Só o backend em memória acompanha o projeto. Um backend compartilhado entre
+    workers (Redis, memcached...) precisa guardar as versões no próprio servidor
+    para que a invalidação feita por um worker valha para os demais.
+    """
+
+    @abstractmethod
+    def obter(self, chave: str) -> Optional[RespostaCacheada]:
+        ...
+
+    @abstractmethod
+    def guardar(self, chave: str, resposta: RespostaCacheada):
+        ...
+
+    @abstractmethod
+    def versao(self, recurso: str) -> int:
+        ...
+
+    @abstractmethod
+    def incrementar_versao(self, recurso: str) -> int:
+        ...
+
+
+class CacheLRU(BackendCache):
+    """Backend em memória do processo, com descarte LRU e expiração por TTL.
+
+    Cada worker tem as suas próprias versões e só enxerga as invalidações feitas
+    nele: após uma escrita em outro worker, este continua servindo a listagem
+    antiga por até `ttl` segundos.
+    """
+
+    def __init__(self, max_entradas: int = config.CACHE_MAX_ENTRADAS, ttl: float = config.CACHE_TTL_SEGUNDOS):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versoes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str) -> Optional[RespostaCacheada]:
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return None
+            guardado_em, resposta = entrada
+            if time.monotonic() - guardado_em >= self.ttl:
+                del self._entradas[chave]
+                return None
+            self._entradas.move_to_end(chave)
+            return resposta
+
+    def guardar(self, chave: str, resposta: RespostaCacheada):
+        with self._lock:
+            self._entradas[chave] = (time.monotonic(), resposta)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def versao(self, recurso: str) -> int:
+        with self._lock:
+            return self._versoes.get(recurso, 0)
+
+    def incrementar_versao(self, recurso: str) -> int:
+        with self._lock:
+            self._versoes[recurso] = self._versoes.get(recurso, 0) + 1
+            prefixo = f"{recurso}:"
+            for chave in [chave for chave in self._entradas if chave.startswith(prefixo)]:
+                del self._entradas[chave]
+            return self._versoes[recurso]
+
+
+def criar_backend(nome: str = config.CACHE_BACKEND) -> BackendCache:
+    """`memoria` ou o caminho de uma classe compatível com BackendCache (`pacote.modulo:Classe`)."""
+    if nome == "memoria":
+        return CacheLRU()
+    modulo, _, classe = nome.partition(":")
+    return getattr(importlib.import_module(modulo), classe)()
+
+
+def _etag_confere(request: Request, etag: str) -> bool:
+    valor = request.headers.get("if-none-match")
+    if not valor:
+        return False
+    candidatos = [candidato.strip().removeprefix("W/") for candidato in valor.split(",")]
+    return "*" in candidatos or etag in candidatos
+
+
+class CacheRespostas:
+    """Corpos de listagens já serializados, versionados por recurso.
+
+    As rotas de escrita chamam `invalidar`, o que incrementa a versão do recurso;
+    a versão faz parte da chave, então entradas antigas deixam de ser usadas. O ETag
+    é o hash do corpo, igual em todos os workers que servem o mesmo conteúdo.
+    """
+
+    def __init__(self, backend: BackendCache):
+        self.backend = backend
+        self.acertos = Counter()
+        self.falhas = Counter()
+
+    def responder(self, request: Request, db: Session, recurso: str, schema: Type[BaseModel],
+                  consultar: Callable[[Response], list]) -> Response:
+        """Serve a listagem do cache ou a consulta e guarda o corpo.
+
+        Corpos lidos de uma réplica (`db.info["replica"]`) são servidos mas não
+        guardados: a réplica pode não ter a escrita que acabou de invalidar o
+        recurso, e a entrada atrasada seria servida até mesmo a quem lê do primário.
+        """
+        chave = f"{recurso}:{self.backend.versao(recurso)}:{request.url.query}"
+
+        resposta = self.backend.obter(chave)
+        if resposta is None:
+            self.falhas[recurso] += 1
+            parcial = Response()
+            itens = consultar(parcial)
+            cabecalhos = {}
+            if CABECALHO_PROXIMO_CURSOR in parcial.headers:
+                cabecalhos[CABECALHO_PROXIMO_CURSOR] = parcial.headers[CABECALHO_PROXIMO_CURSOR]
+            adaptador = adaptador_lista(schema)
+            corpo = adaptador.dump_json(adaptador.validate_python(itens, from_attributes=True))
+            # O cursor da próxima página também faz parte da resposta.
+            conteudo = corpo + cabecalhos.get(CABECALHO_PROXIMO_CURSOR, "").encode()
+            etag = '"' + hashlib.sha1(conteudo).hexdigest()[:20] + '"'
+            resposta = RespostaCacheada(corpo, etag, cabecalhos)
+            if not db.info.get("replica"):
+                self.backend.guardar(chave, resposta)
+            origem = "MISS"
+        else:
+            self.acertos[recurso] += 1
+            origem = "HIT"
+
+        if _etag_confere(request, resposta.etag):
+            return Response(status_code=304, headers={"ETag": resposta.etag})
+        return Response(content=resposta.corpo, media_type="application/json",
+                        headers={**resposta.cabecalhos, "ETag": resposta.etag, "X-Cache": origem})
+
+    def invalidar(self, *recursos: str):
+        for recurso in recursos:
+            self.backend.incrementar_versao(recurso)
+
+
+cache = CacheRespostas(criar_backend())
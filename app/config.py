@@ -0,0 +1,89 @@
+import os
+
+
+def _bool(nome: str, padrao: bool) -> bool:
+    valor = os.getenv(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+
+# Índice de conflitos de reservas em memória, usado só nas consultas de disponibilidade (app/indice_reservas.py)
+INDICE_CONFLITOS_ATIVO = _bool("INDICE_CONFLITOS_ATIVO", True)
+INDICE_VERIFICAR_BANCO = _bool("INDICE_VERIFICAR_BANCO", False)
+INDICE_TTL_SEGUNDOS = float(os.getenv("INDICE_TTL_SEGUNDOS", "5"))
+INDICE_MAX_CHAVES = int(os.getenv("INDICE_MAX_CHAVES", "50000"))
+
+# Paginação por cursor e streaming NDJSON das listagens (app/paginacao.py)
+PAGINACAO_LIMITE_PADRAO = int(os.getenv("PAGINACAO_LIMITE_PADRAO", "100"))
+PAGINACAO_LIMITE_MAXIMO = int(os.getenv("PAGINACAO_LIMITE_MAXIMO", "1000"))
+STREAM_TAMANHO_LOTE = int(os.getenv("STREAM_TAMANHO_LOTE", "1000"))
+# Listagens de reservas lidas como tuplas e serializadas sem revalidação (app/serializacao.py)
+JSON_RAPIDO = _bool("JSON_RAPIDO", False)
+
+# Rotas de reservas com AsyncSession em vez do threadpool (app/routes/reservas_async.py)
+MODO_ASYNC = _bool("MODO_ASYNC", False)
+
+# Hash de senhas (app/senhas.py)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+SENHAS_PROCESSOS = int(os.getenv("SENHAS_PROCESSOS", str(os.cpu_count() or 1)))
+
+# Cache das listagens de dados de referência: cursos, blocos e salas (app/cache.py)
+CACHE_ATIVO = _bool("CACHE_ATIVO", True)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memoria")
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "1024"))
+CACHE_TTL_SEGUNDOS = float(os.getenv("CACHE_TTL_SEGUNDOS", "30"))
+
+# Métricas por requisição e endpoint /metrics (app/metricas.py)
+METRICAS_ATIVAS = _bool("METRICAS_ATIVAS", True)
+METRICAS_LIMITE_CONSULTAS = int(os.getenv("METRICAS_LIMITE_CONSULTAS", "10"))
+
+# Séries recorrentes e alocação em lote: datas geradas por série e por pedido (app/crud.py, app/alocacao.py)
+RECORRENCIA_MAX_OCORRENCIAS = int(os.getenv("RECORRENCIA_MAX_OCORRENCIAS", "104"))
+ALOCACAO_MAX_OCORRENCIAS = int(os.getenv("ALOCACAO_MAX_OCORRENCIAS", "10000"))
+
+# Agenda de ocupação das salas (app/agenda.py)
+AGENDA_ABERTURA = os.getenv("AGENDA_ABERTURA", "07:00")
+AGENDA_FECHAMENTO = os.getenv("AGENDA_FECHAMENTO", "23:00")
+AGENDA_MAX_DIAS = int(os.getenv("AGENDA_MAX_DIAS", "62"))
+
+# Agregados de ocupação atualizados a cada escrita em reservas (app/ocupacao.py)
+OCUPACAO_ATIVA = _bool("OCUPACAO_ATIVA", True)
+
+# Feed de alterações de reservas por Server-Sent Events (app/eventos.py)
+EVENTOS_ATIVOS = _bool("EVENTOS_ATIVOS", True)
+EVENTOS_BROKER = os.getenv("EVENTOS_BROKER", "auto")
+EVENTOS_HISTORICO = int(os.getenv("EVENTOS_HISTORICO", "10000"))
+EVENTOS_FILA_MAXIMA = int(os.getenv("EVENTOS_FILA_MAXIMA", "1000"))
+EVENTOS_HEARTBEAT_SEGUNDOS = float(os.getenv("EVENTOS_HEARTBEAT_SEGUNDOS", "15"))
+EVENTOS_RECONEXAO_MS = int(os.getenv("EVENTOS_RECONEXAO_MS", "3000"))
+
+# Etiquetas de recursos das salas e mapa de bitmaps para os filtros de GET /salas/ (app/recursos.py)
+RECURSOS_MAPA_ATIVO = _bool("RECURSOS_MAPA_ATIVO", True)
+RECURSOS_MAPA_TTL_SEGUNDOS = float(os.getenv("RECURSOS_MAPA_TTL_SEGUNDOS", "30"))
+
+# Particionamento mensal de reservas e arquivamento de semestres encerrados (app/particoes.py)
+PARTICOES_MESES_A_FRENTE = int(os.getenv("PARTICOES_MESES_A_FRENTE", "12"))
+ARQUIVO_TTL_SEGUNDOS = float(os.getenv("ARQUIVO_TTL_SEGUNDOS", "60"))
+
+# Importação em massa por CSV/NDJSON (app/importacao.py)
+IMPORTACAO_TAMANHO_LOTE = int(os.getenv("IMPORTACAO_TAMANHO_LOTE", "1000"))
+
+# Pool de conexões e réplicas de leitura (app/database.py)
+POOL_TAMANHO = int(os.getenv("POOL_TAMANHO", "5"))
+POOL_MAX_EXCEDENTE = int(os.getenv("POOL_MAX_EXCEDENTE", "10"))
+POOL_TIMEOUT_SEGUNDOS = float(os.getenv("POOL_TIMEOUT_SEGUNDOS", "2"))
+POOL_RECICLAR_SEGUNDOS = int(os.getenv("POOL_RECICLAR_SEGUNDOS", "1800"))
+POOL_PRE_PING = _bool("POOL_PRE_PING", True)
+REPLICA_ADERENCIA_SEGUNDOS = float(os.getenv("REPLICA_ADERENCIA_SEGUNDOS", "5"))
+
+# Controle de admissão: 503 quando o pool fica esgotado por POOL_TIMEOUT_SEGUNDOS (app/admissao.py)
+ADMISSAO_RETRY_AFTER_SEGUNDOS = int(os.getenv("ADMISSAO_RETRY_AFTER_SEGUNDOS", "1"))
+
+# Idempotency-Key nas escritas (app/idempotencia.py)
+IDEMPOTENCIA_ATIVA = _bool("IDEMPOTENCIA_ATIVA", True)
+IDEMPOTENCIA_BACKEND = os.getenv("IDEMPOTENCIA_BACKEND", "memoria")
+IDEMPOTENCIA_PREFIXOS = tuple(prefixo.strip() for prefixo in os.getenv("IDEMPOTENCIA_PREFIXOS", "/reservas").split(",") if prefixo.strip())
+IDEMPOTENCIA_TTL_SEGUNDOS = float(os.getenv("IDEMPOTENCIA_TTL_SEGUNDOS", "86400"))
+IDEMPOTENCIA_MAX_ENTRADAS = int(os.getenv("IDEMPOTENCIA_MAX_ENTRADAS", "10000"))
+IDEMPOTENCIA_MAX_CORPO_BYTES = int(os.getenv("IDEMPOTENCIA_MAX_CORPO_BYTES", str(1024 * 1024)))
@@ -1,97 +1,625 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from fastapi import HTTPException
-from app import models, schemas
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_senha(senha: str) -> str:
-    return pwd_context.hash(senha)
-
-def commit_and_refresh(db: Session, entity):
-    try:
-        db.add(entity)
-        db.commit()
-        db.refresh(entity)
-        return entity
-    except SQLAlchemyError as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Erro ao salvar no banco de dados: {str(e)}")
-
-def create_bloco(db: Session, bloco_data: schemas.BlocoCreate):
-    bloco = models.Blocos(nome=bloco_data.nome, curso_id=bloco_data.curso_id)
-    return commit_and_refresh(db=db, entity=bloco)
-
-def create_sala(db: Session, sala_data: schemas.SalaCreate):
-    bloco = db.query(models.Blocos).filter(models.Blocos.id == sala_data.bloco_id).first()
-
-    if not bloco:
-        raise HTTPException(status_code=404, detail="Bloco não encontrado")
-
-    sala = models.Salas(
-        bloco_id=sala_data.bloco_id,
-        curso_id=bloco.__dict__['curso_id'],
-        numero=sala_data.numero,
-        capacidade=sala_data.capacidade,
-        recursos=sala_data.recursos,
-        exclusivo=sala_data.exclusivo
-    )
-    return commit_and_refresh(db=db, entity=sala)
-
-def create_coordenador(db: Session, coordenador_data: schemas.CoordenadorCreate):
-
-    email_existente = db.query(models.Coordenadores).filter(models.Coordenadores.email == coordenador_data.email).first()
-
-    if email_existente:
-        raise HTTPException(status_code=400, detail="Erro: Email já cadastrado!")
-
-    coordenador = models.Coordenadores(
-        curso_id=coordenador_data.curso_id,
-        nome=coordenador_data.nome,
-        email=coordenador_data.email,
-        senha=hash_senha(coordenador_data.senha)
-    )
-    return commit_and_refresh(db=db, entity=coordenador)
-
-def create_reserva(db: Session, reserva_data: schemas.ReservaCreate):
-    sala_a_ser_reservada = db.query(models.Salas).filter(
-        models.Salas.id == reserva_data.sala_id
-    ).first()
-
-    if not sala_a_ser_reservada:
-        raise HTTPException(status_code=404, detail="Erro: Sala não encontrada.")
-
-    if sala_a_ser_reservada.exclusivo:
-
-        coordenador_reservando = db.query(models.Coordenadores).filter(
-            models.Coordenadores.id == reserva_data.coordenador_id
-        ).first()
-
-        if coordenador_reservando.curso_id != sala_a_ser_reservada.curso_id:
-            raise HTTPException(status_code=403, detail="Erro: Coordenador não possui permissão para reservar essa sala/laboratório.")
-
-    reserva_existente = db.query(models.Reservas).filter(
-        models.Reservas.sala_id == reserva_data.sala_id,
-        models.Reservas.data_reserva == reserva_data.data_reserva,
-        models.Reservas.hora_inicio < reserva_data.hora_fim,
-        models.Reservas.hora_fim > reserva_data.hora_inicio
-    ).first()
-
-    if reserva_existente:
-        raise HTTPException(status_code=400, detail="Erro: A sala já está reservada para esse horário!")
-
-    reserva = models.Reservas(
-        sala_id=reserva_data.sala_id,
-        coordenador_id=reserva_data.coordenador_id,
-        data_reserva=reserva_data.data_reserva,
-        hora_inicio=reserva_data.hora_inicio,
-        hora_fim=reserva_data.hora_fim,
-        motivo=reserva_data.motivo
-    )
-    return commit_and_refresh(db=db, entity=reserva)
-
-def create_curso(db: Session, curso_data: schemas.CursoCreate):
-    curso = models.Cursos(nome=curso_data.nome)
-    return commit_and_refresh(db=db, entity=curso)
-
+import uuid
+from collections import defaultdict
+from datetime import date, time, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from sqlalchemy import delete, exists, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError, TimeoutError as PoolEsgotado
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import admissao, config, eventos, models, ocupacao, recursos, schemas
+from app.indice_reservas import IntervalosDia, indice
+
+def violou_sobreposicao(e: SQLAlchemyError) -> bool:
+    """Indica se o erro veio da restrição de reservas sobrepostas (exclusão no PostgreSQL, trigger no SQLite)."""
+    return isinstance(e, IntegrityError) and models.RESTRICAO_SOBREPOSICAO in str(e.orig)
+
+def violou_horario(e: SQLAlchemyError) -> bool:
+    """Indica se o erro veio da restrição hora_inicio < hora_fim."""
+    return isinstance(e, IntegrityError) and models.RESTRICAO_HORARIO in str(e.orig)
+
+ERRO_VERSAO = "Erro: A reserva foi alterada por outra requisição; consulte-a novamente."
+ERRO_HORARIO = "Erro: O horário de início deve ser anterior ao horário de fim."
+
+def erro_ao_salvar(db: Session, e: SQLAlchemyError) -> HTTPException:
+    db.rollback()
+    return erro_do_banco(e)
+
+def erro_do_banco(e: SQLAlchemyError) -> HTTPException:
+    """Resposta para uma falha ao gravar; também usada pelas rotas async, que fazem o rollback por conta própria."""
+    if violou_sobreposicao(e):
+        return HTTPException(status_code=400, detail="Erro: A sala já está reservada para esse horário!")
+    if violou_horario(e):
+        return HTTPException(status_code=400, detail=ERRO_HORARIO)
+    if isinstance(e, StaleDataError):
+        return HTTPException(status_code=409, detail=ERRO_VERSAO)
+    if isinstance(e, PoolEsgotado):
+        return admissao.erro_pool_esgotado()
+    return HTTPException(status_code=500, detail=f"Erro ao salvar no banco de dados: {str(e)}")
+
+def commit_and_refresh(db: Session, entity):
+    try:
+        db.add(entity)
+        db.commit()
+        db.refresh(entity)
+        return entity
+    except SQLAlchemyError as e:
+        raise erro_ao_salvar(db, e)
+
+def create_bloco(db: Session, bloco_data: schemas.BlocoCreate):
+    bloco = models.Blocos(nome=bloco_data.nome, curso_id=bloco_data.curso_id)
+    return commit_and_refresh(db=db, entity=bloco)
+
+def create_sala(db: Session, sala_data: schemas.SalaCreate):
+    bloco = db.query(models.Blocos).filter(models.Blocos.id == sala_data.bloco_id).first()
+
+    if not bloco:
+        raise HTTPException(status_code=404, detail="Bloco não encontrado")
+
+    sala = models.Salas(
+        bloco_id=sala_data.bloco_id,
+        curso_id=bloco.__dict__['curso_id'],
+        numero=sala_data.numero,
+        capacidade=sala_data.capacidade,
+        recursos=sala_data.recursos,
+        exclusivo=sala_data.exclusivo
+    )
+    return commit_and_refresh(db=db, entity=sala)
+
+def verificar_emails_livres(db: Session, emails: List[str]):
+    """400 se algum email se repete na lista ou já está cadastrado (conferido antes de calcular os hashes)."""
+    repetidos = {email for email in emails if emails.count(email) > 1}
+    repetidos.update(email for (email,) in db.query(models.Coordenadores.email).filter(models.Coordenadores.email.in_(emails)))
+    if len(emails) == 1 and repetidos:
+        raise HTTPException(status_code=400, detail="Erro: Email já cadastrado!")
+    if repetidos:
+        raise HTTPException(status_code=400, detail=f"Erro: Email já cadastrado! ({', '.join(sorted(repetidos))})")
+
+def create_coordenador(db: Session, coordenador_data: schemas.CoordenadorCreate, senha_hash: str):
+    """Grava o coordenador com o hash já calculado pela rota (app/senhas.py)."""
+    coordenador = models.Coordenadores(
+        curso_id=coordenador_data.curso_id,
+        nome=coordenador_data.nome,
+        email=coordenador_data.email,
+        senha=senha_hash
+    )
+    return commit_and_refresh(db=db, entity=coordenador)
+
+def filtros_reservas(data_inicio: Optional[date] = None, data_fim: Optional[date] = None,
+                     sala_id: Optional[int] = None, coordenador_id: Optional[int] = None,
+                     modelo=models.Reservas) -> list:
+    """Condições de filtro da listagem de reservas (`modelo` pode ser a união com o arquivo)."""
+    filtros = []
+    if data_inicio is not None:
+        filtros.append(modelo.data_reserva >= data_inicio)
+    if data_fim is not None:
+        filtros.append(modelo.data_reserva <= data_fim)
+    if sala_id is not None:
+        filtros.append(modelo.sala_id == sala_id)
+    if coordenador_id is not None:
+        filtros.append(modelo.coordenador_id == coordenador_id)
+    return filtros
+
+def reserva_em_conflito(db: Session, sala_id: int, data: date, hora_inicio: time, hora_fim: time,
+                        ignorar_id: Optional[int] = None) -> bool:
+    """Verifica sobreposição pelo índice em memória e, se configurado, confirma no banco.
+
+    Só para consultas de disponibilidade: o índice pode estar até INDICE_TTL_SEGUNDOS atrasado em
+    relação a outros workers. As gravações nunca a usam; a regra é garantida pela restrição do banco.
+    """
+    if config.INDICE_CONFLITOS_ATIVO:
+        if indice.conflita(db, sala_id, data, hora_inicio, hora_fim, ignorar_id):
+            return True
+        if not config.INDICE_VERIFICAR_BANCO:
+            return False
+
+    query = db.query(models.Reservas.id).filter(
+        models.Reservas.sala_id == sala_id,
+        models.Reservas.data_reserva == data,
+        models.Reservas.hora_inicio < hora_fim,
+        models.Reservas.hora_fim > hora_inicio
+    )
+    if ignorar_id is not None:
+        query = query.filter(models.Reservas.id != ignorar_id)
+    return query.first() is not None
+
+def buscar_sala_reservavel(db: Session, sala_id: int, coordenador_id: int) -> models.Salas:
+    """Retorna a sala se ela existir e o coordenador puder reservá-la (regra de exclusividade)."""
+    sala_a_ser_reservada = db.query(models.Salas).filter(
+        models.Salas.id == sala_id
+    ).first()
+
+    if not sala_a_ser_reservada:
+        raise HTTPException(status_code=404, detail="Erro: Sala não encontrada.")
+
+    if sala_a_ser_reservada.exclusivo:
+
+        coordenador_reservando = db.query(models.Coordenadores).filter(
+            models.Coordenadores.id == coordenador_id
+        ).first()
+
+        if not coordenador_reservando or coordenador_reservando.curso_id != sala_a_ser_reservada.curso_id:
+            raise HTTPException(status_code=403, detail="Erro: Coordenador não possui permissão para reservar essa sala/laboratório.")
+
+    return sala_a_ser_reservada
+
+def create_coordenadores_lote(db: Session, coordenadores: List[schemas.CoordenadorCreate], hashes: List[str]) -> List[schemas.Coordenador]:
+    """Cadastra vários coordenadores em uma transação, com os hashes já calculados em paralelo pela rota."""
+    novos = [
+        models.Coordenadores(
+            curso_id=coordenador_data.curso_id,
+            nome=coordenador_data.nome,
+            email=coordenador_data.email,
+            senha=senha_hash
+        )
+        for coordenador_data, senha_hash in zip(coordenadores, hashes)
+    ]
+    try:
+        db.add_all(novos)
+        db.flush()
+        criados = [schemas.Coordenador.model_validate(coordenador) for coordenador in novos]
+        db.commit()
+    except SQLAlchemyError as e:
+        raise erro_ao_salvar(db, e)
+    return criados
+
+def create_reserva(db: Session, reserva_data: schemas.ReservaCreate):
+    buscar_sala_reservavel(db, reserva_data.sala_id, reserva_data.coordenador_id)
+
+    # A sobreposição é barrada pelo banco (reservas_sem_sobreposicao) e convertida em 400 por commit_and_refresh.
+    reserva = models.Reservas(
+        sala_id=reserva_data.sala_id,
+        coordenador_id=reserva_data.coordenador_id,
+        data_reserva=reserva_data.data_reserva,
+        hora_inicio=reserva_data.hora_inicio,
+        hora_fim=reserva_data.hora_fim,
+        motivo=reserva_data.motivo
+    )
+    return commit_and_refresh(db=db, entity=reserva)
+
+def carregar_intervalos(db: Session, pares) -> Dict[Tuple[int, date], IntervalosDia]:
+    """Carrega em uma única consulta as reservas existentes de cada par (sala, data)."""
+    intervalos = defaultdict(list)
+    if pares:
+        linhas = db.query(
+            models.Reservas.id, models.Reservas.sala_id, models.Reservas.data_reserva,
+            models.Reservas.hora_inicio, models.Reservas.hora_fim
+        ).filter(tuple_(models.Reservas.sala_id, models.Reservas.data_reserva).in_(list(pares))).all()
+        for reserva_id, sala_id, data_reserva, hora_inicio, hora_fim in linhas:
+            intervalos[(sala_id, data_reserva)].append((reserva_id, hora_inicio, hora_fim))
+    return {par: IntervalosDia(intervalos[par], 0) for par in pares}
+
+def create_reservas_lote(db: Session, lote: schemas.ReservaLoteCreate) -> schemas.ReservaLoteResultado:
+    """Cria várias reservas em uma única transação.
+
+    Salas e coordenadores são carregados com uma consulta cada, os conflitos com o
+    banco são buscados de uma vez e os conflitos dentro do próprio lote são
+    resolvidos em memória, na ordem em que os itens foram enviados.
+    """
+    itens = lote.reservas
+    salas = {
+        sala.id: sala for sala in db.query(models.Salas).filter(
+            models.Salas.id.in_({item.sala_id for item in itens})
+        )
+    }
+    ids_coordenadores = {item.coordenador_id for item in itens if item.sala_id in salas and salas[item.sala_id].exclusivo}
+    cursos_coordenadores = dict(
+        db.query(models.Coordenadores.id, models.Coordenadores.curso_id).filter(
+            models.Coordenadores.id.in_(ids_coordenadores)
+        ).all()
+    ) if ids_coordenadores else {}
+
+    resultados: List[schemas.ReservaLoteItem] = []
+    validos = []
+    for i, item in enumerate(itens):
+        sala = salas.get(item.sala_id)
+        if not sala:
+            resultados.append(schemas.ReservaLoteItem(indice=i, status_code=404, erro="Erro: Sala não encontrada."))
+        elif sala.exclusivo and cursos_coordenadores.get(item.coordenador_id) != sala.curso_id:
+            resultados.append(schemas.ReservaLoteItem(indice=i, status_code=403, erro="Erro: Coordenador não possui permissão para reservar essa sala/laboratório."))
+        else:
+            resultados.append(None)
+            validos.append(i)
+
+    intervalos = carregar_intervalos(db, {(itens[i].sala_id, itens[i].data_reserva) for i in validos})
+    aceitos = []
+    for i in validos:
+        item = itens[i]
+        dia = intervalos[(item.sala_id, item.data_reserva)]
+        if dia.conflita(item.hora_inicio, item.hora_fim):
+            resultados[i] = schemas.ReservaLoteItem(indice=i, status_code=400, erro="Erro: A sala já está reservada para esse horário!")
+            continue
+        dia.adicionar(-(i + 1), item.hora_inicio, item.hora_fim)
+        aceitos.append(i)
+
+    if lote.tudo_ou_nada and len(aceitos) < len(itens):
+        for i in aceitos:
+            resultados[i] = schemas.ReservaLoteItem(indice=i, status_code=424, erro="Não criada: outro item do lote falhou.")
+        return schemas.ReservaLoteResultado(criadas=0, resultados=resultados)
+
+    novas = [models.Reservas(**itens[i].model_dump()) for i in aceitos]
+    try:
+        db.add_all(novas)
+        db.flush()
+        for i, reserva in zip(aceitos, novas):
+            resultados[i] = schemas.ReservaLoteItem(indice=i, status_code=200, reserva=schemas.Reserva.model_validate(reserva))
+        db.commit()
+    except SQLAlchemyError as e:
+        raise erro_ao_salvar(db, e)
+    return schemas.ReservaLoteResultado(criadas=len(novas), resultados=resultados)
+
+Recorrencia = Union[schemas.ReservaRecorrenteCreate, schemas.DemandaAlocacao]
+
+ERRO_RECORRENCIA_LONGA = f"Erro: A recorrência gera mais de {config.RECORRENCIA_MAX_OCORRENCIAS} datas."
+
+def _passo(recorrencia: Recorrencia) -> timedelta:
+    return timedelta(weeks=2 if recorrencia.frequencia == "quinzenal" else 1)
+
+def contar_ocorrencias(recorrencia: Recorrencia) -> int:
+    """Quantidade de datas da recorrência (antes das exceções), calculada sem expandi-la."""
+    if recorrencia.data_fim < recorrencia.data_inicio:
+        return 0
+    return (recorrencia.data_fim - recorrencia.data_inicio).days // _passo(recorrencia).days + 1
+
+def expandir_recorrencia(recorrencia: Recorrencia) -> List[date]:
+    """Lista as datas de uma recorrência semanal/quinzenal, sem as exceções.
+
+    Recorrências com mais de RECORRENCIA_MAX_OCORRENCIAS datas são recusadas com 400.
+    """
+    if contar_ocorrencias(recorrencia) > config.RECORRENCIA_MAX_OCORRENCIAS:
+        raise HTTPException(status_code=400, detail=ERRO_RECORRENCIA_LONGA)
+    passo = _passo(recorrencia)
+    excecoes = set(recorrencia.excecoes)
+    datas = []
+    data_atual = recorrencia.data_inicio
+    while data_atual <= recorrencia.data_fim:
+        if data_atual not in excecoes:
+            datas.append(data_atual)
+        data_atual += passo
+    return datas
+
+def _datas_em_conflito(intervalos, sala_id: int, datas, hora_inicio: time, hora_fim: time, ignorar=frozenset()) -> List[date]:
+    conflitos = []
+    for data_reserva in datas:
+        dia = intervalos[(sala_id, data_reserva)]
+        for reserva_id in ignorar.intersection(dia.ids):
+            dia.remover(reserva_id)
+        if dia.conflita(hora_inicio, hora_fim):
+            conflitos.append(data_reserva)
+    return conflitos
+
+def _erro_conflito_datas(conflitos: List[date]):
+    datas = ", ".join(data_reserva.isoformat() for data_reserva in conflitos)
+    raise HTTPException(status_code=400, detail=f"Erro: A sala já está reservada para esse horário nas datas: {datas}")
+
+def create_reservas_recorrentes(db: Session, recorrencia: schemas.ReservaRecorrenteCreate) -> schemas.ReservaSerie:
+    """Expande a recorrência e grava todas as ocorrências de uma vez, com um mesmo `serie_id`."""
+    datas = expandir_recorrencia(recorrencia)
+    if not datas:
+        raise HTTPException(status_code=400, detail="Erro: A recorrência não gera nenhuma data.")
+
+    buscar_sala_reservavel(db, recorrencia.sala_id, recorrencia.coordenador_id)
+
+    intervalos = carregar_intervalos(db, {(recorrencia.sala_id, data_reserva) for data_reserva in datas})
+    conflitos = _datas_em_conflito(intervalos, recorrencia.sala_id, datas, recorrencia.hora_inicio, recorrencia.hora_fim)
+    if conflitos:
+        _erro_conflito_datas(conflitos)
+
+    serie_id = str(uuid.uuid4())
+    novas = [
+        models.Reservas(
+            sala_id=recorrencia.sala_id,
+            coordenador_id=recorrencia.coordenador_id,
+            data_reserva=data_reserva,
+            hora_inicio=recorrencia.hora_inicio,
+            hora_fim=recorrencia.hora_fim,
+            motivo=recorrencia.motivo,
+            serie_id=serie_id
+        )
+        for data_reserva in datas
+    ]
+    try:
+        db.add_all(novas)
+        db.flush()
+        serie = schemas.ReservaSerie(serie_id=serie_id, reservas=[schemas.Reserva.model_validate(reserva) for reserva in novas])
+        db.commit()
+    except SQLAlchemyError as e:
+        raise erro_ao_salvar(db, e)
+    return serie
+
+def _filtro_serie(serie_id: str, a_partir_de: Optional[date]):
+    filtros = [models.Reservas.serie_id == serie_id]
+    if a_partir_de is not None:
+        filtros.append(models.Reservas.data_reserva >= a_partir_de)
+    return filtros
+
+def update_serie(db: Session, serie_id: str, dados: schemas.ReservaSerieUpdate) -> schemas.ReservaSerie:
+    """Move as ocorrências de uma série (sala e/ou horário) com um único UPDATE."""
+    filtros = _filtro_serie(serie_id, dados.a_partir_de)
+    ocorrencias = db.query(
+        models.Reservas.id, models.Reservas.sala_id, models.Reservas.coordenador_id,
+        models.Reservas.data_reserva, models.Reservas.hora_inicio, models.Reservas.hora_fim
+    ).filter(*filtros).all()
+    if not ocorrencias:
+        raise HTTPException(status_code=404, detail="Série não encontrada")
+
+    valores = dados.model_dump(exclude_unset=True, exclude={"a_partir_de"}, exclude_none=True)
+    if not valores:
+        return get_serie(db, serie_id)
+
+    ids = frozenset(ocorrencia.id for ocorrencia in ocorrencias)
+    novas_posicoes = defaultdict(list)
+    for ocorrencia in ocorrencias:
+        sala_id = valores.get("sala_id", ocorrencia.sala_id)
+        hora_inicio = valores.get("hora_inicio", ocorrencia.hora_inicio)
+        hora_fim = valores.get("hora_fim", ocorrencia.hora_fim)
+        if hora_inicio >= hora_fim:
+            raise HTTPException(status_code=400, detail=ERRO_HORARIO)
+        novas_posicoes[(sala_id, hora_inicio, hora_fim)].append(ocorrencia.data_reserva)
+
+    if "sala_id" in valores:
+        for coordenador_id in {ocorrencia.coordenador_id for ocorrencia in ocorrencias}:
+            buscar_sala_reservavel(db, valores["sala_id"], coordenador_id)
+
+    intervalos = carregar_intervalos(db, {
+        (sala_id, data_reserva)
+        for (sala_id, _, _), datas in novas_posicoes.items()
+        for data_reserva in datas
+    })
+    conflitos = []
+    for (sala_id, hora_inicio, hora_fim), datas in novas_posicoes.items():
+        conflitos += _datas_em_conflito(intervalos, sala_id, datas, hora_inicio, hora_fim, ids)
+    if conflitos:
+        _erro_conflito_datas(sorted(conflitos))
+
+    try:
+        db.query(models.Reservas).filter(*filtros).update(
+            {**valores, models.Reservas.versao: models.Reservas.versao + 1}, synchronize_session=False
+        )
+        if config.OCUPACAO_ATIVA:
+            ocupacao.aplicar(db.connection(), [
+                linha
+                for ocorrencia in ocorrencias
+                for linha in (
+                    (ocorrencia.sala_id, ocorrencia.data_reserva, ocorrencia.hora_inicio, ocorrencia.hora_fim, -1),
+                    (valores.get("sala_id", ocorrencia.sala_id), ocorrencia.data_reserva,
+                     valores.get("hora_inicio", ocorrencia.hora_inicio), valores.get("hora_fim", ocorrencia.hora_fim), 1)
+                )
+            ])
+        eventos.registrar(db, [
+            eventos.evento("alterada", {**ocorrencia._asdict(), **valores, "serie_id": serie_id}, ocorrencia)
+            for ocorrencia in ocorrencias
+        ])
+        db.commit()
+    except SQLAlchemyError as e:
+        raise erro_ao_salvar(db, e)
+    return get_serie(db, serie_id)
+
+def get_serie(db: Session, serie_id: str) -> schemas.ReservaSerie:
+    reservas = db.query(models.Reservas).filter(models.Reservas.serie_id == serie_id).order_by(models.Reservas.data_reserva).all()
+    if not reservas:
+        raise HTTPException(status_code=404, detail="Série não encontrada")
+    return schemas.ReservaSerie(serie_id=serie_id, reservas=reservas)
+
+def delete_serie(db: Session, serie_id: str, a_partir_de: Optional[date] = None) -> List[Tuple[int, int, date]]:
+    """Cancela as ocorrências de uma série com um único DELETE; retorna (id, sala_id, data) das removidas."""
+    try:
+        removidas = db.execute(
+            delete(models.Reservas).where(*_filtro_serie(serie_id, a_partir_de)).returning(
+                models.Reservas.id, models.Reservas.sala_id, models.Reservas.data_reserva,
+                models.Reservas.hora_inicio, models.Reservas.hora_fim
+            )
+        ).all()
+        if config.OCUPACAO_ATIVA:
+            ocupacao.aplicar(db.connection(), [
+                (sala_id, data_reserva, hora_inicio, hora_fim, -1)
+                for _, sala_id, data_reserva, hora_inicio, hora_fim in removidas
+            ])
+        eventos.registrar(db, [eventos.evento("removida", {**linha._asdict(), "serie_id": serie_id}) for linha in removidas])
+        db.commit()
+    except SQLAlchemyError as e:
+        raise erro_ao_salvar(db, e)
+    if not removidas:
+        raise HTTPException(status_code=404, detail="Série não encontrada")
+    return [(reserva_id, sala_id, data_reserva) for reserva_id, sala_id, data_reserva, _, _ in removidas]
+
+def create_curso(db: Session, curso_data: schemas.CursoCreate):
+    curso = models.Cursos(nome=curso_data.nome)
+    return commit_and_refresh(db=db, entity=curso)
+
+
+def atualizar_parcial(db: Session, modelo, filtros: list, valores: dict, anteriores: Tuple[str, ...] = (),
+                      erro_integridade: Optional[str] = None):
+    """Executa `UPDATE ... WHERE <filtros> RETURNING *` e devolve (registro, valores anteriores), ou None se nada mudou.
+
+    No PostgreSQL os valores anteriores das colunas pedidas vêm do próprio UPDATE,
+    com a tabela repetida no FROM sob um alias (que enxerga a linha antes da
+    alteração). O SQLite não permite usar o FROM no RETURNING; lá eles são lidos
+    antes, na mesma transação.
+    """
+    tabela = modelo.__table__
+    sem_sincronizar = {"synchronize_session": False}
+    try:
+        if anteriores and db.get_bind().dialect.name == "postgresql":
+            antiga = tabela.alias("antiga")
+            comando = update(modelo).where(modelo.id == antiga.c.id, *filtros).values(**valores).returning(
+                modelo, *(antiga.c[coluna] for coluna in anteriores)
+            )
+            linha = db.execute(comando, execution_options=sem_sincronizar).first()
+            return (linha[0], tuple(linha[1:])) if linha else None
+
+        valores_anteriores: tuple = ()
+        if anteriores:
+            linha = db.execute(select(*(tabela.c[coluna] for coluna in anteriores)).where(*filtros)).first()
+            if linha is None:
+                return None
+            valores_anteriores = tuple(linha)
+        registro = db.scalars(
+            update(modelo).where(*filtros).values(**valores).returning(modelo), execution_options=sem_sincronizar
+        ).first()
+        return (registro, valores_anteriores) if registro is not None else None
+    except IntegrityError as e:
+        if erro_integridade and not violou_sobreposicao(e) and not violou_horario(e):
+            db.rollback()
+            raise HTTPException(status_code=400, detail=erro_integridade)
+        raise erro_ao_salvar(db, e)
+    except SQLAlchemyError as e:
+        raise erro_ao_salvar(db, e)
+
+def _patch_simples(db: Session, modelo, schema, registro_id: int, valores: dict, nao_encontrado: str,
+                   erro_integridade: Optional[str] = None):
+    if not valores:
+        registro = db.get(modelo, registro_id)
+    else:
+        resultado = atualizar_parcial(db, modelo, [modelo.id == registro_id], valores, erro_integridade=erro_integridade)
+        registro = resultado[0] if resultado else None
+    if registro is None:
+        raise HTTPException(status_code=404, detail=nao_encontrado)
+    # O schema é montado antes do commit, que expiraria o objeto e exigiria um novo SELECT.
+    resposta = schema.model_validate(registro)
+    db.commit()
+    return resposta
+
+def patch_curso(db: Session, curso_id: int, dados: schemas.CursoUpdate) -> schemas.Curso:
+    return _patch_simples(db, models.Cursos, schemas.Curso, curso_id, dados.model_dump(exclude_unset=True, exclude_none=True),
+                          "Curso não encontrado", "Erro: Já existe um curso com esse nome.")
+
+def patch_bloco(db: Session, bloco_id: int, dados: schemas.BlocoUpdate) -> schemas.Bloco:
+    return _patch_simples(db, models.Blocos, schemas.Bloco, bloco_id, dados.model_dump(exclude_unset=True, exclude_none=True),
+                          "Bloco não encontrado", "Erro: Nome de bloco já cadastrado ou curso inexistente.")
+
+def senha_atual(db: Session, coordenador_id: int) -> str:
+    senha = db.scalar(select(models.Coordenadores.senha).where(models.Coordenadores.id == coordenador_id))
+    if senha is None:
+        raise HTTPException(status_code=404, detail="Coordenador não encontrado")
+    return senha
+
+def update_coordenador(db: Session, coordenador_id: int, coordenador_data: schemas.CoordenadorCreate,
+                       senha_hash: Optional[str]) -> models.Coordenadores:
+    """PUT de coordenador; `senha_hash` None mantém a senha gravada."""
+    coordenador = db.get(models.Coordenadores, coordenador_id)
+    if not coordenador:
+        raise HTTPException(status_code=404, detail="Coordenador não encontrado")
+    coordenador.curso_id = coordenador_data.curso_id
+    coordenador.nome = coordenador_data.nome
+    coordenador.email = coordenador_data.email
+    if senha_hash is not None:
+        coordenador.senha = senha_hash
+    return commit_and_refresh(db=db, entity=coordenador)
+
+def patch_coordenador(db: Session, coordenador_id: int, dados: schemas.CoordenadorUpdate,
+                      senha_hash: Optional[str] = None) -> schemas.Coordenador:
+    """PATCH de coordenador; a senha enviada só é gravada pelo hash calculado na rota (`senha_hash`)."""
+    valores = dados.model_dump(exclude_unset=True, exclude_none=True, exclude={"senha"})
+    if senha_hash is not None:
+        valores["senha"] = senha_hash
+    return _patch_simples(db, models.Coordenadores, schemas.Coordenador, coordenador_id, valores,
+                          "Coordenador não encontrado", "Erro: Email já cadastrado ou curso inexistente.")
+
+def patch_sala(db: Session, sala_id: int, dados: schemas.SalaUpdate) -> schemas.Sala:
+    """PATCH de sala; ao trocar de bloco, o curso_id é herdado do novo bloco no mesmo UPDATE."""
+    valores = dados.model_dump(exclude_unset=True, exclude_none=True)
+    if not valores:
+        return _patch_simples(db, models.Salas, schemas.Sala, sala_id, valores, "Sala não encontrada")
+    anteriores: Tuple[str, ...] = ()
+    if "bloco_id" in valores:
+        # Bloco inexistente deixa curso_id nulo, o que o banco recusa.
+        valores["curso_id"] = select(models.Blocos.curso_id).where(models.Blocos.id == valores["bloco_id"]).scalar_subquery()
+        anteriores = ("bloco_id",)
+    resultado = atualizar_parcial(db, models.Salas, [models.Salas.id == sala_id], valores, anteriores, "Bloco não encontrado")
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Sala não encontrada")
+    sala, antigos = resultado
+    if antigos and config.OCUPACAO_ATIVA and antigos[0] != sala.bloco_id:
+        ocupacao.mover_sala(db, sala_id, antigos[0], sala.bloco_id)
+    if "recursos" in valores:
+        # O UPDATE em massa não passa pelo flush, que mantém as etiquetas nas demais escritas.
+        recursos.sincronizar(db.connection(), {sala_id: sala.recursos})
+    resposta = schemas.Sala.model_validate(sala)
+    db.commit()
+    return resposta
+
+def update_reserva(db: Session, reserva_id: int, reserva_data: schemas.ReservaCreate) -> Tuple[models.Reservas, Tuple[int, date]]:
+    """PUT de reserva; devolve a reserva e a sua posição anterior (sala, data)."""
+    reserva = db.query(models.Reservas).filter(models.Reservas.id == reserva_id).first()
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva não encontrada")
+
+    if (reserva.sala_id, reserva.coordenador_id) != (reserva_data.sala_id, reserva_data.coordenador_id):
+        buscar_sala_reservavel(db, reserva_data.sala_id, reserva_data.coordenador_id)
+
+    sala_anterior, data_anterior = reserva.sala_id, reserva.data_reserva
+    reserva.sala_id = reserva_data.sala_id
+    reserva.coordenador_id = reserva_data.coordenador_id
+    reserva.data_reserva = reserva_data.data_reserva
+    reserva.hora_inicio = reserva_data.hora_inicio
+    reserva.hora_fim = reserva_data.hora_fim
+    reserva.motivo = reserva_data.motivo
+    try:
+        db.commit()
+    except SQLAlchemyError as e:
+        raise erro_ao_salvar(db, e)
+    db.refresh(reserva)
+    return reserva, (sala_anterior, data_anterior)
+
+_CAMPOS_POSICAO = ("sala_id", "data_reserva", "hora_inicio", "hora_fim")
+
+def _recusa_patch_reserva(db: Session, reserva_id: int, dados: schemas.ReservaUpdate) -> HTTPException:
+    """Explica por que o UPDATE condicional não alterou nenhuma linha (lido só nesse caso)."""
+    atual = db.get(models.Reservas, reserva_id)
+    if atual is None:
+        return HTTPException(status_code=404, detail="Reserva não encontrada")
+    if dados.versao is not None and dados.versao != atual.versao:
+        return HTTPException(status_code=409, detail=ERRO_VERSAO)
+    if (dados.hora_inicio or atual.hora_inicio) >= (dados.hora_fim or atual.hora_fim):
+        return HTTPException(status_code=400, detail=ERRO_HORARIO)
+    try:
+        buscar_sala_reservavel(db, dados.sala_id or atual.sala_id, dados.coordenador_id or atual.coordenador_id)
+    except HTTPException as e:
+        return e
+    return HTTPException(status_code=409, detail=ERRO_VERSAO)
+
+def patch_reserva(db: Session, reserva_id: int, dados: schemas.ReservaUpdate) -> Tuple[schemas.Reserva, tuple]:
+    """PATCH de reserva com um único UPDATE condicional; devolve a reserva e a posição anterior (sala, data, horários).
+
+    A versão informada, o horário e a regra de exclusividade ficam no WHERE, e a
+    sobreposição é barrada pela restrição do banco; nenhuma leitura é feita antes.
+    """
+    valores = dados.model_dump(exclude_unset=True, exclude_none=True, exclude={"versao"})
+    filtros = [models.Reservas.id == reserva_id]
+    if dados.versao is not None:
+        filtros.append(models.Reservas.versao == dados.versao)
+
+    # Com os dois horários enviados, o schema já validou a ordem; com um só, ela é conferida no WHERE.
+    if ("hora_inicio" in valores) != ("hora_fim" in valores):
+        filtros.append(valores.get("hora_inicio", models.Reservas.hora_inicio) < valores.get("hora_fim", models.Reservas.hora_fim))
+
+    if "sala_id" in valores or "coordenador_id" in valores:
+        sala_id = valores.get("sala_id", models.Reservas.sala_id)
+        curso_do_coordenador = select(models.Coordenadores.curso_id).where(
+            models.Coordenadores.id == valores.get("coordenador_id", models.Reservas.coordenador_id)
+        ).scalar_subquery()
+        filtros.append(exists().where(
+            models.Salas.id == sala_id,
+            or_(models.Salas.exclusivo.is_(False), models.Salas.curso_id == curso_do_coordenador)
+        ))
+
+    valores["versao"] = models.Reservas.versao + 1
+    resultado = atualizar_parcial(db, models.Reservas, filtros, valores, _CAMPOS_POSICAO)
+    if resultado is None:
+        erro = _recusa_patch_reserva(db, reserva_id, dados)
+        db.rollback()
+        raise erro
+    reserva, anterior = resultado
+    atual = tuple(getattr(reserva, campo) for campo in _CAMPOS_POSICAO)
+    if config.OCUPACAO_ATIVA and anterior != atual:
+        ocupacao.aplicar(db.connection(), [(*anterior, -1), (*atual, 1)])
+    eventos.registrar(db, [eventos.evento("alterada", reserva, dict(zip(_CAMPOS_POSICAO, anterior)))])
+    resposta = schemas.Reserva.model_validate(reserva)
+    try:
+        db.commit()
+    except SQLAlchemyError as e:
+        raise erro_ao_salvar(db, e)
+    return resposta, anterior
@@ -0,0 +1,62 @@
+from datetime import date, time
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import config, crud, models, schemas
+from app.indice_reservas import indice
+
+# Versões assíncronas das funções de app/crud.py usadas pelas rotas em modo async.
+
+async def commit_and_refresh(db: AsyncSession, entity):
+    try:
+        db.add(entity)
+        await db.commit()
+        await db.refresh(entity)
+        return entity
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise crud.erro_do_banco(e)
+
+async def buscar_sala_reservavel(db: AsyncSession, sala_id: int, coordenador_id: int) -> models.Salas:
+    sala_a_ser_reservada = await db.get(models.Salas, sala_id)
+
+    if not sala_a_ser_reservada:
+        raise HTTPException(status_code=404, detail="Erro: Sala não encontrada.")
+
+    if sala_a_ser_reservada.exclusivo:
+
+        coordenador_reservando = await db.get(models.Coordenadores, coordenador_id)
+
+        if not coordenador_reservando or coordenador_reservando.curso_id != sala_a_ser_reservada.curso_id:
+            raise HTTPException(status_code=403, detail="Erro: Coordenador não possui permissão para reservar essa sala/laboratório.")
+
+    return sala_a_ser_reservada
+
+async def reserva_em_conflito(db: AsyncSession, sala_id: int, data: date, hora_inicio: time, hora_fim: time,
+                              ignorar_id: Optional[int] = None) -> bool:
+    """Como crud.reserva_em_conflito: só para consultas de disponibilidade, nunca para gravações."""
+    if config.INDICE_CONFLITOS_ATIVO:
+        if await indice.conflita_async(db, sala_id, data, hora_inicio, hora_fim, ignorar_id):
+            return True
+        if not config.INDICE_VERIFICAR_BANCO:
+            return False
+
+    query = select(models.Reservas.id).where(
+        models.Reservas.sala_id == sala_id,
+        models.Reservas.data_reserva == data,
+        models.Reservas.hora_inicio < hora_fim,
+        models.Reservas.hora_fim > hora_inicio
+    )
+    if ignorar_id is not None:
+        query = query.where(models.Reservas.id != ignorar_id)
+    return (await db.execute(query.limit(1))).first() is not None
+
+async def create_reserva(db: AsyncSession, reserva_data: schemas.ReservaCreate):
+    await buscar_sala_reservavel(db, reserva_data.sala_id, reserva_data.coordenador_id)
+
+    reserva = models.Reservas(**reserva_data.model_dump())
+    return await commit_and_refresh(db=db, entity=reserva)
@@ -0,0 +1,425 @@
+"""Feed de alterações de reservas (Server-Sent Events).
+
+Cada reserva criada, alterada ou removida vira um evento com a posição atual e,
+nas alterações, a anterior. As escritas pelo ORM são capturadas no flush; as
+escritas em massa (PATCH, séries, alocação, importação) chamam `registrar`.
+
+Os eventos só são publicados se a transação for confirmada. O broker leva os
+eventos a todos os workers: `memoria` publica após o commit, no próprio
+processo; `postgresql` usa NOTIFY dentro da transação (o banco só entrega após o
+commit) e cada worker recebe por LISTEN, invalidando também o seu índice de
+conflitos para as reservas alteradas em outros workers.
+
+Cada evento recebe um identificador ao ser registrado, enviado no campo `id` do
+SSE. O PostgreSQL entrega as notificações a todos os workers na ordem dos
+commits, então o histórico de cada worker (os últimos EVENTOS_HISTORICO) é um
+trecho da mesma sequência: um cliente reconectado a qualquer worker recebe só os
+eventos posteriores ao seu último `id`. Se o token não estiver no histórico
+(worker iniciado depois dele, histórico esgotado, broker `memoria` com outro
+worker) ou a fila do cliente encher, ele recebe `reinicio` e deve recarregar o
+estado pelas rotas REST.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import select as select_io
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app import config, models
+from app.indice_reservas import indice
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_RESERVA = ("id", "sala_id", "coordenador_id", "data_reserva", "hora_inicio", "hora_fim", "serie_id")
+CAMPOS_POSICAO = ("sala_id", "data_reserva", "hora_inicio", "hora_fim")
+_PENDENTES = "eventos_pendentes"
+
+
+def _valor(fonte, campo: str):
+    valor = fonte.get(campo) if isinstance(fonte, dict) else getattr(fonte, campo, None)
+    return valor.isoformat() if hasattr(valor, "isoformat") else valor
+
+
+def evento(tipo: str, reserva, anterior=None) -> dict:
+    """Monta o evento a partir de uma entidade, linha ou dicionário (`tipo`: criada, alterada ou removida)."""
+    dados = {"tipo": tipo, "reserva": {campo: _valor(reserva, campo) for campo in CAMPOS_RESERVA}}
+    if anterior is not None:
+        dados["anterior"] = {campo: _valor(anterior, campo) for campo in CAMPOS_POSICAO}
+    return dados
+
+
+def _preencher_blocos(sessao: Session, eventos: List[dict]):
+    posicoes = [dados["reserva"] for dados in eventos] + [dados["anterior"] for dados in eventos if "anterior" in dados]
+    blocos = {}
+    faltantes = set()
+    for sala_id in {posicao["sala_id"] for posicao in posicoes}:
+        # As salas costumam estar no identity map (buscar_sala_reservavel), o que evita uma consulta.
+        sala = sessao.identity_map.get(identity_key(models.Salas, sala_id))
+        bloco_id = inspect(sala).dict.get("bloco_id") if sala is not None else None
+        if bloco_id is None:
+            faltantes.add(sala_id)
+        else:
+            blocos[sala_id] = bloco_id
+    if faltantes:
+        blocos.update(sessao.connection().execute(
+            select(models.Salas.id, models.Salas.bloco_id).where(models.Salas.id.in_(faltantes))
+        ).all())
+    for posicao in posicoes:
+        posicao["bloco_id"] = blocos.get(posicao["sala_id"])
+
+
+def registrar(sessao: Session, eventos: List[dict]):
+    """Associa os eventos à transação da sessão; são publicados apenas se ela for confirmada."""
+    if not config.EVENTOS_ATIVOS or not eventos:
+        return
+    _preencher_blocos(sessao, eventos)
+    for dados in eventos:
+        dados["id"] = uuid.uuid4().hex[:16]
+        dados["origem"] = difusor.worker
+    broker.registrar(sessao, eventos)
+
+
+class Filtro:
+    def __init__(self, sala_id: Optional[int] = None, bloco_id: Optional[int] = None,
+                 data_inicio: Optional[date] = None, data_fim: Optional[date] = None):
+        self.sala_id = sala_id
+        self.bloco_id = bloco_id
+        self.data_inicio = data_inicio.isoformat() if data_inicio else None
+        self.data_fim = data_fim.isoformat() if data_fim else None
+
+    def _aceita_posicao(self, posicao: dict) -> bool:
+        return ((self.sala_id is None or posicao["sala_id"] == self.sala_id)
+                and (self.bloco_id is None or posicao.get("bloco_id") == self.bloco_id)
+                and (self.data_inicio is None or posicao["data_reserva"] >= self.data_inicio)
+                and (self.data_fim is None or posicao["data_reserva"] <= self.data_fim))
+
+    def aceita(self, dados: dict) -> bool:
+        """Uma alteração interessa tanto a quem acompanha a posição nova quanto a anterior."""
+        return self._aceita_posicao(dados["reserva"]) or ("anterior" in dados and self._aceita_posicao(dados["anterior"]))
+
+
+class Assinatura:
+    """Fila de um cliente conectado, consumida no event loop da requisição."""
+
+    def __init__(self, filtro: Filtro, loop: asyncio.AbstractEventLoop, maximo: int):
+        self.filtro = filtro
+        self.loop = loop
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=maximo)
+        self.reiniciar = False
+
+    def entregar(self, eventos: List[dict]):
+        # Roda no loop da assinatura (call_soon_threadsafe).
+        if self.reiniciar:
+            return
+        for dados in eventos:
+            if self.filtro.aceita(dados):
+                try:
+                    self.fila.put_nowait(dados)
+                except asyncio.QueueFull:
+                    self.sinalizar_reinicio()
+                    return
+
+    def sinalizar_reinicio(self):
+        self.reiniciar = True
+        try:
+            self.fila.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class Difusor:
+    """Distribui os eventos recebidos pelo broker às assinaturas deste worker e guarda os mais recentes.
+
+    O token de retomada é o `id` do último evento visto. Antes do primeiro evento
+    (ou logo após `reiniciar`), vale a `geracao` do histórico, que só este worker reconhece.
+    """
+
+    def __init__(self, historico: int = config.EVENTOS_HISTORICO):
+        self.worker = uuid.uuid4().hex[:8]
+        self.geracao = f"{self.worker}-0"
+        self._sequencia = 0
+        self._historico: deque = deque()
+        self._maximo = historico
+        # id do evento -> posição no histórico deste worker
+        self._posicoes: Dict[str, int] = {}
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+
+    def _atual(self) -> str:
+        return self._historico[-1][1]["id"] if self._historico else self.geracao
+
+    def receber(self, eventos: List[dict]):
+        with self._lock:
+            for dados in eventos:
+                self._sequencia += 1
+                self._historico.append((self._sequencia, dados))
+                self._posicoes[dados["id"]] = self._sequencia
+                if len(self._historico) > self._maximo:
+                    _, descartado = self._historico.popleft()
+                    self._posicoes.pop(descartado["id"], None)
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            self._chamar(assinatura, assinatura.entregar, eventos)
+        self._invalidar_indice(eventos)
+
+    def _invalidar_indice(self, eventos: List[dict]):
+        # Alterações feitas em outro worker não passaram pelo índice de conflitos deste.
+        chaves = {
+            (posicao["sala_id"], posicao["data_reserva"])
+            for dados in eventos if dados.get("origem") != self.worker
+            for posicao in (dados["reserva"], dados.get("anterior")) if posicao is not None
+        }
+        for sala_id, data_reserva in chaves:
+            indice.invalidar(sala_id=sala_id, data=date.fromisoformat(data_reserva))
+
+    def reiniciar(self):
+        """Descarta o histórico e invalida os tokens (usado quando eventos podem ter sido perdidos)."""
+        with self._lock:
+            self.geracao = f"{uuid.uuid4().hex[:8]}-0"
+            self._historico.clear()
+            self._posicoes.clear()
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            self._chamar(assinatura, assinatura.sinalizar_reinicio)
+        indice.invalidar()
+
+    @staticmethod
+    def _chamar(assinatura: Assinatura, funcao, *argumentos):
+        try:
+            assinatura.loop.call_soon_threadsafe(funcao, *argumentos)
+        except RuntimeError:
+            pass  # loop já encerrado; a assinatura é removida pelo gerador
+
+    def assinar(self, filtro: Filtro, token: Optional[str]) -> Tuple[Assinatura, str, Optional[List[dict]]]:
+        """Registra a assinatura; devolve também o token atual e os eventos perdidos desde `token`
+        (None quando não é possível atendê-lo)."""
+        assinatura = Assinatura(filtro, asyncio.get_running_loop(), config.EVENTOS_FILA_MAXIMA)
+        with self._lock:
+            self._assinaturas.add(assinatura)
+            atual = self._atual()
+            perdidos = self._desde(token) if token else []
+        if perdidos is not None:
+            perdidos = [dados for dados in perdidos if filtro.aceita(dados)]
+        return assinatura, atual, perdidos
+
+    def _desde(self, token: str) -> Optional[List[dict]]:
+        if token == self.geracao:
+            posicao = self._historico[0][0] - 1 if self._historico else self._sequencia
+        elif token in self._posicoes:
+            posicao = self._posicoes[token]
+        else:
+            return None
+        return [dados for sequencia, dados in self._historico if sequencia > posicao]
+
+    def cancelar(self, assinatura: Assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+
+difusor = Difusor()
+
+
+class BrokerEventos(ABC):
+    """Interface dos brokers: `registrar` recebe os eventos de uma transação ainda aberta
+    e deve fazê-los chegar a `difusor.receber` de todos os workers após o commit."""
+
+    def iniciar(self):
+        pass
+
+    @abstractmethod
+    def registrar(self, sessao: Session, eventos: List[dict]):
+        ...
+
+
+class BrokerMemoria(BrokerEventos):
+    """Entrega só aos clientes conectados a este processo; os eventos ficam na sessão até o commit."""
+
+    def registrar(self, sessao: Session, eventos: List[dict]):
+        transacao = sessao.get_nested_transaction() or sessao.get_transaction()
+        sessao.info.setdefault(_PENDENTES, []).append((transacao, eventos))
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar_pendentes(sessao):
+    if sessao.get_nested_transaction() is not None or _PENDENTES not in sessao.info:
+        return  # savepoint: os eventos esperam o commit da transação externa
+    pendentes = sessao.info.pop(_PENDENTES)
+    difusor.receber([dados for _, eventos in pendentes for dados in eventos])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_pendentes(sessao, transacao_desfeita):
+    pendentes = sessao.info.get(_PENDENTES)
+    if not pendentes:
+        return
+
+    def desfeita(transacao) -> bool:
+        while transacao is not None:
+            if transacao is transacao_desfeita:
+                return True
+            transacao = transacao.parent
+        return False
+
+    sessao.info[_PENDENTES] = [pendente for pendente in pendentes if not desfeita(pendente[0])]
+
+
+class BrokerPostgres(BrokerEventos):
+    """NOTIFY na transação da escrita e uma conexão dedicada em LISTEN por worker.
+
+    Enquanto a conexão de LISTEN está caída, eventos podem ser perdidos: ao
+    reconectar, o difusor é reiniciado (clientes recebem `reinicio`).
+    """
+
+    CANAL = "reservas_eventos"
+    # O payload do NOTIFY é limitado a 8000 bytes.
+    TAMANHO_MAXIMO = 7500
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._escutar, name="eventos-listen", daemon=True)
+                self._thread.start()
+
+    def _payloads(self, eventos: List[dict]) -> List[str]:
+        payloads, atual, tamanho = [], [], 2
+        for dados in eventos:
+            serializado = json.dumps(dados, separators=(",", ":"))
+            if atual and tamanho + len(serializado) + 1 > self.TAMANHO_MAXIMO:
+                payloads.append("[" + ",".join(atual) + "]")
+                atual, tamanho = [], 2
+            atual.append(serializado)
+            tamanho += len(serializado) + 1
+        if atual:
+            payloads.append("[" + ",".join(atual) + "]")
+        return payloads
+
+    def registrar(self, sessao: Session, eventos: List[dict]):
+        self.iniciar()
+        sessao.connection().execute(
+            text("SELECT pg_notify(:canal, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"canal": self.CANAL, "payloads": self._payloads(eventos)}
+        )
+
+    def _escutar(self):
+        from app.database import engine
+
+        primeira = True
+        while True:
+            try:
+                conexao = engine.raw_connection()
+                conexao.detach()  # fica fora do pool durante toda a vida do worker
+                dbapi = conexao.driver_connection
+                dbapi.autocommit = True
+                dbapi.cursor().execute(f"LISTEN {self.CANAL}")
+                if not primeira:
+                    difusor.reiniciar()
+                primeira = False
+                while True:
+                    if select_io.select([dbapi], [], [], 5) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        difusor.receber(json.loads(dbapi.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("Conexão de LISTEN dos eventos de reservas perdida; reconectando")
+                time.sleep(1)
+
+
+def criar_broker(nome: str = config.EVENTOS_BROKER) -> BrokerEventos:
+    """`auto` (postgresql se o banco for PostgreSQL, senão memoria), `memoria`, `postgresql`
+    ou o caminho de uma classe compatível com BrokerEventos (`pacote.modulo:Classe`)."""
+    if nome == "auto":
+        from app.database import engine
+
+        nome = "postgresql" if engine.dialect.name == "postgresql" else "memoria"
+    if nome == "memoria":
+        return BrokerMemoria()
+    if nome == "postgresql":
+        return BrokerPostgres()
+    modulo, _, classe = nome.partition(":")
+    return getattr(importlib.import_module(modulo), classe)()
+
+
+broker = criar_broker()
+
+
+def _anterior(estado, campo: str):
+    historico = estado.attrs[campo].history
+    return historico.deleted[0] if historico.deleted else getattr(estado.object, campo)
+
+
+@event.listens_for(Session, "after_flush")
+def _capturar_reservas(sessao, contexto):
+    if not config.EVENTOS_ATIVOS:
+        return
+    eventos = []
+    for reserva in sessao.new:
+        if isinstance(reserva, models.Reservas):
+            eventos.append(evento("criada", reserva))
+    for reserva in sessao.dirty:
+        if isinstance(reserva, models.Reservas) and sessao.is_modified(reserva):
+            estado = inspect(reserva)
+            eventos.append(evento("alterada", reserva, {campo: _anterior(estado, campo) for campo in CAMPOS_POSICAO}))
+    for reserva in sessao.deleted:
+        if isinstance(reserva, models.Reservas):
+            estado = inspect(reserva)
+            eventos.append(evento("removida", {campo: _anterior(estado, campo) for campo in CAMPOS_RESERVA}))
+    registrar(sessao, eventos)
+
+
+def _sse(nome: str, dados: Optional[dict] = None, token: Optional[str] = None) -> str:
+    linhas = []
+    if token is not None:
+        linhas.append(f"id: {token}")
+    linhas.append(f"event: {nome}")
+    linhas.append("data: " + json.dumps(dados or {}, separators=(",", ":")))
+    return "\n".join(linhas) + "\n\n"
+
+
+def _mensagem(dados: dict) -> str:
+    corpo = {chave: valor for chave, valor in dados.items() if chave not in ("id", "origem")}
+    return _sse(f"reserva.{dados['tipo']}", corpo, dados["id"])
+
+
+async def transmitir(filtro: Filtro, token: Optional[str]):
+    """Gerador do corpo SSE: eventos perdidos desde `token` (ou `reinicio`), depois os novos, com heartbeat."""
+    broker.iniciar()
+    assinatura, atual, perdidos = difusor.assinar(filtro, token)
+    try:
+        yield f"retry: {config.EVENTOS_RECONEXAO_MS}\n\n"
+        if perdidos is None:
+            yield _sse("reinicio", {"motivo": "token fora do histórico deste worker"}, atual)
+        else:
+            for dados in perdidos:
+                yield _mensagem(dados)
+            yield _sse("conectado", {}, atual)
+        while True:
+            try:
+                dados = await asyncio.wait_for(assinatura.fila.get(), config.EVENTOS_HEARTBEAT_SEGUNDOS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if assinatura.reiniciar:
+                # Fila cheia ou difusor reiniciado: o cliente recarrega e continua a partir daqui.
+                difusor.cancelar(assinatura)
+                assinatura, atual, _ = difusor.assinar(filtro, None)
+                yield _sse("reinicio", {"motivo": "eventos descartados"}, atual)
+                continue
+            yield _mensagem(dados)
+    finally:
+        difusor.cancelar(assinatura)
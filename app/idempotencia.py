@@ -0,0 +1,216 @@
+"""Idempotency-Key nas escritas (POST, PUT, PATCH e DELETE sob IDEMPOTENCIA_PREFIXOS).
+
+A primeira requisição com uma chave é executada e a sua resposta (exceto 422 e
+5xx) fica guardada por IDEMPOTENCIA_TTL_SEGUNDOS; as repetições recebem a mesma
+resposta, com `Idempotent-Replayed: true`, sem chegar às rotas nem ao banco.
+Repetições que chegam enquanto a original ainda está em andamento no mesmo
+worker esperam por ela em vez de executar de novo.
+
+A chave vale para um método e um caminho; reutilizá-la com outro corpo ou outra
+query string é recusado com 422, e enquanto a original está em andamento, com 409.
+"""
+import asyncio
+import hashlib
+import importlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app import config
+from app.metricas import idempotencia_requisicoes
+
+CABECALHO = b"idempotency-key"
+TAMANHO_MAXIMO_CHAVE = 255
+# Corpo inválido ou incompleto: a repetição com o corpo certo deve ser executada.
+STATUS_NAO_GUARDADO = 422
+DESCONECTADO = object()
+
+
+@dataclass
+class RespostaGuardada:
+    impressao: str
+    status: int
+    cabecalhos: List[Tuple[bytes, bytes]] = field(default_factory=list)
+    corpo: bytes = b""
+
+
+class BackendIdempotencia(ABC):
+    """Interface dos backends de respostas guardadas.
+
+    Só o backend em memória acompanha o projeto; um backend próprio compartilhado
+    entre workers (Redis...) estenderia as repetições a todos eles. O agrupamento
+    de requisições simultâneas é sempre por worker.
+    """
+
+    @abstractmethod
+    def obter(self, chave: str) -> Optional[RespostaGuardada]:
+        ...
+
+    @abstractmethod
+    def guardar(self, chave: str, resposta: RespostaGuardada):
+        ...
+
+
+class IdempotenciaMemoria(BackendIdempotencia):
+    """Backend em memória do processo, com descarte LRU e expiração por TTL."""
+
+    def __init__(self, max_entradas: int = config.IDEMPOTENCIA_MAX_ENTRADAS, ttl: float = config.IDEMPOTENCIA_TTL_SEGUNDOS):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str) -> Optional[RespostaGuardada]:
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return None
+            guardado_em, resposta = entrada
+            if time.monotonic() - guardado_em >= self.ttl:
+                del self._entradas[chave]
+                return None
+            self._entradas.move_to_end(chave)
+            return resposta
+
+    def guardar(self, chave: str, resposta: RespostaGuardada):
+        with self._lock:
+            self._entradas[chave] = (time.monotonic(), resposta)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+
+def criar_backend(nome: str = config.IDEMPOTENCIA_BACKEND) -> BackendIdempotencia:
+    """`memoria` ou o caminho de uma classe compatível com BackendIdempotencia (`pacote.modulo:Classe`)."""
+    if nome == "memoria":
+        return IdempotenciaMemoria()
+    modulo, _, classe = nome.partition(":")
+    return getattr(importlib.import_module(modulo), classe)()
+
+
+async def _enviar(send, status: int, cabecalhos: List[Tuple[bytes, bytes]], corpo: bytes):
+    await send({"type": "http.response.start", "status": status, "headers": cabecalhos})
+    await send({"type": "http.response.body", "body": corpo})
+
+
+async def _erro(send, status: int, detalhe: str):
+    await _enviar(send, status, [(b"content-type", b"application/json")], json.dumps({"detail": detalhe}).encode())
+
+
+async def _repetir(send, resposta: RespostaGuardada):
+    await _enviar(send, resposta.status, resposta.cabecalhos + [(b"idempotent-replayed", b"true")], resposta.corpo)
+
+
+async def _ler_corpo(receive, limite: int):
+    """Corpo completo da requisição, None se passar de `limite` bytes ou DESCONECTADO se o cliente caiu antes do fim."""
+    partes, tamanho = [], 0
+    while True:
+        mensagem = await receive()
+        if mensagem["type"] == "http.disconnect":
+            return DESCONECTADO
+        tamanho += len(mensagem.get("body", b""))
+        if tamanho > limite:
+            return None
+        partes.append(mensagem.get("body", b""))
+        if not mensagem.get("more_body", False):
+            return b"".join(partes)
+
+
+class IdempotenciaMiddleware:
+    METODOS = ("POST", "PUT", "PATCH", "DELETE")
+    # Uploads em massa, lidos à medida que chegam: não são bufferizados nem repetidos.
+    IGNORADAS = ("/importar",)
+
+    def __init__(self, app, backend: Optional[BackendIdempotencia] = None):
+        self.app = app
+        self.backend = backend or criar_backend()
+        # chave -> (impressão, futuro com a resposta da execução em andamento)
+        self._em_andamento: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not config.IDEMPOTENCIA_ATIVA or scope["method"] not in self.METODOS
+                or not scope["path"].startswith(config.IDEMPOTENCIA_PREFIXOS) or scope["path"].endswith(self.IGNORADAS)):
+            await self.app(scope, receive, send)
+            return
+        valor = dict(scope["headers"]).get(CABECALHO)
+        if valor is None:
+            await self.app(scope, receive, send)
+            return
+        if not valor or len(valor) > TAMANHO_MAXIMO_CHAVE:
+            await _erro(send, 400, f"Idempotency-Key deve ter entre 1 e {TAMANHO_MAXIMO_CHAVE} caracteres.")
+            return
+
+        corpo = await _ler_corpo(receive, config.IDEMPOTENCIA_MAX_CORPO_BYTES)
+        if corpo is DESCONECTADO:
+            return
+        if corpo is None:
+            await _erro(send, 413, f"Idempotency-Key não é aceita em corpos acima de {config.IDEMPOTENCIA_MAX_CORPO_BYTES} bytes.")
+            return
+        chave = f"{scope['method']} {scope['path']}:{valor.decode('latin-1')}"
+        impressao = hashlib.sha256(scope.get("query_string", b"") + b"\n" + corpo).hexdigest()
+
+        while True:
+            guardada = self.backend.obter(chave)
+            if guardada is not None:
+                if guardada.impressao != impressao:
+                    await _erro(send, 422, "Idempotency-Key já usada com outra requisição.")
+                    return
+                idempotencia_requisicoes.incrementar(resultado="repetida")
+                await _repetir(send, guardada)
+                return
+            andamento = self._em_andamento.get(chave)
+            if andamento is None:
+                break
+            impressao_original, futuro = andamento
+            if impressao_original != impressao:
+                await _erro(send, 409, "Idempotency-Key em uso por outra requisição ainda em andamento.")
+                return
+            resposta = await asyncio.shield(futuro)
+            if resposta is not None:
+                idempotencia_requisicoes.incrementar(resultado="agrupada")
+                await _repetir(send, resposta)
+                return
+            # A original não deixou resposta guardada: a próxima volta executa esta.
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_andamento[chave] = (impressao, futuro)
+        guardada = None
+        try:
+            resposta = await self._executar(scope, receive, send, corpo, impressao)
+            if resposta.status < 500 and resposta.status != STATUS_NAO_GUARDADO:
+                self.backend.guardar(chave, resposta)
+                guardada = resposta
+            idempotencia_requisicoes.incrementar(resultado="executada")
+        finally:
+            del self._em_andamento[chave]
+            # Quem esperava só reaproveita respostas guardadas; nos demais casos, executa a sua.
+            futuro.set_result(guardada)
+
+    async def _executar(self, scope, receive, send, corpo: bytes, impressao: str) -> RespostaGuardada:
+        """Executa a rota com o corpo já lido, repassando e guardando a resposta."""
+        resposta = RespostaGuardada(impressao, 500)
+        partes = []
+        entregue = False
+
+        async def receber():
+            nonlocal entregue
+            if not entregue:
+                entregue = True
+                return {"type": "http.request", "body": corpo, "more_body": False}
+            return await receive()
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                resposta.status = mensagem["status"]
+                resposta.cabecalhos = list(mensagem.get("headers", []))
+            elif mensagem["type"] == "http.response.body":
+                partes.append(mensagem.get("body", b""))
+            await send(mensagem)
+
+        await self.app(scope, receber, enviar)
+        resposta.corpo = b"".join(partes)
+        return resposta
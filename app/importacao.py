@@ -0,0 +1,385 @@
+"""Importação e exportação em massa (CSV ou NDJSON) de salas, coordenadores e reservas.
+
+    python -m app.importacao importar salas salas.csv
+    python -m app.importacao exportar reservas --formato csv > reservas.csv
+
+O arquivo é lido em pedaços e processado em lotes de IMPORTACAO_TAMANHO_LOTE
+linhas: cada lote é validado com os schemas `*Create`, tem as chaves estrangeiras
+resolvidas com uma consulta por tabela e é gravado com um INSERT de várias linhas
+e um commit. Linhas inválidas não interrompem a importação; elas voltam no
+relatório com o número da linha e o motivo.
+"""
+import argparse
+import codecs
+import csv
+import io
+import json
+import sys
+from typing import Callable, Dict, Iterable, Iterator, List, Literal, Optional, Tuple, Type
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import config, crud, eventos, models, ocupacao, recursos, schemas, senhas
+from app.cache import cache
+from app.database import Sessionlocal
+from app.indice_reservas import indice
+
+Formato = Literal["csv", "ndjson"]
+Registro = Tuple[int, dict]
+
+ERRO_SOBREPOSICAO = "Erro: A sala já está reservada para esse horário!"
+
+
+def formato_do_conteudo(content_type: Optional[str]) -> Formato:
+    return "csv" if content_type and "csv" in content_type else "ndjson"
+
+
+def _mensagem(erro: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(parte) for parte in detalhe['loc'])}: {detalhe['msg']}" for detalhe in erro.errors())
+
+
+class LeitorIncremental:
+    """Converte pedaços de bytes em (número da linha, campos), sem manter o arquivo em memória."""
+
+    def __init__(self, formato: Formato):
+        self.formato = formato
+        self.erros: List[schemas.ErroImportacao] = []
+        self._decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+        self._pendente = ""
+        self._registro = ""
+        self._inicio_registro = 0
+        self._linha = 0
+        self._cabecalho: Optional[List[str]] = None
+
+    def alimentar(self, pedaco: bytes) -> List[Registro]:
+        linhas = (self._pendente + self._decodificador.decode(pedaco)).split("\n")
+        self._pendente = linhas.pop()
+        return self._processar(linhas)
+
+    def finalizar(self) -> List[Registro]:
+        resto = self._pendente + self._decodificador.decode(b"", final=True)
+        self._pendente = ""
+        registros = self._processar([resto] if resto else [])
+        if self._registro:
+            self.erros.append(schemas.ErroImportacao(linha=self._inicio_registro, erro="Aspas não fechadas até o fim do arquivo."))
+        return registros
+
+    def _processar(self, linhas: List[str]) -> List[Registro]:
+        registros = []
+        for linha in linhas:
+            self._linha += 1
+            linha = linha.rstrip("\r")
+            if self.formato == "ndjson":
+                registro = self._ndjson(linha)
+            else:
+                registro = self._csv(linha)
+            if registro is not None:
+                registros.append(registro)
+        return registros
+
+    def _ndjson(self, linha: str) -> Optional[Registro]:
+        if not linha.strip():
+            return None
+        try:
+            dados = json.loads(linha)
+        except ValueError as e:
+            self.erros.append(schemas.ErroImportacao(linha=self._linha, erro=f"JSON inválido: {e}"))
+            return None
+        if not isinstance(dados, dict):
+            self.erros.append(schemas.ErroImportacao(linha=self._linha, erro="Cada linha deve conter um objeto JSON."))
+            return None
+        return self._linha, dados
+
+    def _csv(self, linha: str) -> Optional[Registro]:
+        if not self._registro:
+            if not linha.strip():
+                return None
+            self._inicio_registro = self._linha
+        self._registro += linha + "\n"
+        if self._registro.count('"') % 2:
+            return None  # campo entre aspas continua na próxima linha
+        registro, self._registro = self._registro, ""
+        campos = next(csv.reader(registro.splitlines(keepends=True)))
+        if self._cabecalho is None:
+            self._cabecalho = [campo.strip() for campo in campos]
+            return None
+        if len(campos) != len(self._cabecalho):
+            self.erros.append(schemas.ErroImportacao(
+                linha=self._inicio_registro, erro=f"Esperados {len(self._cabecalho)} campos, encontrados {len(campos)}."
+            ))
+            return None
+        # Campos vazios ficam de fora para que os valores padrão dos schemas se apliquem.
+        return self._inicio_registro, {nome: valor for nome, valor in zip(self._cabecalho, campos) if valor != ""}
+
+
+def _preparar_salas(db: Session, itens: List[Tuple[int, schemas.SalaCreate]], erros, estado) -> List[Registro]:
+    blocos = dict(db.query(models.Blocos.id, models.Blocos.curso_id).filter(
+        models.Blocos.id.in_({sala.bloco_id for _, sala in itens})
+    ).all())
+    linhas = []
+    for numero, sala in itens:
+        if sala.bloco_id not in blocos:
+            erros.append(schemas.ErroImportacao(linha=numero, erro="Bloco não encontrado"))
+        else:
+            linhas.append((numero, {**sala.model_dump(), "curso_id": blocos[sala.bloco_id]}))
+    return linhas
+
+
+def _preparar_coordenadores(db: Session, itens: List[Tuple[int, schemas.CoordenadorCreate]], erros, estado) -> List[Registro]:
+    cursos = {curso_id for (curso_id,) in db.query(models.Cursos.id).filter(
+        models.Cursos.id.in_({coordenador.curso_id for _, coordenador in itens})
+    )}
+    vistos = estado.setdefault("emails", set())
+    vistos.update(email for (email,) in db.query(models.Coordenadores.email).filter(
+        models.Coordenadores.email.in_({coordenador.email for _, coordenador in itens})
+    ))
+    aceitos = []
+    for numero, coordenador in itens:
+        if coordenador.curso_id not in cursos:
+            erros.append(schemas.ErroImportacao(linha=numero, erro="Curso não encontrado"))
+        elif coordenador.email in vistos:
+            erros.append(schemas.ErroImportacao(linha=numero, erro="Erro: Email já cadastrado!"))
+        else:
+            vistos.add(coordenador.email)
+            aceitos.append((numero, coordenador))
+    hashes = senhas.hash_senhas([coordenador.senha for _, coordenador in aceitos])
+    return [
+        (numero, {**coordenador.model_dump(), "senha": senha_hash})
+        for (numero, coordenador), senha_hash in zip(aceitos, hashes)
+    ]
+
+
+def _preparar_reservas(db: Session, itens: List[Tuple[int, schemas.ReservaCreate]], erros, estado) -> List[Registro]:
+    salas = {
+        sala_id: (curso_id, exclusivo)
+        for sala_id, curso_id, exclusivo in db.query(models.Salas.id, models.Salas.curso_id, models.Salas.exclusivo).filter(
+            models.Salas.id.in_({reserva.sala_id for _, reserva in itens})
+        )
+    }
+    coordenadores = dict(db.query(models.Coordenadores.id, models.Coordenadores.curso_id).filter(
+        models.Coordenadores.id.in_({reserva.coordenador_id for _, reserva in itens})
+    ).all())
+
+    validos = []
+    for numero, reserva in itens:
+        if reserva.sala_id not in salas:
+            erros.append(schemas.ErroImportacao(linha=numero, erro="Erro: Sala não encontrada."))
+        elif reserva.coordenador_id not in coordenadores:
+            erros.append(schemas.ErroImportacao(linha=numero, erro="Coordenador não encontrado"))
+        elif salas[reserva.sala_id][1] and coordenadores[reserva.coordenador_id] != salas[reserva.sala_id][0]:
+            erros.append(schemas.ErroImportacao(linha=numero, erro="Erro: Coordenador não possui permissão para reservar essa sala/laboratório."))
+        else:
+            validos.append((numero, reserva))
+
+    # Conflitos com o banco e entre as linhas do arquivo, resolvidos em memória na ordem do arquivo.
+    intervalos = crud.carregar_intervalos(db, {(reserva.sala_id, reserva.data_reserva) for _, reserva in validos})
+    linhas = []
+    for numero, reserva in validos:
+        dia = intervalos[(reserva.sala_id, reserva.data_reserva)]
+        if dia.conflita(reserva.hora_inicio, reserva.hora_fim):
+            erros.append(schemas.ErroImportacao(linha=numero, erro=ERRO_SOBREPOSICAO))
+            continue
+        dia.adicionar(-numero, reserva.hora_inicio, reserva.hora_fim)
+        linhas.append((numero, reserva.model_dump()))
+    return linhas
+
+
+def _depois_salas(db: Session, gravados: List[Registro]):
+    recursos.sincronizar_faltantes(db.connection())
+    cache.invalidar("salas")
+
+
+def _depois_reservas(db: Session, gravados: List[Registro]):
+    if config.OCUPACAO_ATIVA:
+        ocupacao.aplicar(db.connection(), [
+            (valores["sala_id"], valores["data_reserva"], valores["hora_inicio"], valores["hora_fim"], 1)
+            for _, valores in gravados
+        ])
+    # O INSERT em massa não devolve os ids: os eventos levam só a posição.
+    eventos.registrar(db, [eventos.evento("criada", valores) for _, valores in gravados])
+
+
+class Recurso:
+    def __init__(self, modelo, criacao: Type[BaseModel], leitura: Type[BaseModel],
+                 preparar: Callable, depois: Optional[Callable] = None):
+        self.modelo = modelo
+        self.criacao = criacao
+        self.leitura = leitura
+        self.preparar = preparar
+        self.depois = depois
+
+
+RECURSOS: Dict[str, Recurso] = {
+    "salas": Recurso(models.Salas, schemas.SalaCreate, schemas.Sala, _preparar_salas, _depois_salas),
+    "coordenadores": Recurso(models.Coordenadores, schemas.CoordenadorCreate, schemas.Coordenador, _preparar_coordenadores),
+    "reservas": Recurso(models.Reservas, schemas.ReservaCreate, schemas.Reserva, _preparar_reservas, _depois_reservas),
+}
+
+
+def _gravar(db: Session, modelo, linhas: List[Registro], erros: List[schemas.ErroImportacao]) -> List[Registro]:
+    """INSERT de várias linhas; se o banco recusar o lote, grava linha a linha para apontar as culpadas."""
+    if not linhas:
+        return []
+    try:
+        with db.begin_nested():
+            db.execute(insert(modelo), [valores for _, valores in linhas])
+        return linhas
+    except IntegrityError:
+        pass
+
+    gravados = []
+    for numero, valores in linhas:
+        try:
+            with db.begin_nested():
+                db.execute(insert(modelo), [valores])
+            gravados.append((numero, valores))
+        except IntegrityError as e:
+            erro = ERRO_SOBREPOSICAO if crud.violou_sobreposicao(e) else str(e.orig).splitlines()[0]
+            erros.append(schemas.ErroImportacao(linha=numero, erro=erro))
+    return gravados
+
+
+class Importacao:
+    """Estado de uma importação: o leitor incremental, os lotes pendentes e o relatório."""
+
+    def __init__(self, recurso: str, formato: Formato):
+        self.recurso = RECURSOS[recurso]
+        self.leitor = LeitorIncremental(formato)
+        self.importados = 0
+        self.erros: List[schemas.ErroImportacao] = []
+        self._estado: dict = {}
+        self._pendentes: List[Registro] = []
+
+    def _lotes(self, registros: List[Registro], final: bool = False) -> List[List[Registro]]:
+        self._pendentes += registros
+        tamanho = config.IMPORTACAO_TAMANHO_LOTE
+        lotes = []
+        while len(self._pendentes) >= tamanho or (final and self._pendentes):
+            lotes.append(self._pendentes[:tamanho])
+            self._pendentes = self._pendentes[tamanho:]
+        return lotes
+
+    def alimentar(self, pedaco: bytes) -> List[List[Registro]]:
+        """Lê um pedaço do arquivo e devolve os lotes completos prontos para `processar`."""
+        return self._lotes(self.leitor.alimentar(pedaco))
+
+    def finalizar(self) -> List[List[Registro]]:
+        return self._lotes(self.leitor.finalizar(), final=True)
+
+    def processar(self, db: Session, registros: List[Registro]):
+        erros: List[schemas.ErroImportacao] = []
+        validos = []
+        for numero, dados in registros:
+            try:
+                validos.append((numero, self.recurso.criacao.model_validate(dados)))
+            except ValidationError as e:
+                erros.append(schemas.ErroImportacao(linha=numero, erro=_mensagem(e)))
+
+        linhas = self.recurso.preparar(db, validos, erros, self._estado) if validos else []
+        gravados = _gravar(db, self.recurso.modelo, linhas, erros)
+        if gravados and self.recurso.depois is not None:
+            self.recurso.depois(db, gravados)
+        db.commit()
+        self.importados += len(gravados)
+        self.erros += erros
+
+    def concluir(self) -> schemas.ResultadoImportacao:
+        if self.recurso.modelo is models.Reservas and self.importados:
+            indice.invalidar()
+        erros = sorted(self.leitor.erros + self.erros, key=lambda erro: erro.linha)
+        return schemas.ResultadoImportacao(importados=self.importados, erros=erros)
+
+
+async def importar_requisicao(request: Request, recurso: str, formato: Optional[Formato], db: Session) -> schemas.ResultadoImportacao:
+    """Lê o corpo da requisição à medida que chega; cada lote é gravado no threadpool."""
+    importacao = Importacao(recurso, formato or formato_do_conteudo(request.headers.get("content-type")))
+    async for pedaco in request.stream():
+        for lote in importacao.alimentar(pedaco):
+            await run_in_threadpool(importacao.processar, db, lote)
+    for lote in importacao.finalizar():
+        await run_in_threadpool(importacao.processar, db, lote)
+    return importacao.concluir()
+
+
+def importar_arquivo(recurso: str, arquivo, formato: Formato, db: Session, tamanho_pedaco: int = 64 * 1024) -> schemas.ResultadoImportacao:
+    importacao = Importacao(recurso, formato)
+    for pedaco in iter(lambda: arquivo.read(tamanho_pedaco), b""):
+        for lote in importacao.alimentar(pedaco):
+            importacao.processar(db, lote)
+    for lote in importacao.finalizar():
+        importacao.processar(db, lote)
+    return importacao.concluir()
+
+
+def serializar(itens: Iterable, schema: Type[BaseModel], formato: Formato) -> Iterator[str]:
+    if formato == "ndjson":
+        for item in itens:
+            yield schema.model_validate(item).model_dump_json() + "\n"
+        return
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(schema.model_fields)
+    for item in itens:
+        escritor.writerow(schema.model_validate(item).model_dump(mode="json").values())
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _registros(consulta: Callable[[Session], object], modelo) -> Iterator:
+    # Sessão própria: a de `get_db` é fechada antes do corpo da resposta ser enviado.
+    db = Sessionlocal()
+    try:
+        for item in consulta(db).order_by(modelo.id).yield_per(config.STREAM_TAMANHO_LOTE):
+            yield item
+            db.expunge(item)
+    finally:
+        db.close()
+
+
+def exportar(consulta: Callable[[Session], object], modelo, schema: Type[BaseModel], formato: Formato,
+             nome: str) -> StreamingResponse:
+    """Transmite a tabela inteira em CSV ou NDJSON, lendo do banco em lotes."""
+    tipo = "text/csv" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        serializar(_registros(consulta, modelo), schema, formato), media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{formato}"'}
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.importacao", description=__doc__.splitlines()[0])
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    importar = comandos.add_parser("importar", help="Importa um arquivo CSV ou NDJSON")
+    importar.add_argument("recurso", choices=RECURSOS)
+    importar.add_argument("arquivo")
+    importar.add_argument("--formato", choices=["csv", "ndjson"], help="Padrão: pela extensão do arquivo")
+    exportar_parser = comandos.add_parser("exportar", help="Exporta a tabela para a saída padrão")
+    exportar_parser.add_argument("recurso", choices=RECURSOS)
+    exportar_parser.add_argument("--formato", choices=["csv", "ndjson"], default="ndjson")
+    argumentos = parser.parse_args()
+
+    recurso = RECURSOS[argumentos.recurso]
+    if argumentos.comando == "exportar":
+        for parte in serializar(_registros(lambda db: db.query(recurso.modelo), recurso.modelo), recurso.leitura, argumentos.formato):
+            sys.stdout.write(parte)
+        return
+
+    formato = argumentos.formato or ("csv" if argumentos.arquivo.lower().endswith(".csv") else "ndjson")
+    with open(argumentos.arquivo, "rb") as arquivo, Sessionlocal() as db:
+        resultado = importar_arquivo(argumentos.recurso, arquivo, formato, db)
+    print(resultado.model_dump_json(indent=2))
+    if resultado.erros:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import threading
+import time as relogio
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import date, time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import config, models
+
+Chave = Tuple[int, date]
+
+
+class IntervalosDia:
+    """Reservas de uma sala em um dia, ordenadas pelo horário de início.
+
+    `fim_max[i]` guarda o maior `hora_fim` entre as posições 0..i, o que permite
+    responder se há sobreposição com uma busca binária mesmo que existam
+    intervalos sobrepostos gravados anteriormente.
+
+    A consulta é O(log n); `adicionar` e `remover` são O(n), pelo deslocamento das
+    listas e pelo recálculo de `fim_max` a partir da posição alterada. Com a
+    restrição do banco, um dia de uma sala tem poucas dezenas de reservas, e as
+    listas saem mais baratas que uma árvore balanceada em Python.
+    """
+
+    def __init__(self, linhas: List[Tuple[int, time, time]], carregado_em: float):
+        linhas = sorted(linhas, key=lambda linha: (linha[1], linha[0]))
+        self.ids = [linha[0] for linha in linhas]
+        self.inicios = [linha[1] for linha in linhas]
+        self.fins = [linha[2] for linha in linhas]
+        self.fim_max: List[time] = []
+        self._recalcular_fim_max(0)
+        self.carregado_em = carregado_em
+
+    def _recalcular_fim_max(self, posicao: int):
+        del self.fim_max[posicao:]
+        for i in range(posicao, len(self.fins)):
+            anterior = self.fim_max[i - 1] if i > 0 else None
+            self.fim_max.append(self.fins[i] if anterior is None or self.fins[i] > anterior else anterior)
+
+    def conflita(self, hora_inicio: time, hora_fim: time, ignorar_id: Optional[int] = None) -> bool:
+        limite = bisect_left(self.inicios, hora_fim)
+        if limite == 0 or self.fim_max[limite - 1] <= hora_inicio:
+            return False
+        if ignorar_id is None:
+            return True
+        for i in range(limite - 1, -1, -1):
+            if self.fim_max[i] <= hora_inicio:
+                break
+            if self.fins[i] > hora_inicio and self.ids[i] != ignorar_id:
+                return True
+        return False
+
+    def adicionar(self, reserva_id: int, hora_inicio: time, hora_fim: time):
+        self.remover(reserva_id)
+        posicao = bisect_left(self.inicios, hora_inicio)
+        self.ids.insert(posicao, reserva_id)
+        self.inicios.insert(posicao, hora_inicio)
+        self.fins.insert(posicao, hora_fim)
+        self._recalcular_fim_max(posicao)
+
+    def remover(self, reserva_id: int):
+        if reserva_id not in self.ids:
+            return
+        posicao = self.ids.index(reserva_id)
+        del self.ids[posicao], self.inicios[posicao], self.fins[posicao]
+        self._recalcular_fim_max(posicao)
+
+
+class IndiceConflitos:
+    """Índice em memória das reservas por (sala, data), carregado sob demanda.
+
+    Cada chave expira após `INDICE_TTL_SEGUNDOS`, o que limita o tempo em que um
+    worker pode ficar desatualizado em relação às escritas feitas por outros
+    workers. Escritas feitas neste processo atualizam o índice imediatamente.
+    Por isso ele só responde consultas de disponibilidade; as gravações são
+    verificadas pela restrição do banco.
+    """
+
+    def __init__(self, ttl: float = config.INDICE_TTL_SEGUNDOS, max_chaves: int = config.INDICE_MAX_CHAVES):
+        self.ttl = ttl
+        self.max_chaves = max_chaves
+        self._dias: "OrderedDict[Chave, IntervalosDia]" = OrderedDict()
+        self._geracoes: Dict[Chave, int] = {}
+        self._epoca = 0
+        self._lock = threading.Lock()
+
+    def _consulta(self, chave: Chave):
+        sala_id, data = chave
+        return select(models.Reservas.id, models.Reservas.hora_inicio, models.Reservas.hora_fim).where(
+            models.Reservas.sala_id == sala_id,
+            models.Reservas.data_reserva == data
+        )
+
+    def _geracao(self, chave: Chave):
+        with self._lock:
+            return self._epoca, self._geracoes.get(chave, 0)
+
+    def _guardar(self, chave: Chave, geracao, linhas) -> IntervalosDia:
+        dia = IntervalosDia([tuple(linha) for linha in linhas], relogio.monotonic())
+        with self._lock:
+            # Uma escrita concorrente durante a carga deixa o resultado desatualizado.
+            if (self._epoca, self._geracoes.get(chave, 0)) == geracao:
+                self._dias[chave] = dia
+                self._dias.move_to_end(chave)
+                while len(self._dias) > self.max_chaves:
+                    self._dias.popitem(last=False)
+        return dia
+
+    def _carregado(self, db, chave: Chave, geracao, linhas) -> IntervalosDia:
+        # Leituras de réplica podem estar atrasadas: respondem à consulta, mas não entram no índice.
+        if db.info.get("replica"):
+            return IntervalosDia([tuple(linha) for linha in linhas], relogio.monotonic())
+        return self._guardar(chave, geracao, linhas)
+
+    def _em_memoria(self, chave: Chave) -> Optional[IntervalosDia]:
+        with self._lock:
+            dia = self._dias.get(chave)
+            if dia is not None and relogio.monotonic() - dia.carregado_em < self.ttl:
+                self._dias.move_to_end(chave)
+                return dia
+        return None
+
+    def conflita(self, db: Session, sala_id: int, data: date, hora_inicio: time, hora_fim: time,
+                 ignorar_id: Optional[int] = None) -> bool:
+        chave = (sala_id, data)
+        dia = self._em_memoria(chave)
+        if dia is None:
+            geracao = self._geracao(chave)
+            dia = self._carregado(db, chave, geracao, db.execute(self._consulta(chave)).all())
+        with self._lock:
+            return dia.conflita(hora_inicio, hora_fim, ignorar_id)
+
+    async def conflita_async(self, db: AsyncSession, sala_id: int, data: date, hora_inicio: time, hora_fim: time,
+                             ignorar_id: Optional[int] = None) -> bool:
+        chave = (sala_id, data)
+        dia = self._em_memoria(chave)
+        if dia is None:
+            geracao = self._geracao(chave)
+            dia = self._carregado(db, chave, geracao, (await db.execute(self._consulta(chave))).all())
+        with self._lock:
+            return dia.conflita(hora_inicio, hora_fim, ignorar_id)
+
+    def registrar(self, reserva: models.Reservas):
+        chave = (reserva.sala_id, reserva.data_reserva)
+        with self._lock:
+            self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+            dia = self._dias.get(chave)
+            if dia is not None:
+                dia.adicionar(reserva.id, reserva.hora_inicio, reserva.hora_fim)
+
+    def remover(self, reserva_id: int, sala_id: int, data: date):
+        chave = (sala_id, data)
+        with self._lock:
+            self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+            dia = self._dias.get(chave)
+            if dia is not None:
+                dia.remover(reserva_id)
+
+    def invalidar(self, sala_id: Optional[int] = None, data: Optional[date] = None):
+        """Descarta as chaves correspondentes (todas, se nenhum filtro for informado)."""
+        with self._lock:
+            self._epoca += 1
+            for chave in list(self._dias):
+                if (sala_id is None or chave[0] == sala_id) and (data is None or chave[1] == data):
+                    del self._dias[chave]
+            if sala_id is None and data is None:
+                self._geracoes.clear()
+
+
+indice = IndiceConflitos()
@@ -1,13 +1,38 @@
-from fastapi import FastAPI
-from app.routes import blocos, salas, coordenadores, cursos, reservas
-
-app = FastAPI(
-    title="Sistema de Reservas de Salas",
-    description="API para gerenciamento de blocos, salas e reservas.",
-)
-
-app.include_router(cursos.router)
-app.include_router(coordenadores.router)
-app.include_router(blocos.router)
-app.include_router(salas.router)
-app.include_router(reservas.router)
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from sqlalchemy import exc
+from app import admissao, config, eventos
+from app.database import AderenciaMiddleware
+from app.idempotencia import IdempotenciaMiddleware
+from app.metricas import MetricasMiddleware
+from app.routes import blocos, salas, coordenadores, cursos, reservas, reservas_async, metricas, ocupacao
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # O LISTEN começa já na subida: além do feed, ele invalida o índice de conflitos deste worker.
+    if config.EVENTOS_ATIVOS:
+        eventos.broker.iniciar()
+    yield
+
+app = FastAPI(
+    title="Sistema de Reservas de Salas",
+    description="API para gerenciamento de blocos, salas e reservas.",
+    lifespan=ciclo_de_vida,
+)
+
+app.add_middleware(IdempotenciaMiddleware)
+app.add_middleware(MetricasMiddleware)
+app.add_middleware(AderenciaMiddleware)
+app.add_exception_handler(exc.TimeoutError, admissao.pool_esgotado)
+
+if config.MODO_ASYNC:
+    app.include_router(reservas_async.router)
+
+app.include_router(cursos.router)
+app.include_router(coordenadores.router)
+app.include_router(blocos.router)
+app.include_router(salas.router)
+app.include_router(reservas.router)
+app.include_router(ocupacao.router)
+app.include_router(metricas.router)
@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histograma:
+    def __init__(self, nome: str, descricao: str, buckets=BUCKETS_SEGUNDOS):
+        self.nome = nome
+        self.descricao = descricao
+        self.buckets = buckets
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * len(self.buckets), 0.0, 0]
+            posicao = bisect_left(self.buckets, valor)
+            if posicao < len(self.buckets):
+                serie[0][posicao] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        yield f"# HELP {self.nome} {self.descricao}"
+        yield f"# TYPE {self.nome} histogram"
+        with self._lock:
+            series = [(chave, list(contagens), soma, total) for chave, (contagens, soma, total) in self._series.items()]
+        for chave, contagens, soma, total in series:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                yield f"{self.nome}_bucket{_rotulos(chave, le=limite)} {acumulado}"
+            yield f"{self.nome}_bucket{_rotulos(chave, le='+Inf')} {total}"
+            yield f"{self.nome}_sum{_rotulos(chave)} {soma}"
+            yield f"{self.nome}_count{_rotulos(chave)} {total}"
+
+
+class Contador:
+    def __init__(self, nome: str, descricao: str, tipo: str = "counter"):
+        self.nome = nome
+        self.descricao = descricao
+        self.tipo = tipo
+        self._valores: Dict[Tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def incrementar(self, valor: float = 1, **rotulos):
+        with self._lock:
+            self._valores[tuple(sorted(rotulos.items()))] += valor
+
+    def definir(self, valor: float, **rotulos):
+        with self._lock:
+            self._valores[tuple(sorted(rotulos.items()))] = valor
+
+    def exportar(self):
+        yield f"# HELP {self.nome} {self.descricao}"
+        yield f"# TYPE {self.nome} {self.tipo}"
+        with self._lock:
+            valores = list(self._valores.items())
+        for chave, valor in valores:
+            yield f"{self.nome}{_rotulos(chave)} {valor}"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(chave: Tuple, **extras) -> str:
+    pares = list(chave) + list(extras.items())
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+requisicoes_segundos = Histograma("http_requisicao_duracao_segundos", "Latência das requisições por rota.")
+consultas_por_requisicao = Histograma("db_consultas_por_requisicao", "Consultas SQL emitidas por requisição.", BUCKETS_CONSULTAS)
+consulta_segundos = Histograma("db_consulta_duracao_segundos", "Duração das consultas SQL.")
+pool_espera_segundos = Histograma("db_pool_espera_segundos", "Tempo até a sessão obter uma conexão do pool.")
+requisicoes_excessivas = Contador("db_requisicoes_acima_limite_consultas_total",
+                                  "Requisições com mais consultas que METRICAS_LIMITE_CONSULTAS (possível N+1).")
+pool_em_uso = Contador("db_pool_conexoes_em_uso", "Conexões do pool em uso no momento da coleta.", "gauge")
+cache_acertos = Contador("cache_acertos_total", "Respostas servidas pelo cache de listagens.")
+cache_falhas = Contador("cache_falhas_total", "Respostas geradas por falta no cache de listagens.")
+requisicoes_rejeitadas = Contador("http_requisicoes_rejeitadas_total",
+                                  "Requisições recusadas com 503 por falta de conexão livre no pool.")
+idempotencia_requisicoes = Contador("idempotencia_requisicoes_total",
+                                    "Requisições com Idempotency-Key: executadas, repetidas do armazenamento ou agrupadas a uma em andamento.")
+
+
+@dataclass
+class EstatisticasRequisicao:
+    consultas: int = 0
+    tempo_db: float = 0.0
+    espera_pool: float = 0.0
+
+
+_estatisticas: ContextVar[Optional[EstatisticasRequisicao]] = ContextVar("estatisticas_requisicao", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get("inicio_consultas")
+    if not inicios:
+        return
+    duracao = time.perf_counter() - inicios.pop()
+    estatisticas = _estatisticas.get()
+    if estatisticas is not None:
+        estatisticas.consultas += 1
+        estatisticas.tempo_db += duracao
+    consulta_segundos.observar(duracao)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _antes_de_executar(orm_execute_state):
+    orm_execute_state.session.info["inicio_execucao"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_begin")
+def _conexao_obtida(session, transaction, connection):
+    # after_begin dispara quando a transação obtém a conexão, logo após a primeira execução.
+    inicio = session.info.pop("inicio_execucao", None)
+    if inicio is None:
+        return
+    espera = time.perf_counter() - inicio
+    pool_espera_segundos.observar(espera)
+    estatisticas = _estatisticas.get()
+    if estatisticas is not None:
+        estatisticas.espera_pool += espera
+
+
+class MetricasMiddleware:
+    """Mede latência e consultas de cada requisição e adiciona o cabeçalho Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.METRICAS_ATIVAS:
+            await self.app(scope, receive, send)
+            return
+
+        estatisticas = EstatisticasRequisicao()
+        token = _estatisticas.set(estatisticas)
+        inicio = time.perf_counter()
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                total_ms = (time.perf_counter() - inicio) * 1000
+                cabecalho = (
+                    f'db;dur={estatisticas.tempo_db * 1000:.2f};desc="{estatisticas.consultas} consultas", '
+                    f"pool;dur={estatisticas.espera_pool * 1000:.2f}, app;dur={total_ms:.2f}"
+                )
+                mensagem["headers"] = list(mensagem.get("headers", [])) + [(b"server-timing", cabecalho.encode())]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _estatisticas.reset(token)
+            rota = getattr(scope.get("route"), "path", None) or "nao_encontrada"
+            requisicoes_segundos.observar(time.perf_counter() - inicio, metodo=scope["method"], rota=rota, status=status)
+            consultas_por_requisicao.observar(estatisticas.consultas, rota=rota)
+            if estatisticas.consultas > config.METRICAS_LIMITE_CONSULTAS:
+                requisicoes_excessivas.incrementar(rota=rota)
+                logger.warning("Possível N+1: %s %s executou %d consultas (limite %d)",
+                               scope["method"], rota, estatisticas.consultas, config.METRICAS_LIMITE_CONSULTAS)
+
+
+def exportar() -> str:
+    """Métricas deste processo no formato de texto do Prometheus."""
+    from app import database
+    from app.cache import cache
+
+    pool = database.engine.pool
+    if hasattr(pool, "checkedout"):
+        pool_em_uso.definir(pool.checkedout())
+    for recurso, valor in cache.acertos.items():
+        cache_acertos.definir(valor, recurso=recurso)
+    for recurso, valor in cache.falhas.items():
+        cache_falhas.definir(valor, recurso=recurso)
+
+    linhas = []
+    for metrica in (requisicoes_segundos, consultas_por_requisicao, consulta_segundos, pool_espera_segundos,
+                    requisicoes_excessivas, pool_em_uso, cache_acertos, cache_falhas, requisicoes_rejeitadas,
+                    idempotencia_requisicoes):
+        linhas.extend(metrica.exportar())
+    return "\n".join(linhas) + "\n"
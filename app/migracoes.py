@@ -0,0 +1,57 @@
+"""Atualiza bancos criados antes das colunas `serie_id` e `versao` de reservas.
+
+    python -m app.migracoes
+
+Acrescenta as colunas que faltam em `reservas` e `reservas_arquivo` (com os mesmos
+tipos e padrões dos modelos) e cria `ix_reservas_serie_id`. Pode ser executado
+mais de uma vez: o que já existe é mantido. Funciona no PostgreSQL (inclusive com
+`reservas` particionada) e no SQLite.
+"""
+import argparse
+from typing import List
+
+from sqlalchemy import inspect, text
+
+from app import models
+
+# (tabela, coluna, definição): NOT NULL só vale com DEFAULT, que preenche as linhas existentes.
+COLUNAS = [
+    (models.Reservas.__tablename__, "serie_id", "VARCHAR(36)"),
+    (models.Reservas.__tablename__, "versao", "INTEGER NOT NULL DEFAULT 1"),
+    (models.ReservasArquivo.__tablename__, "serie_id", "VARCHAR(36)"),
+    (models.ReservasArquivo.__tablename__, "versao", "INTEGER NOT NULL DEFAULT 1"),
+]
+INDICES = ["ix_reservas_serie_id"]
+
+
+def migrar(conexao) -> List[str]:
+    """Aplica as alterações que faltam e devolve a descrição de cada uma."""
+    inspetor = inspect(conexao)
+    tabelas = set(inspetor.get_table_names())
+    aplicadas = []
+    for tabela, coluna, definicao in COLUNAS:
+        if tabela not in tabelas or coluna in {existente["name"] for existente in inspetor.get_columns(tabela)}:
+            continue
+        conexao.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}"))
+        aplicadas.append(f"{tabela}.{coluna}")
+
+    existentes = {indice["name"] for indice in inspetor.get_indexes(models.Reservas.__tablename__)}
+    for indice in models.Reservas.__table__.indexes:
+        if indice.name in INDICES and indice.name not in existentes:
+            indice.create(conexao)
+            aplicadas.append(indice.name)
+    return aplicadas
+
+
+def main():
+    argparse.ArgumentParser(prog="python -m app.migracoes", description=__doc__.splitlines()[0]).parse_args()
+
+    from app.database import engine
+
+    with engine.begin() as conexao:
+        aplicadas = migrar(conexao)
+    print("Alterações aplicadas:", ", ".join(aplicadas) or "nenhuma")
+
+
+if __name__ == "__main__":
+    main()
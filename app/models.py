@@ -1,67 +1,151 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Time, Date, CheckConstraint, Boolean
-from sqlalchemy.orm import relationship
-from app.database import Base
-
-class Blocos(Base):
-    __tablename__ = "blocos"
-
-    id = Column(Integer, primary_key=True)
-    nome = Column(String(100), nullable=False, unique=True)
-    curso_id = Column(Integer, ForeignKey("cursos.id"), nullable=False)
-
-    curso = relationship("Cursos", back_populates="blocos")
-    salas = relationship("Salas", back_populates="bloco")
-
-class Salas(Base):
-    __tablename__ = "salas"
-
-    id = Column(Integer, primary_key=True)
-    bloco_id = Column(Integer, ForeignKey("blocos.id"), nullable=False, index=True)
-    curso_id = Column(Integer, ForeignKey("cursos.id"), nullable=False, index=True)
-    numero = Column(Integer, nullable=False)
-    capacidade = Column(Integer, nullable=False)
-    recursos = Column(String(100), nullable=False)
-    exclusivo = Column(Boolean, nullable=False, default=False)
-
-
-    bloco = relationship("Blocos", back_populates="salas")
-    curso = relationship("Cursos", back_populates="salas")
-    reservas = relationship("Reservas", back_populates="sala")
-
-    __table_args__ = (CheckConstraint('capacidade > 0', name='check_capacidade_positiva'),
-                      CheckConstraint('numero > 0', name='check_numero_positivo'))
-
-
-class Coordenadores(Base):
-    __tablename__ = "coordenadores"
-
-    id = Column(Integer, primary_key=True)
-    curso_id = Column(Integer, ForeignKey("cursos.id"), nullable=False)
-    nome = Column(String(100), nullable=False)
-    email = Column(String(100), nullable=False, unique=True)
-    senha = Column(String(255), nullable=False)
-
-    reservas = relationship("Reservas", back_populates="coordenador")
-
-class Reservas(Base):
-    __tablename__ = "reservas"
-
-    id = Column(Integer, primary_key=True)
-    sala_id = Column(Integer, ForeignKey("salas.id"), nullable=False, index=True)
-    coordenador_id = Column(Integer, ForeignKey("coordenadores.id"), nullable=False, index=True)
-    data_reserva = Column(Date, nullable=False)
-    hora_inicio = Column(Time, nullable=False)
-    hora_fim = Column(Time, nullable=False)
-    motivo = Column(String(100), nullable=False)
-
-    sala = relationship("Salas", back_populates="reservas")
-    coordenador = relationship("Coordenadores", back_populates="reservas")
-
-class Cursos(Base):
-    __tablename__ = "cursos"
-
-    id = Column(Integer, primary_key=True)
-    nome = Column(String(100), nullable=False, unique=True)
-
-    blocos = relationship("Blocos", back_populates="curso")
-    salas = relationship("Salas", back_populates="curso")
+from sqlalchemy import Column, ForeignKey, Integer, String, Time, Date, CheckConstraint, Boolean, Index, DDL, event, func
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+RESTRICAO_SOBREPOSICAO = "reservas_sem_sobreposicao"
+RESTRICAO_HORARIO = "check_horario_valido"
+
+class Blocos(Base):
+    __tablename__ = "blocos"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(100), nullable=False, unique=True)
+    curso_id = Column(Integer, ForeignKey("cursos.id"), nullable=False)
+
+    curso = relationship("Cursos", back_populates="blocos")
+    salas = relationship("Salas", back_populates="bloco")
+
+class Salas(Base):
+    __tablename__ = "salas"
+
+    id = Column(Integer, primary_key=True)
+    bloco_id = Column(Integer, ForeignKey("blocos.id"), nullable=False, index=True)
+    curso_id = Column(Integer, ForeignKey("cursos.id"), nullable=False, index=True)
+    numero = Column(Integer, nullable=False)
+    capacidade = Column(Integer, nullable=False, index=True)
+    # Texto livre informado pelo usuário; as etiquetas normalizadas ficam em salas_recursos (app/recursos.py).
+    recursos = Column(String(100), nullable=False)
+    exclusivo = Column(Boolean, nullable=False, default=False)
+
+
+    bloco = relationship("Blocos", back_populates="salas")
+    curso = relationship("Cursos", back_populates="salas")
+    reservas = relationship("Reservas", back_populates="sala")
+
+    __table_args__ = (CheckConstraint('capacidade > 0', name='check_capacidade_positiva'),
+                      CheckConstraint('numero > 0', name='check_numero_positivo'))
+
+# Etiquetas de recursos normalizadas, extraídas de Salas.recursos (app/recursos.py).
+class Recursos(Base):
+    __tablename__ = "recursos"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(100), nullable=False, unique=True)
+
+class SalasRecursos(Base):
+    __tablename__ = "salas_recursos"
+
+    # A chave começa pelo recurso: "salas com projetor" é uma busca por prefixo do índice.
+    recurso_id = Column(Integer, ForeignKey("recursos.id", ondelete="CASCADE"), primary_key=True)
+    sala_id = Column(Integer, ForeignKey("salas.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+class Coordenadores(Base):
+    __tablename__ = "coordenadores"
+
+    id = Column(Integer, primary_key=True)
+    curso_id = Column(Integer, ForeignKey("cursos.id"), nullable=False)
+    nome = Column(String(100), nullable=False)
+    email = Column(String(100), nullable=False, unique=True)
+    senha = Column(String(255), nullable=False)
+
+    reservas = relationship("Reservas", back_populates="coordenador")
+
+class Reservas(Base):
+    __tablename__ = "reservas"
+
+    id = Column(Integer, primary_key=True)
+    sala_id = Column(Integer, ForeignKey("salas.id"), nullable=False, index=True)
+    coordenador_id = Column(Integer, ForeignKey("coordenadores.id"), nullable=False, index=True)
+    data_reserva = Column(Date, nullable=False)
+    hora_inicio = Column(Time, nullable=False)
+    hora_fim = Column(Time, nullable=False)
+    motivo = Column(String(100), nullable=False)
+    serie_id = Column(String(36), nullable=True, index=True)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+
+    sala = relationship("Salas", back_populates="reservas")
+    coordenador = relationship("Coordenadores", back_populates="reservas")
+
+    __table_args__ = (Index('ix_reservas_sala_data_horario', 'sala_id', 'data_reserva', 'hora_inicio', 'hora_fim'),
+                      # Também evita que tsrange() falhe na restrição de exclusão com um intervalo invertido.
+                      CheckConstraint('hora_inicio < hora_fim', name=RESTRICAO_HORARIO),
+                      ExcludeConstraint((sala_id, '='),
+                                        (func.tsrange(data_reserva + hora_inicio, data_reserva + hora_fim), '&&'),
+                                        name=RESTRICAO_SOBREPOSICAO, using='gist').ddl_if(dialect='postgresql'))
+    # Controle de concorrência otimista: UPDATE/DELETE pelo ORM exigem a versão lida e a incrementam.
+    __mapper_args__ = {"version_id_col": versao}
+
+# No PostgreSQL a restrição de exclusão depende da extensão btree_gist (igualdade de inteiros no índice GiST).
+event.listen(Reservas.__table__, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"))
+
+# No SQLite (usado em testes) a mesma regra é garantida por triggers.
+_SOBREPOSICAO_SQLITE = """
+CREATE TRIGGER IF NOT EXISTS {nome}_{operacao} BEFORE {operacao_sql} ON reservas
+WHEN EXISTS (
+    SELECT 1 FROM reservas r
+    WHERE r.sala_id = NEW.sala_id AND r.data_reserva = NEW.data_reserva
+      AND r.hora_inicio < NEW.hora_fim AND r.hora_fim > NEW.hora_inicio{filtro}
+)
+BEGIN
+    SELECT RAISE(ABORT, '{nome}');
+END
+"""
+for _operacao, _operacao_sql, _filtro in (("insert", "INSERT", ""), ("update", "UPDATE OF sala_id, data_reserva, hora_inicio, hora_fim", " AND r.id <> NEW.id")):
+    event.listen(Reservas.__table__, "after_create", DDL(_SOBREPOSICAO_SQLITE.format(
+        nome=RESTRICAO_SOBREPOSICAO, operacao=_operacao, operacao_sql=_operacao_sql, filtro=_filtro
+    )).execute_if(dialect="sqlite"))
+
+class Cursos(Base):
+    __tablename__ = "cursos"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(100), nullable=False, unique=True)
+
+    blocos = relationship("Blocos", back_populates="curso")
+    salas = relationship("Salas", back_populates="curso")
+
+# Reservas de semestres encerrados, movidas para fora de `reservas` por `python -m app.particoes arquivar`.
+class ReservasArquivo(Base):
+    __tablename__ = "reservas_arquivo"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    sala_id = Column(Integer, ForeignKey("salas.id", ondelete="CASCADE"), nullable=False)
+    coordenador_id = Column(Integer, ForeignKey("coordenadores.id", ondelete="CASCADE"), nullable=False)
+    data_reserva = Column(Date, nullable=False, index=True)
+    hora_inicio = Column(Time, nullable=False)
+    hora_fim = Column(Time, nullable=False)
+    motivo = Column(String(100), nullable=False)
+    serie_id = Column(String(36), nullable=True)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (Index('ix_reservas_arquivo_sala_data', 'sala_id', 'data_reserva'),)
+
+# Agregados de ocupação mantidos incrementalmente a cada escrita em reservas (app/ocupacao.py).
+class OcupacaoSalaDia(Base):
+    __tablename__ = "ocupacao_sala_dia"
+
+    sala_id = Column(Integer, ForeignKey("salas.id", ondelete="CASCADE"), primary_key=True)
+    data = Column(Date, primary_key=True, index=True)
+    reservas = Column(Integer, nullable=False, default=0)
+    minutos = Column(Integer, nullable=False, default=0)
+
+class OcupacaoBlocoHora(Base):
+    __tablename__ = "ocupacao_bloco_hora"
+
+    bloco_id = Column(Integer, ForeignKey("blocos.id", ondelete="CASCADE"), primary_key=True)
+    data = Column(Date, primary_key=True)
+    hora = Column(Integer, primary_key=True)
+    minutos = Column(Integer, nullable=False, default=0)
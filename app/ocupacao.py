@@ -0,0 +1,315 @@
+"""Agregados de ocupação das salas.
+
+`ocupacao_sala_dia` guarda, por sala e dia, quantas reservas existem e quantos
+minutos estão reservados; `ocupacao_bloco_hora` guarda os minutos reservados em
+cada hora do dia, por bloco. As duas tabelas são atualizadas na mesma transação
+de cada escrita em `reservas`, somando deltas (o que mantém os valores corretos
+mesmo com escritas concorrentes), e podem ser recalculadas com:
+
+    python -m app.ocupacao [--inicio AAAA-MM-DD] [--fim AAAA-MM-DD]
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, and_, case, cast, delete, distinct, event, exists, extract, func, inspect, insert, literal, select, text, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app import agenda, config, models, schemas
+
+# (sala_id, data, hora_inicio, hora_fim, sinal)
+Linha = Tuple[int, date, time, time, int]
+
+_INSERT_DIALETO = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+_CAMPOS = ("sala_id", "data_reserva", "hora_inicio", "hora_fim")
+
+
+def minutos_por_hora(hora_inicio: time, hora_fim: time):
+    """Divide o intervalo em (hora, minutos reservados naquela hora)."""
+    inicio, fim = agenda.minutos(hora_inicio), agenda.minutos(hora_fim)
+    for hora in range(inicio // 60, -(-fim // 60)):
+        minutos = min(fim, (hora + 1) * 60) - max(inicio, hora * 60)
+        if minutos > 0:
+            yield hora, minutos
+
+
+def _somar(linhas: Iterable[Linha], blocos: Dict[int, int]):
+    salas: Dict[Tuple[int, date], List[int]] = defaultdict(lambda: [0, 0])
+    horas: Dict[Tuple[int, date, int], int] = defaultdict(int)
+    for sala_id, data_reserva, hora_inicio, hora_fim, sinal in linhas:
+        total = salas[(sala_id, data_reserva)]
+        total[0] += sinal
+        for hora, minutos in minutos_por_hora(hora_inicio, hora_fim):
+            total[1] += sinal * minutos
+            if sala_id in blocos:
+                horas[(blocos[sala_id], data_reserva, hora)] += sinal * minutos
+    return salas, horas
+
+
+def _upsert(conexao, modelo, linhas: List[dict], somar: Tuple[str, ...]):
+    if not linhas:
+        return
+    tabela = modelo.__table__
+    comando = _INSERT_DIALETO.get(conexao.dialect.name, postgresql.insert)(tabela)
+    comando = comando.on_conflict_do_update(
+        index_elements=[coluna.name for coluna in tabela.primary_key],
+        set_={coluna: tabela.c[coluna] + comando.excluded[coluna] for coluna in somar}
+    )
+    conexao.execute(comando, linhas)
+
+
+def _gravar(conexao, salas, horas):
+    _upsert(conexao, models.OcupacaoSalaDia, [
+        {"sala_id": sala_id, "data": data_reserva, "reservas": reservas, "minutos": minutos}
+        for (sala_id, data_reserva), (reservas, minutos) in salas.items() if reservas or minutos
+    ], ("reservas", "minutos"))
+    _upsert(conexao, models.OcupacaoBlocoHora, [
+        {"bloco_id": bloco_id, "data": data_reserva, "hora": hora, "minutos": minutos}
+        for (bloco_id, data_reserva, hora), minutos in horas.items() if minutos
+    ], ("minutos",))
+
+
+def aplicar(conexao, linhas: List[Linha], blocos: Optional[Dict[int, int]] = None):
+    """Soma (sinal 1) ou subtrai (sinal -1) as reservas informadas dos agregados."""
+    if not linhas:
+        return
+    blocos = dict(blocos or {})
+    faltantes = {linha[0] for linha in linhas} - blocos.keys()
+    if faltantes:
+        blocos.update(conexao.execute(
+            select(models.Salas.id, models.Salas.bloco_id).where(models.Salas.id.in_(faltantes))
+        ).all())
+    _gravar(conexao, *_somar(linhas, blocos))
+
+
+def mover_sala(db: Session, sala_id: int, bloco_antigo: int, bloco_novo: int):
+    """Transfere as horas reservadas da sala entre blocos quando ela muda de bloco."""
+    reservas = db.execute(select(*(getattr(models.Reservas, campo) for campo in _CAMPOS)).where(
+        models.Reservas.sala_id == sala_id
+    )).all()
+    _, saida = _somar([(*linha, -1) for linha in reservas], {sala_id: bloco_antigo})
+    _, entrada = _somar([(*linha, 1) for linha in reservas], {sala_id: bloco_novo})
+    _gravar(db.connection(), {}, {**saida, **entrada})
+
+
+def _anterior(estado, campo):
+    historico = estado.attrs[campo].history
+    return historico.deleted[0] if historico.deleted else getattr(estado.object, campo)
+
+
+def _linha(valores, sinal: int) -> Optional[Linha]:
+    if any(valor is None for valor in valores):
+        return None
+    return (*valores, sinal)
+
+
+@event.listens_for(Session, "after_flush")
+def _atualizar_agregados(sessao, contexto):
+    if not config.OCUPACAO_ATIVA:
+        return
+    linhas = []
+    for reserva in sessao.new:
+        if isinstance(reserva, models.Reservas):
+            linhas.append(_linha([getattr(reserva, campo) for campo in _CAMPOS], 1))
+    for reserva in sessao.deleted:
+        if isinstance(reserva, models.Reservas):
+            estado = inspect(reserva)
+            linhas.append(_linha([_anterior(estado, campo) for campo in _CAMPOS], -1))
+    for reserva in sessao.dirty:
+        if isinstance(reserva, models.Reservas):
+            estado = inspect(reserva)
+            if any(estado.attrs[campo].history.has_changes() for campo in _CAMPOS):
+                linhas.append(_linha([_anterior(estado, campo) for campo in _CAMPOS], -1))
+                linhas.append(_linha([getattr(reserva, campo) for campo in _CAMPOS], 1))
+    linhas = [linha for linha in linhas if linha is not None]
+    if not linhas:
+        return
+
+    # As salas costumam estar no identity map (buscar_sala_reservavel), o que evita uma consulta.
+    blocos = {}
+    for sala_id in {linha[0] for linha in linhas}:
+        sala = sessao.identity_map.get(identity_key(models.Salas, sala_id))
+        bloco_id = inspect(sala).dict.get("bloco_id") if sala is not None else None
+        if bloco_id is not None:
+            blocos[sala_id] = bloco_id
+    aplicar(sessao.connection(), linhas, blocos)
+
+
+def _horas_disponiveis(dias: int) -> float:
+    return dias * (agenda.FECHAMENTO - agenda.ABERTURA) / 60
+
+
+def utilizacao(db: Session, inicio: date, fim: date, agrupar_por: str = "sala", bloco_id: Optional[int] = None,
+               curso_id: Optional[int] = None) -> List[schemas.Utilizacao]:
+    """Horas reservadas x horas disponíveis no período, por sala, bloco ou curso."""
+    coluna = {"sala": models.Salas.id, "bloco": models.Salas.bloco_id, "curso": models.Salas.curso_id}[agrupar_por]
+    query = db.query(
+        coluna, func.count(distinct(models.Salas.id)),
+        func.coalesce(func.sum(models.OcupacaoSalaDia.reservas), 0),
+        func.coalesce(func.sum(models.OcupacaoSalaDia.minutos), 0)
+    ).outerjoin(models.OcupacaoSalaDia, and_(
+        models.OcupacaoSalaDia.sala_id == models.Salas.id,
+        models.OcupacaoSalaDia.data >= inicio,
+        models.OcupacaoSalaDia.data <= fim
+    ))
+    if bloco_id is not None:
+        query = query.filter(models.Salas.bloco_id == bloco_id)
+    if curso_id is not None:
+        query = query.filter(models.Salas.curso_id == curso_id)
+
+    por_sala = _horas_disponiveis((fim - inicio).days + 1)
+    resultado = []
+    for identificador, salas, reservas, minutos in query.group_by(coluna).order_by(coluna):
+        disponiveis = salas * por_sala
+        resultado.append(schemas.Utilizacao(
+            id=identificador, salas=salas, reservas=reservas, horas_reservadas=round(minutos / 60, 2),
+            horas_disponiveis=round(disponiveis, 2),
+            taxa_ocupacao=round(minutos / 60 / disponiveis, 4) if disponiveis else 0.0
+        ))
+    return resultado
+
+
+def picos(db: Session, inicio: date, fim: date, bloco_id: Optional[int] = None, curso_id: Optional[int] = None,
+          limite: int = 10) -> List[schemas.PicoOcupacao]:
+    """Faixas (dia da semana, hora) com maior taxa de ocupação no período."""
+    filtros_salas = []
+    if bloco_id is not None:
+        filtros_salas.append(models.Salas.bloco_id == bloco_id)
+    if curso_id is not None:
+        filtros_salas.append(models.Salas.curso_id == curso_id)
+    salas = db.query(func.count(models.Salas.id)).filter(*filtros_salas).scalar()
+    if not salas:
+        return []
+
+    query = db.query(
+        models.OcupacaoBlocoHora.data, models.OcupacaoBlocoHora.hora, func.sum(models.OcupacaoBlocoHora.minutos)
+    ).filter(models.OcupacaoBlocoHora.data >= inicio, models.OcupacaoBlocoHora.data <= fim)
+    if bloco_id is not None:
+        query = query.filter(models.OcupacaoBlocoHora.bloco_id == bloco_id)
+    if curso_id is not None:
+        query = query.join(models.Blocos, models.Blocos.id == models.OcupacaoBlocoHora.bloco_id).filter(
+            models.Blocos.curso_id == curso_id
+        )
+
+    minutos: Dict[Tuple[int, int], int] = defaultdict(int)
+    for data_reserva, hora, total in query.group_by(models.OcupacaoBlocoHora.data, models.OcupacaoBlocoHora.hora):
+        minutos[(data_reserva.weekday(), hora)] += total
+
+    dias_da_semana: Dict[int, int] = defaultdict(int)
+    for deslocamento in range((fim - inicio).days + 1):
+        dias_da_semana[(inicio + timedelta(days=deslocamento)).weekday()] += 1
+
+    faixas = [
+        schemas.PicoOcupacao(
+            dia_semana=dia_semana, hora=time(hora), horas_reservadas=round(total / 60, 2),
+            taxa_ocupacao=round(total / (salas * dias_da_semana[dia_semana] * 60), 4)
+        )
+        for (dia_semana, hora), total in minutos.items() if total > 0
+    ]
+    faixas.sort(key=lambda faixa: (-faixa.taxa_ocupacao, faixa.dia_semana, faixa.hora))
+    return faixas[:limite]
+
+
+def ociosas(db: Session, inicio: date, fim: date, bloco_id: Optional[int] = None,
+            curso_id: Optional[int] = None) -> List[models.Salas]:
+    """Salas sem nenhuma reserva no período."""
+    usada = exists().where(
+        models.OcupacaoSalaDia.sala_id == models.Salas.id,
+        models.OcupacaoSalaDia.data >= inicio,
+        models.OcupacaoSalaDia.data <= fim,
+        models.OcupacaoSalaDia.reservas > 0
+    )
+    query = db.query(models.Salas).filter(~usada)
+    if bloco_id is not None:
+        query = query.filter(models.Salas.bloco_id == bloco_id)
+    if curso_id is not None:
+        query = query.filter(models.Salas.curso_id == curso_id)
+    return query.order_by(models.Salas.id).all()
+
+
+def _minutos(coluna):
+    """Minutos desde a meia-noite de uma coluna de horário, calculados no banco."""
+    return cast(extract("hour", coluna), Integer) * 60 + cast(extract("minute", coluna), Integer)
+
+
+def _bloquear_reservas(db: Session):
+    """Impede escritas em reservas até o fim da transação do recálculo.
+
+    No PostgreSQL, com LOCK ... IN SHARE MODE: quem grava espera o recálculo e só então
+    soma o seu delta sobre os agregados novos. No SQLite, o primeiro DELETE já obtém a
+    trava de escrita do banco inteiro.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"LOCK TABLE {models.Reservas.__tablename__}, {models.ReservasArquivo.__tablename__} IN SHARE MODE"))
+
+
+def reconstruir(db: Session, inicio: Optional[date] = None, fim: Optional[date] = None) -> dict:
+    """Recalcula os agregados do período (ou de todo o histórico) a partir de `reservas` e do arquivo.
+
+    Cada tabela é recalculada por um único INSERT ... SELECT ... GROUP BY, sem trazer
+    as reservas para a aplicação; as horas por bloco saem de um produto com as 24
+    horas do dia. As escritas em reservas ficam bloqueadas até o commit.
+    """
+    filtros_salas, filtros_blocos = [], []
+    if inicio is not None:
+        filtros_salas.append(models.OcupacaoSalaDia.data >= inicio)
+        filtros_blocos.append(models.OcupacaoBlocoHora.data >= inicio)
+    if fim is not None:
+        filtros_salas.append(models.OcupacaoSalaDia.data <= fim)
+        filtros_blocos.append(models.OcupacaoBlocoHora.data <= fim)
+
+    _bloquear_reservas(db)
+    db.execute(delete(models.OcupacaoSalaDia).where(*filtros_salas))
+    db.execute(delete(models.OcupacaoBlocoHora).where(*filtros_blocos))
+
+    # As reservas arquivadas continuam contando no histórico de ocupação.
+    consultas = []
+    for origem in (models.Reservas, models.ReservasArquivo):
+        filtros_reservas = []
+        if inicio is not None:
+            filtros_reservas.append(origem.data_reserva >= inicio)
+        if fim is not None:
+            filtros_reservas.append(origem.data_reserva <= fim)
+        consultas.append(select(
+            origem.sala_id, models.Salas.bloco_id, origem.data_reserva.label("data"),
+            _minutos(origem.hora_inicio).label("inicio"), _minutos(origem.hora_fim).label("fim")
+        ).join(models.Salas, models.Salas.id == origem.sala_id).where(*filtros_reservas))
+    reservas = union_all(*consultas).subquery()
+
+    salas_dia = db.execute(insert(models.OcupacaoSalaDia).from_select(
+        ["sala_id", "data", "reservas", "minutos"],
+        select(reservas.c.sala_id, reservas.c.data, func.count(), func.sum(reservas.c.fim - reservas.c.inicio))
+        .group_by(reservas.c.sala_id, reservas.c.data)
+    )).rowcount
+
+    horas = union_all(*(select(literal(hora, Integer).label("hora")) for hora in range(24))).subquery()
+    comeco, final = horas.c.hora * 60, horas.c.hora * 60 + 60
+    minutos = (case((reservas.c.fim < final, reservas.c.fim), else_=final)
+               - case((reservas.c.inicio > comeco, reservas.c.inicio), else_=comeco))
+    blocos_hora = db.execute(insert(models.OcupacaoBlocoHora).from_select(
+        ["bloco_id", "data", "hora", "minutos"],
+        select(reservas.c.bloco_id, reservas.c.data, horas.c.hora, func.sum(minutos))
+        .select_from(reservas).join(horas, and_(reservas.c.inicio < final, reservas.c.fim > comeco))
+        .group_by(reservas.c.bloco_id, reservas.c.data, horas.c.hora)
+    )).rowcount
+    db.commit()
+    return {"salas_dia": salas_dia, "blocos_hora": blocos_hora}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.ocupacao", description="Recalcula os agregados de ocupação.")
+    parser.add_argument("--inicio", type=date.fromisoformat, help="Primeira data recalculada (padrão: todo o histórico)")
+    parser.add_argument("--fim", type=date.fromisoformat, help="Última data recalculada")
+    argumentos = parser.parse_args()
+
+    from app.database import Sessionlocal
+
+    with Sessionlocal() as db:
+        print(reconstruir(db, argumentos.inicio, argumentos.fim))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+from typing import Callable, Literal, Optional, Type
+
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query as ConsultaORM, Session
+
+from app import config, serializacao
+from app.database import Sessionlocal, sessionlocal_async
+
+CABECALHO_PROXIMO_CURSOR = "X-Proximo-Cursor"
+
+
+class Paginacao:
+    """Parâmetros comuns das listagens: cursor (`apos_id`), tamanho da página e formato."""
+
+    def __init__(
+        self,
+        apos_id: Optional[int] = Query(None, description="Retorna apenas registros com id maior que este (cursor da página anterior)"),
+        limite: int = Query(config.PAGINACAO_LIMITE_PADRAO, gt=0, le=config.PAGINACAO_LIMITE_MAXIMO),
+        formato: Literal["json", "ndjson"] = Query("json", description="ndjson transmite todos os registros em lotes, sem paginação"),
+    ):
+        self.apos_id = apos_id
+        self.limite = limite
+        self.formato = formato
+
+
+def listar(consulta: Callable[[Session], ConsultaORM], modelo, schema: Type[BaseModel], db: Session,
+           response: Response, pagina: Paginacao):
+    """Executa a listagem paginada por id ou, no formato ndjson, devolve um streaming."""
+    if pagina.formato == "ndjson":
+        return stream_ndjson(consulta, modelo, schema, pagina.apos_id, db.get_bind())
+
+    query = consulta(db)
+    if pagina.apos_id is not None:
+        query = query.filter(modelo.id > pagina.apos_id)
+    itens = query.order_by(modelo.id).limit(pagina.limite + 1).all()
+    if len(itens) > pagina.limite:
+        itens = itens[:pagina.limite]
+        response.headers[CABECALHO_PROXIMO_CURSOR] = str(itens[-1].id)
+    return itens
+
+
+def listar_linhas(consulta: Callable[[Session], ConsultaORM], modelo, schema: Type[BaseModel], db: Session,
+                  pagina: Paginacao) -> Response:
+    """`listar` no formato json lendo só as colunas do schema e serializando-as direto (JSON_RAPIDO)."""
+    query = consulta(db).with_entities(*serializacao.colunas(modelo, schema))
+    if pagina.apos_id is not None:
+        query = query.filter(modelo.id > pagina.apos_id)
+    linhas = query.order_by(modelo.id).limit(pagina.limite + 1).all()
+    return _pagina_linhas(linhas, schema, pagina)
+
+
+def _pagina_linhas(linhas: list, schema: Type[BaseModel], pagina: Paginacao) -> Response:
+    cabecalhos = {}
+    if len(linhas) > pagina.limite:
+        linhas = linhas[:pagina.limite]
+        cabecalhos[CABECALHO_PROXIMO_CURSOR] = str(linhas[-1].id)
+    return serializacao.resposta_linhas(linhas, schema, cabecalhos)
+
+
+def stream_ndjson(consulta: Callable[[Session], ConsultaORM], modelo, schema: Type[BaseModel],
+                  apos_id: Optional[int] = None, bind=None) -> StreamingResponse:
+    """Transmite uma linha JSON por registro, lendo do banco em lotes com cursor no servidor.
+
+    A sessão é aberta dentro do gerador porque a de `get_db` é fechada antes do
+    corpo da resposta ser enviado; `bind` mantém o banco (primário ou réplica) escolhido para ela.
+    """
+    def gerar():
+        db = Sessionlocal(bind=bind) if bind is not None else Sessionlocal()
+        try:
+            query = consulta(db)
+            if apos_id is not None:
+                query = query.filter(modelo.id > apos_id)
+            for item in query.order_by(modelo.id).yield_per(config.STREAM_TAMANHO_LOTE):
+                yield schema.model_validate(item).model_dump_json() + "\n"
+                db.expunge(item)
+        finally:
+            db.close()
+
+    return StreamingResponse(gerar(), media_type="application/x-ndjson")
+
+
+async def listar_async(consulta: Select, modelo, schema: Type[BaseModel], db: AsyncSession,
+                       response: Response, pagina: Paginacao):
+    """Equivalente de `listar` para as rotas em modo async."""
+    if pagina.apos_id is not None:
+        consulta = consulta.where(modelo.id > pagina.apos_id)
+    if pagina.formato == "ndjson":
+        return stream_ndjson_async(consulta, modelo, schema, db.bind)
+
+    itens = (await db.scalars(consulta.order_by(modelo.id).limit(pagina.limite + 1))).all()
+    if len(itens) > pagina.limite:
+        itens = itens[:pagina.limite]
+        response.headers[CABECALHO_PROXIMO_CURSOR] = str(itens[-1].id)
+    return itens
+
+
+async def listar_linhas_async(consulta: Select, modelo, schema: Type[BaseModel], db: AsyncSession,
+                              pagina: Paginacao) -> Response:
+    """Equivalente de `listar_linhas` para as rotas em modo async."""
+    consulta = consulta.with_only_columns(*serializacao.colunas(modelo, schema))
+    if pagina.apos_id is not None:
+        consulta = consulta.where(modelo.id > pagina.apos_id)
+    linhas = (await db.execute(consulta.order_by(modelo.id).limit(pagina.limite + 1))).all()
+    return _pagina_linhas(linhas, schema, pagina)
+
+
+def stream_ndjson_async(consulta: Select, modelo, schema: Type[BaseModel], bind=None) -> StreamingResponse:
+    async def gerar():
+        async with sessionlocal_async()(**({"bind": bind} if bind is not None else {})) as db:
+            resultado = await db.stream_scalars(
+                consulta.order_by(modelo.id).execution_options(yield_per=config.STREAM_TAMANHO_LOTE)
+            )
+            async for item in resultado:
+                yield schema.model_validate(item).model_dump_json() + "\n"
+                db.expunge(item)
+
+    return StreamingResponse(gerar(), media_type="application/x-ndjson")
@@ -0,0 +1,237 @@
+"""Particionamento mensal de `reservas` (PostgreSQL) e arquivamento de semestres encerrados.
+
+    python -m app.particoes converter              # transforma `reservas` em tabela particionada (uma vez)
+    python -m app.particoes criar [--meses N]      # cria as partições mensais dos próximos N meses
+    python -m app.particoes arquivar [--ate DATA]  # move para reservas_arquivo o que ocorreu até DATA
+
+Cada partição recebe a sua própria restrição de exclusão: como uma reserva começa
+e termina no mesmo dia, duas reservas que se sobrepõem estão sempre na mesma partição.
+"""
+import argparse
+import re
+import time as relogio
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, func, insert, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from app import config, models
+
+PARTICAO_PADRAO = "reservas_padrao"
+_EXCLUSAO = ("EXCLUDE USING gist (sala_id WITH =, "
+             "tsrange(data_reserva + hora_inicio, data_reserva + hora_fim) WITH &&)")
+_COLUNAS = [coluna.name for coluna in models.Reservas.__table__.columns]
+_NOME_PARTICAO = re.compile(r"^reservas_(\d{4})_(\d{2})$")
+
+DDL_RESERVAS_PARTICIONADA = [
+    """CREATE TABLE reservas (
+    id INTEGER NOT NULL DEFAULT nextval('reservas_id_seq'),
+    sala_id INTEGER NOT NULL,
+    coordenador_id INTEGER NOT NULL,
+    data_reserva DATE NOT NULL,
+    hora_inicio TIME NOT NULL,
+    hora_fim TIME NOT NULL,
+    motivo VARCHAR(100) NOT NULL,
+    serie_id VARCHAR(36),
+    versao INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (id, data_reserva),
+    CONSTRAINT check_horario_valido CHECK (hora_inicio < hora_fim),
+    CONSTRAINT fk_reservas_salas FOREIGN KEY (sala_id) REFERENCES salas(id),
+    CONSTRAINT fk_reservas_coordenadores FOREIGN KEY (coordenador_id) REFERENCES coordenadores(id)
+) PARTITION BY RANGE (data_reserva)""",
+    f"CREATE TABLE {PARTICAO_PADRAO} PARTITION OF reservas DEFAULT",
+    f"ALTER TABLE {PARTICAO_PADRAO} ADD CONSTRAINT {models.RESTRICAO_SOBREPOSICAO}_padrao {_EXCLUSAO}",
+    "CREATE INDEX ix_reservas_serie_id ON reservas (serie_id)",
+    "CREATE INDEX ix_reservas_coordenador_id ON reservas (coordenador_id)",
+    "CREATE INDEX ix_reservas_sala_data_horario ON reservas (sala_id, data_reserva, hora_inicio, hora_fim)",
+]
+
+# Reservas ativas e arquivadas como uma única "tabela", para as leituras que alcançam o arquivo.
+RESERVAS_COM_ARQUIVO = aliased(models.Reservas, union_all(
+    select(*(models.Reservas.__table__.c[coluna] for coluna in _COLUNAS)),
+    select(*(models.ReservasArquivo.__table__.c[coluna] for coluna in _COLUNAS))
+).subquery("reservas_com_arquivo"))
+
+
+def inicio_do_mes(data: date) -> date:
+    return data.replace(day=1)
+
+
+def proximo_mes(data: date) -> date:
+    return date(data.year + data.month // 12, data.month % 12 + 1, 1)
+
+
+def nome_particao(mes: date) -> str:
+    return f"reservas_{mes:%Y_%m}"
+
+
+def fim_ultimo_semestre_fechado(hoje: date) -> date:
+    """Semestres vão de janeiro a junho e de julho a dezembro."""
+    return date(hoje.year - 1, 12, 31) if hoje.month <= 6 else date(hoje.year, 6, 30)
+
+
+def _existe(conexao, tabela: str) -> bool:
+    return conexao.execute(text("SELECT to_regclass(:tabela) IS NOT NULL"), {"tabela": tabela}).scalar()
+
+
+def particionada(conexao) -> bool:
+    return conexao.dialect.name == "postgresql" and conexao.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('reservas')")
+    ).scalar() == "p"
+
+
+def criar_particao(conexao, mes: date) -> bool:
+    """Cria a partição do mês, trazendo da partição padrão as reservas que já caíram nela."""
+    nome = nome_particao(mes)
+    if _existe(conexao, nome):
+        return False
+    inicio, fim = mes.isoformat(), proximo_mes(mes).isoformat()
+    conexao.execute(text(f"CREATE TABLE {nome} (LIKE reservas INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conexao.execute(text(
+        f"WITH movidas AS (DELETE FROM {PARTICAO_PADRAO} WHERE data_reserva >= '{inicio}' AND data_reserva < '{fim}' "
+        f"RETURNING {', '.join(_COLUNAS)}) INSERT INTO {nome} ({', '.join(_COLUNAS)}) SELECT * FROM movidas"
+    ))
+    conexao.execute(text(f"ALTER TABLE {nome} ADD CONSTRAINT {models.RESTRICAO_SOBREPOSICAO}_{mes:%Y_%m} {_EXCLUSAO}"))
+    conexao.execute(text(f"ALTER TABLE reservas ATTACH PARTITION {nome} FOR VALUES FROM ('{inicio}') TO ('{fim}')"))
+    return True
+
+
+def criar_particoes(conexao, meses: int = config.PARTICOES_MESES_A_FRENTE, desde: Optional[date] = None) -> List[str]:
+    """Garante as partições de `desde` (mês atual por padrão) até `meses` meses à frente."""
+    mes = inicio_do_mes(desde or date.today())
+    fim = inicio_do_mes(date.today())
+    for _ in range(meses):
+        fim = proximo_mes(fim)
+    criadas = []
+    while mes <= fim:
+        if criar_particao(conexao, mes):
+            criadas.append(nome_particao(mes))
+        mes = proximo_mes(mes)
+    return criadas
+
+
+def converter(conexao) -> List[str]:
+    """Recria `reservas` como tabela particionada por mês, preservando ids e a sequência."""
+    if particionada(conexao):
+        return []
+    primeira = conexao.execute(text("SELECT min(data_reserva) FROM reservas")).scalar()
+    conexao.execute(text("ALTER TABLE reservas RENAME TO reservas_antiga"))
+    conexao.execute(text("ALTER TABLE reservas_antiga RENAME CONSTRAINT reservas_pkey TO reservas_antiga_pkey"))
+    conexao.execute(text(f"ALTER TABLE reservas_antiga DROP CONSTRAINT IF EXISTS {models.RESTRICAO_SOBREPOSICAO}"))
+    for indice in ("ix_reservas_serie_id", "ix_reservas_sala_data_horario", "ix_reservas_sala_id", "ix_reservas_coordenador_id"):
+        conexao.execute(text(f"DROP INDEX IF EXISTS {indice}"))
+    for comando in DDL_RESERVAS_PARTICIONADA:
+        conexao.execute(text(comando))
+    criadas = criar_particoes(conexao, desde=primeira)
+    colunas = ", ".join(_COLUNAS)
+    conexao.execute(text(f"INSERT INTO reservas ({colunas}) SELECT {colunas} FROM reservas_antiga"))
+    conexao.execute(text("ALTER SEQUENCE reservas_id_seq OWNED BY reservas.id"))
+    conexao.execute(text("DROP TABLE reservas_antiga"))
+    return criadas
+
+
+def _particoes_encerradas(conexao, ate: date) -> List[str]:
+    nomes = conexao.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'reservas'::regclass"
+    )).scalars()
+    encerradas = []
+    for nome in nomes:
+        encontrado = _NOME_PARTICAO.match(nome)
+        if encontrado and proximo_mes(date(int(encontrado[1]), int(encontrado[2]), 1)) <= ate + timedelta(days=1):
+            encerradas.append(nome)
+    return sorted(encerradas)
+
+
+def arquivar(db: Session, ate: Optional[date] = None) -> int:
+    """Move para `reservas_arquivo` as reservas até `ate` (fim do último semestre encerrado, por padrão).
+
+    No PostgreSQL particionado, os meses inteiramente arquivados são copiados e
+    têm a partição descartada, sem DELETE linha a linha.
+    """
+    ate = ate or fim_ultimo_semestre_fechado(date.today())
+    conexao = db.connection()
+    colunas = ", ".join(_COLUNAS)
+    movidas = 0
+    if particionada(conexao):
+        for nome in _particoes_encerradas(conexao, ate):
+            movidas += conexao.execute(text(f"INSERT INTO reservas_arquivo ({colunas}) SELECT {colunas} FROM {nome}")).rowcount
+            conexao.execute(text(f"DROP TABLE {nome}"))
+
+    restantes = select(*(models.Reservas.__table__.c[coluna] for coluna in _COLUNAS)).where(models.Reservas.data_reserva <= ate)
+    movidas += db.execute(insert(models.ReservasArquivo).from_select(_COLUNAS, restantes)).rowcount
+    db.execute(delete(models.Reservas).where(models.Reservas.data_reserva <= ate))
+    db.commit()
+    _limite_arquivo["lido_em"] = None
+    return movidas
+
+
+# Data mais recente já arquivada, relida do banco a cada ARQUIVO_TTL_SEGUNDOS.
+_limite_arquivo = {"valor": None, "lido_em": None}
+
+
+def _limite_valido() -> bool:
+    lido_em = _limite_arquivo["lido_em"]
+    return lido_em is not None and relogio.monotonic() - lido_em < config.ARQUIVO_TTL_SEGUNDOS
+
+
+def _guardar_limite(valor: Optional[date]):
+    _limite_arquivo.update(valor=valor, lido_em=relogio.monotonic())
+
+
+def _escolher_modelo(data_inicio: Optional[date]):
+    # Sem data_inicio, a listagem fica nas reservas ativas: o arquivo só é lido com um período explícito.
+    limite = _limite_arquivo["valor"]
+    if limite is not None and data_inicio is not None and data_inicio <= limite:
+        return RESERVAS_COM_ARQUIVO
+    return models.Reservas
+
+
+_CONSULTA_LIMITE = select(func.max(models.ReservasArquivo.data_reserva))
+
+
+def modelo_reservas(db: Session, data_inicio: Optional[date]):
+    """`models.Reservas`, ou a união com o arquivo quando `data_inicio` alcança datas arquivadas."""
+    if not _limite_valido():
+        _guardar_limite(db.execute(_CONSULTA_LIMITE).scalar())
+    return _escolher_modelo(data_inicio)
+
+
+async def modelo_reservas_async(db: AsyncSession, data_inicio: Optional[date]):
+    if not _limite_valido():
+        _guardar_limite((await db.execute(_CONSULTA_LIMITE)).scalar())
+    return _escolher_modelo(data_inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.particoes", description=__doc__.splitlines()[0])
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("converter", help="Transforma a tabela reservas em particionada por mês (PostgreSQL)")
+    criar = comandos.add_parser("criar", help="Cria as partições mensais que ainda não existem (PostgreSQL)")
+    criar.add_argument("--meses", type=int, default=config.PARTICOES_MESES_A_FRENTE)
+    arquivar_parser = comandos.add_parser("arquivar", help="Move reservas de semestres encerrados para reservas_arquivo")
+    arquivar_parser.add_argument("--ate", type=date.fromisoformat, help="Última data arquivada (padrão: fim do último semestre encerrado)")
+    argumentos = parser.parse_args()
+
+    from app.database import Sessionlocal, engine
+
+    if argumentos.comando == "arquivar":
+        with Sessionlocal() as db:
+            print(f"{arquivar(db, argumentos.ate)} reservas arquivadas")
+        return
+    if engine.dialect.name != "postgresql":
+        parser.error("particionamento disponível apenas no PostgreSQL")
+    with engine.begin() as conexao:
+        if argumentos.comando == "converter":
+            criadas = converter(conexao)
+        else:
+            if not particionada(conexao):
+                parser.error("a tabela reservas não é particionada; execute primeiro: python -m app.particoes converter")
+            criadas = criar_particoes(conexao, argumentos.meses)
+    print("Partições criadas:", ", ".join(criadas) or "nenhuma")
+
+
+if __name__ == "__main__":
+    main()
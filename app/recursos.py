@@ -0,0 +1,218 @@
+"""Recursos das salas como etiquetas normalizadas.
+
+`Salas.recursos` continua sendo o texto livre informado pelo usuário; cada termo
+separado por vírgula (ou ponto e vírgula) vira uma etiqueta em minúsculas, com os
+espaços normalizados, gravada em `recursos` e ligada à sala por `salas_recursos`.
+As ligações são atualizadas no mesmo flush de cada escrita em salas e podem ser
+recalculadas a partir do texto (o que também migra bancos antigos) com:
+
+    python -m app.recursos
+
+Os filtros de `GET /salas/` (recursos, capacidade mínima e bloco) usam o índice
+de `salas_recursos` ou, com RECURSOS_MAPA_ATIVO, um mapa de bitmaps em memória.
+"""
+import argparse
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, event, exists, func, inspect, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import config, models
+from app.cache import cache
+from app.database import Sessionlocal
+
+_INSERT_DIALETO = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+_SEPARADORES = re.compile(r"[,;]")
+
+
+def normalizar(texto: Optional[str]) -> List[str]:
+    """Etiquetas do texto, na ordem em que aparecem e sem repetições."""
+    etiquetas = []
+    for termo in _SEPARADORES.split(texto or ""):
+        etiqueta = " ".join(termo.split()).lower()
+        if etiqueta and etiqueta not in etiquetas:
+            etiquetas.append(etiqueta)
+    return etiquetas
+
+
+def sincronizar(conexao, textos: Dict[int, Optional[str]]):
+    """Regrava as ligações das salas informadas ({sala_id: texto de recursos})."""
+    if not textos:
+        return
+    etiquetas = {sala_id: normalizar(texto) for sala_id, texto in textos.items()}
+    conexao.execute(delete(models.SalasRecursos).where(models.SalasRecursos.sala_id.in_(etiquetas)))
+    nomes = sorted({etiqueta for lista in etiquetas.values() for etiqueta in lista})
+    if not nomes:
+        return
+    comando = _INSERT_DIALETO.get(conexao.dialect.name, postgresql.insert)(models.Recursos.__table__)
+    conexao.execute(comando.on_conflict_do_nothing(index_elements=["nome"]), [{"nome": nome} for nome in nomes])
+    ids = dict(conexao.execute(
+        select(models.Recursos.nome, models.Recursos.id).where(models.Recursos.nome.in_(nomes))
+    ).all())
+    conexao.execute(insert(models.SalasRecursos), [
+        {"recurso_id": ids[etiqueta], "sala_id": sala_id}
+        for sala_id, lista in etiquetas.items() for etiqueta in lista
+    ])
+
+
+def sincronizar_faltantes(conexao):
+    """Liga as salas que ainda não têm etiquetas (gravadas por INSERTs em massa, que não passam pelo flush)."""
+    ligada = exists().where(models.SalasRecursos.sala_id == models.Salas.id)
+    sincronizar(conexao, dict(conexao.execute(
+        select(models.Salas.id, models.Salas.recursos).where(~ligada)
+    ).all()))
+
+
+@event.listens_for(Session, "after_flush")
+def _sincronizar_salas(sessao, contexto):
+    textos = {}
+    for sala in sessao.new:
+        if isinstance(sala, models.Salas):
+            textos[sala.id] = sala.recursos
+    for sala in sessao.dirty:
+        if isinstance(sala, models.Salas) and inspect(sala).attrs.recursos.history.has_changes():
+            textos[sala.id] = sala.recursos
+    if textos:
+        sincronizar(sessao.connection(), textos)
+
+
+def filtros_sql(etiquetas: Iterable[str], capacidade_min: Optional[int] = None, bloco_id: Optional[int] = None) -> list:
+    """Condições sobre `Salas` para os filtros de capacidade, bloco e recursos (todas as etiquetas exigidas)."""
+    filtros = []
+    for etiqueta in etiquetas:
+        recurso_id = select(models.Recursos.id).where(models.Recursos.nome == etiqueta).scalar_subquery()
+        filtros.append(exists().where(models.SalasRecursos.recurso_id == recurso_id,
+                                      models.SalasRecursos.sala_id == models.Salas.id))
+    if capacidade_min is not None:
+        filtros.append(models.Salas.capacidade >= capacidade_min)
+    if bloco_id is not None:
+        filtros.append(models.Salas.bloco_id == bloco_id)
+    return filtros
+
+
+class _Bitmaps:
+    """Um bit por sala, na ordem dos ids: uma máscara por etiqueta, por bloco e por faixa de capacidade."""
+
+    def __init__(self, salas: list, ligacoes: list):
+        self.ids = [sala_id for sala_id, _, _ in salas]
+        posicoes = {sala_id: posicao for posicao, sala_id in enumerate(self.ids)}
+        self.todas = (1 << len(self.ids)) - 1
+        self.por_bloco: Dict[int, int] = {}
+        por_capacidade: Dict[int, int] = {}
+        for posicao, (_, bloco_id, capacidade) in enumerate(salas):
+            self.por_bloco[bloco_id] = self.por_bloco.get(bloco_id, 0) | (1 << posicao)
+            por_capacidade[capacidade] = por_capacidade.get(capacidade, 0) | (1 << posicao)
+        # acima[i]: salas com capacidade >= capacidades[i], acumuladas da maior para a menor.
+        self.capacidades = sorted(por_capacidade)
+        self.acima = [0] * len(self.capacidades)
+        acumulado = 0
+        for i in range(len(self.capacidades) - 1, -1, -1):
+            acumulado |= por_capacidade[self.capacidades[i]]
+            self.acima[i] = acumulado
+        self.por_etiqueta: Dict[str, int] = {}
+        for sala_id, nome in ligacoes:
+            posicao = posicoes.get(sala_id)
+            if posicao is not None:
+                self.por_etiqueta[nome] = self.por_etiqueta.get(nome, 0) | (1 << posicao)
+
+    def filtrar(self, etiquetas: Iterable[str], capacidade_min: Optional[int], bloco_id: Optional[int],
+                apos_id: Optional[int], limite: int) -> List[int]:
+        selecionadas = self.todas
+        for etiqueta in etiquetas:
+            selecionadas &= self.por_etiqueta.get(etiqueta, 0)
+        if capacidade_min is not None:
+            i = bisect_left(self.capacidades, capacidade_min)
+            selecionadas &= self.acima[i] if i < len(self.acima) else 0
+        if bloco_id is not None:
+            selecionadas &= self.por_bloco.get(bloco_id, 0)
+        if apos_id is not None:
+            inicio = bisect_right(self.ids, apos_id)
+            selecionadas = selecionadas >> inicio << inicio
+
+        ids = []
+        while selecionadas and len(ids) < limite:
+            menor = selecionadas & -selecionadas
+            ids.append(self.ids[menor.bit_length() - 1])
+            selecionadas ^= menor
+        return ids
+
+
+class MapaRecursos:
+    """Bitmaps das salas em memória: os filtros de `GET /salas/` viram operações AND sobre inteiros.
+
+    É reconstruído quando a versão "salas" do cache muda (toda escrita em salas chama
+    `cache.invalidar("salas")`) e, para alterações feitas em outros workers, após o TTL.
+    """
+
+    def __init__(self, ttl: float = config.RECURSOS_MAPA_TTL_SEGUNDOS):
+        self.ttl = ttl
+        self._estado = None
+        self._lock = threading.Lock()
+
+    def _valido(self, estado, versao: int) -> bool:
+        return estado is not None and estado[0] == versao and time.monotonic() - estado[1] < self.ttl
+
+    def _carregar(self, db: Session) -> _Bitmaps:
+        salas = db.execute(select(models.Salas.id, models.Salas.bloco_id, models.Salas.capacidade)
+                           .order_by(models.Salas.id)).all()
+        ligacoes = db.execute(select(models.SalasRecursos.sala_id, models.Recursos.nome).join(
+            models.Recursos, models.Recursos.id == models.SalasRecursos.recurso_id
+        )).all()
+        return _Bitmaps(salas, ligacoes)
+
+    def atual(self, db: Session) -> _Bitmaps:
+        """O mapa compartilhado, recarregado pela sessão da requisição quando está desatualizado."""
+        # A versão é lida antes da carga: uma escrita durante a carga força outra na próxima consulta.
+        versao = cache.backend.versao("salas")
+        estado = self._estado
+        if self._valido(estado, versao):
+            return estado[2]
+        if db.info.get("replica"):
+            # Uma réplica pode estar atrasada: o mapa lido dela atende só esta requisição e não é compartilhado.
+            return self._carregar(db)
+        with self._lock:
+            estado = self._estado
+            if not self._valido(estado, versao):
+                estado = self._estado = (versao, time.monotonic(), self._carregar(db))
+        return estado[2]
+
+    def filtrar(self, db: Session, etiquetas: Iterable[str], capacidade_min: Optional[int] = None,
+                bloco_id: Optional[int] = None, apos_id: Optional[int] = None,
+                limite: int = config.PAGINACAO_LIMITE_MAXIMO) -> List[int]:
+        """Ids das salas que atendem aos filtros, em ordem crescente, a partir de `apos_id`."""
+        return self.atual(db).filtrar(etiquetas, capacidade_min, bloco_id, apos_id, limite)
+
+
+mapa_recursos = MapaRecursos()
+
+
+def reconstruir(db: Session) -> dict:
+    """Regrava as etiquetas de todas as salas a partir de `Salas.recursos` e remove as que ficaram sem uso."""
+    conexao = db.connection()
+    conexao.execute(delete(models.SalasRecursos))
+    salas = conexao.execute(select(models.Salas.id, models.Salas.recursos).order_by(models.Salas.id)).all()
+    for posicao in range(0, len(salas), config.STREAM_TAMANHO_LOTE):
+        sincronizar(conexao, dict(salas[posicao:posicao + config.STREAM_TAMANHO_LOTE]))
+    usado = exists().where(models.SalasRecursos.recurso_id == models.Recursos.id)
+    conexao.execute(delete(models.Recursos).where(~usado))
+    recursos = conexao.execute(select(func.count(models.Recursos.id))).scalar()
+    db.commit()
+    cache.invalidar("salas")
+    return {"salas": len(salas), "recursos": recursos}
+
+
+def main():
+    argparse.ArgumentParser(prog="python -m app.recursos",
+                            description="Recalcula as etiquetas de recursos de todas as salas.").parse_args()
+
+    with Sessionlocal() as db:
+        print(reconstruir(db))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app import models, schemas, crud
-from app.database import get_db
-
-router = APIRouter(prefix="/blocos", tags=["Blocos"])
-
-@router.post("/", response_model=schemas.Bloco)
-def create_bloco(bloco_data: schemas.BlocoCreate, db: Session = Depends(get_db)):
-    """Cria um novo bloco relacionado a um curso"""
-    return crud.create_bloco(db, bloco_data)
-
-@router.get("/", response_model=list[schemas.Bloco])
-def get_blocos(db: Session = Depends(get_db)):
-    """Consulta de todos os blocos no banco de dados."""
-    return db.query(models.Blocos).all()
-
-@router.get("/{bloco_id}", response_model=schemas.Bloco)
-def get_bloco(bloco_id: int, db: Session = Depends(get_db)):
-    """Consulta de um bloco específico."""
-    bloco = db.query(models.Blocos).filter(models.Blocos.id == bloco_id).first()
-    if not bloco:
-        raise HTTPException(status_code=404, detail="Bloco não encontrado")
-    return bloco
-
-@router.put("/{bloco_id}", response_model=schemas.Bloco)
-def update_bloco(bloco_id: int, bloco_data: schemas.BlocoCreate, db: Session = Depends(get_db)):
-    """Altera/atualiza as informações de um bloco."""
-    bloco = db.query(models.Blocos).filter(models.Blocos.id == bloco_id).first()
-    if not bloco:
-        raise HTTPException(status_code=404, detail="Bloco não encontrado")
-    bloco.nome = bloco_data.nome
-    bloco.curso_id = bloco_data.curso_id
-    db.commit()
-    db.refresh(bloco)
-    return bloco
-
-@router.delete("/{bloco_id}")
-def delete_bloco(bloco_id: int, db: Session = Depends(get_db)):
-    """Deleta o bloco e suas salas relacionadas."""
-    bloco = db.query(models.Blocos).filter(models.Blocos.id == bloco_id).first()
-    if not bloco:
-        raise HTTPException(status_code=404, detail="Bloco não encontrado")
-
-    db.query(models.Salas).filter(models.Salas.bloco_id == bloco_id).delete()
-
-    db.delete(bloco)
-    db.commit()
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+from app import agenda, config, models, schemas, crud
+from app.cache import cache
+from app.database import get_db, get_db_leitura
+from app.indice_reservas import indice
+from app.paginacao import Paginacao, listar
+
+router = APIRouter(prefix="/blocos", tags=["Blocos"])
+
+@router.post("/", response_model=schemas.Bloco)
+def create_bloco(bloco_data: schemas.BlocoCreate, db: Session = Depends(get_db)):
+    """Cria um novo bloco relacionado a um curso"""
+    bloco = crud.create_bloco(db, bloco_data)
+    cache.invalidar("blocos")
+    return bloco
+
+@router.get("/", response_model=list[schemas.Bloco])
+def get_blocos(request: Request, response: Response, pagina: Paginacao = Depends(), db: Session = Depends(get_db_leitura)):
+    """Consulta de todos os blocos no banco de dados. (paginada por id; o cabeçalho X-Proximo-Cursor indica o `apos_id` da próxima página)"""
+    def consultar(resposta: Response):
+        return listar(lambda sessao: sessao.query(models.Blocos), models.Blocos, schemas.Bloco, db, resposta, pagina)
+
+    if not config.CACHE_ATIVO or pagina.formato == "ndjson":
+        return consultar(response)
+    return cache.responder(request, db, "blocos", schemas.Bloco, consultar)
+
+@router.get("/{bloco_id}", response_model=schemas.Bloco)
+def get_bloco(bloco_id: int, db: Session = Depends(get_db_leitura)):
+    """Consulta de um bloco específico."""
+    bloco = db.query(models.Blocos).filter(models.Blocos.id == bloco_id).first()
+    if not bloco:
+        raise HTTPException(status_code=404, detail="Bloco não encontrado")
+    return bloco
+
+@router.get("/{bloco_id}/agenda", response_model=schemas.AgendaBloco, response_model_exclude_none=True)
+def get_agenda_bloco(bloco_id: int, inicio: date, fim: date, granularidade: int = Query(30, ge=5, le=240),
+                     db: Session = Depends(get_db_leitura)):
+    """Grade de ocupação de todas as salas do bloco no período, com uma faixa de `granularidade` minutos por posição."""
+    agenda.validar_periodo(inicio, fim)
+    bloco = db.query(models.Blocos).filter(models.Blocos.id == bloco_id).first()
+    if not bloco:
+        raise HTTPException(status_code=404, detail="Bloco não encontrado")
+    sala_ids = [sala_id for (sala_id,) in db.query(models.Salas.id).filter(
+        models.Salas.bloco_id == bloco_id
+    ).order_by(models.Salas.id)]
+    ocupados = agenda.ocupacao(db, sala_ids, inicio, fim) if sala_ids else {}
+    return agenda.montar_agenda_bloco(bloco_id, sala_ids, ocupados, inicio, fim, granularidade)
+
+@router.put("/{bloco_id}", response_model=schemas.Bloco)
+def update_bloco(bloco_id: int, bloco_data: schemas.BlocoCreate, db: Session = Depends(get_db)):
+    """Altera/atualiza as informações de um bloco."""
+    bloco = db.query(models.Blocos).filter(models.Blocos.id == bloco_id).first()
+    if not bloco:
+        raise HTTPException(status_code=404, detail="Bloco não encontrado")
+    bloco.nome = bloco_data.nome
+    bloco.curso_id = bloco_data.curso_id
+    db.commit()
+    db.refresh(bloco)
+    cache.invalidar("blocos")
+    return bloco
+
+@router.patch("/{bloco_id}", response_model=schemas.Bloco)
+def patch_bloco(bloco_id: int, bloco_data: schemas.BlocoUpdate, db: Session = Depends(get_db)):
+    """Atualiza apenas os campos enviados de um bloco, em um único UPDATE ... RETURNING."""
+    bloco = crud.patch_bloco(db, bloco_id, bloco_data)
+    cache.invalidar("blocos")
+    return bloco
+
+@router.delete("/{bloco_id}")
+def delete_bloco(bloco_id: int, db: Session = Depends(get_db)):
+    """Deleta o bloco e suas salas relacionadas."""
+    bloco = db.query(models.Blocos).filter(models.Blocos.id == bloco_id).first()
+    if not bloco:
+        raise HTTPException(status_code=404, detail="Bloco não encontrado")
+
+    db.query(models.Salas).filter(models.Salas.bloco_id == bloco_id).delete()
+
+    db.delete(bloco)
+    db.commit()
+    indice.invalidar()
+    cache.invalidar("blocos", "salas")
@@ -1,54 +1,90 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app import models, schemas, crud
-from app.database import get_db
-
-router = APIRouter(prefix="/coordenadores", tags=["Coordenadores"])
-
-@router.post("/", response_model=schemas.Coordenador)
-def create_coordenador(coordenador_data: schemas.CoordenadorCreate, db: Session = Depends(get_db)):
-    """Cria um novo coordenador"""
-    return crud.create_coordenador(db, coordenador_data)
-
-
-@router.get("/", response_model=list[schemas.Coordenador])
-def get_coordenadores(db: Session = Depends(get_db)):
-    """Consulta de todos os coordenadores no banco de dados."""
-    return db.query(models.Coordenadores).all()
-
-
-@router.get("/{coordenador_id}", response_model=schemas.Coordenador)
-def get_coordenador(coordenador_id: int, db: Session = Depends(get_db)):
-    """Consulta de um coordenador específico."""
-    coordenador = db.query(models.Coordenadores).filter(models.Coordenadores.id == coordenador_id).first()
-    if not coordenador:
-        raise HTTPException(status_code=404, detail="Coordenador não encontrado")
-    return coordenador
-
-
-@router.put("/{coordenador_id}", response_model=schemas.Coordenador)
-def update_coordenador(coordenador_id: int, coordenador_data: schemas.CoordenadorCreate, db: Session = Depends(get_db)):
-    """Altera/atualiza as informações de um coordenador."""
-    coordenador = db.query(models.Coordenadores).filter(models.Coordenadores.id == coordenador_id).first()
-    if not coordenador:
-        raise HTTPException(status_code=404, detail="Coordenador não encontrado")
-
-    coordenador.curso_id = coordenador_data.curso_id
-    coordenador.nome = coordenador_data.nome
-    coordenador.email = coordenador_data.email
-    coordenador.senha = crud.hash_senha(coordenador_data.senha)
-
-    db.commit()
-    db.refresh(coordenador)
-    return coordenador
-
-
-@router.delete("/{coordenador_id}")
-def delete_coordenador(coordenador_id: int, db: Session = Depends(get_db)):
-    """Deleta um coordenador."""
-    coordenador = db.query(models.Coordenadores).filter(models.Coordenadores.id == coordenador_id).first()
-    if not coordenador:
-        raise HTTPException(status_code=404, detail="Coordenador não encontrado")
-    db.delete(coordenador)
-    db.commit()
-    return {"detail": "Coordenador deletado com sucesso"}
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app import importacao, models, schemas, crud, senhas
+from app.database import get_db, get_db_leitura
+from app.indice_reservas import indice
+from app.paginacao import Paginacao, listar
+
+router = APIRouter(prefix="/coordenadores", tags=["Coordenadores"])
+
+# As rotas que gravam senhas são async: o bcrypt roda no pool de app/senhas.py e é aguardado sem ocupar
+# uma thread; as consultas ao banco continuam síncronas, no threadpool.
+
+@router.post("/", response_model=schemas.Coordenador)
+async def create_coordenador(coordenador_data: schemas.CoordenadorCreate, db: Session = Depends(get_db)):
+    """Cria um novo coordenador"""
+    await run_in_threadpool(crud.verificar_emails_livres, db, [coordenador_data.email])
+    senha_hash = await senhas.hash_senha_async(coordenador_data.senha)
+    return await run_in_threadpool(crud.create_coordenador, db, coordenador_data, senha_hash)
+
+
+@router.post("/lote", response_model=list[schemas.Coordenador])
+async def create_coordenadores_lote(coordenadores: list[schemas.CoordenadorCreate], db: Session = Depends(get_db)):
+    """Cadastra vários coordenadores de uma vez (as senhas são processadas em paralelo)."""
+    await run_in_threadpool(crud.verificar_emails_livres, db, [coordenador.email for coordenador in coordenadores])
+    hashes = await senhas.hash_senhas_async([coordenador.senha for coordenador in coordenadores])
+    return await run_in_threadpool(crud.create_coordenadores_lote, db, coordenadores, hashes)
+
+
+@router.get("/", response_model=list[schemas.Coordenador])
+def get_coordenadores(response: Response, pagina: Paginacao = Depends(), db: Session = Depends(get_db_leitura)):
+    """Consulta de todos os coordenadores no banco de dados. (paginada por id; o cabeçalho X-Proximo-Cursor indica o `apos_id` da próxima página)"""
+    return listar(lambda sessao: sessao.query(models.Coordenadores), models.Coordenadores, schemas.Coordenador, db, response, pagina)
+
+
+@router.post("/importar", response_model=schemas.ResultadoImportacao)
+async def importar_coordenadores(request: Request, formato: Optional[importacao.Formato] = None, db: Session = Depends(get_db)):
+    """Importa coordenadores (as senhas são processadas em paralelo) de um arquivo CSV (com cabeçalho) ou NDJSON enviado no corpo; retorna os erros por linha.
+    (sem `formato`, usa o Content-Type: text/csv ou application/x-ndjson)"""
+    return await importacao.importar_requisicao(request, "coordenadores", formato, db)
+
+@router.get("/exportar")
+def exportar_coordenadores(formato: importacao.Formato = "csv"):
+    """Exporta todos os coordenadores em CSV ou NDJSON, em streaming."""
+    return importacao.exportar(lambda sessao: sessao.query(models.Coordenadores), models.Coordenadores, schemas.Coordenador, formato, "coordenadores")
+
+@router.get("/{coordenador_id}", response_model=schemas.Coordenador)
+def get_coordenador(coordenador_id: int, db: Session = Depends(get_db_leitura)):
+    """Consulta de um coordenador específico."""
+    coordenador = db.query(models.Coordenadores).filter(models.Coordenadores.id == coordenador_id).first()
+    if not coordenador:
+        raise HTTPException(status_code=404, detail="Coordenador não encontrado")
+    return coordenador
+
+
+@router.put("/{coordenador_id}", response_model=schemas.Coordenador)
+async def update_coordenador(coordenador_id: int, coordenador_data: schemas.CoordenadorCreate, db: Session = Depends(get_db)):
+    """Altera/atualiza as informações de um coordenador."""
+    senha_hash = await _novo_hash(db, coordenador_id, coordenador_data.senha)
+    return await run_in_threadpool(crud.update_coordenador, db, coordenador_id, coordenador_data, senha_hash)
+
+
+@router.patch("/{coordenador_id}", response_model=schemas.Coordenador)
+async def patch_coordenador(coordenador_id: int, coordenador_data: schemas.CoordenadorUpdate, db: Session = Depends(get_db)):
+    """Atualiza apenas os campos enviados de um coordenador, em um único UPDATE ... RETURNING.
+    (com `senha`, o hash atual é lido antes; reenviar o próprio hash não refaz o bcrypt)"""
+    senha_hash = None
+    if coordenador_data.senha is not None:
+        senha_hash = await _novo_hash(db, coordenador_id, coordenador_data.senha)
+    return await run_in_threadpool(crud.patch_coordenador, db, coordenador_id, coordenador_data, senha_hash)
+
+
+async def _novo_hash(db: Session, coordenador_id: int, senha: str) -> Optional[str]:
+    """Hash da senha enviada, ou None quando o cliente reenviou o hash já gravado (senhas.precisa_novo_hash)."""
+    if not senhas.precisa_novo_hash(senha, await run_in_threadpool(crud.senha_atual, db, coordenador_id)):
+        return None
+    return await senhas.hash_senha_async(senha)
+
+@router.delete("/{coordenador_id}")
+def delete_coordenador(coordenador_id: int, db: Session = Depends(get_db)):
+    """Deleta um coordenador."""
+    coordenador = db.query(models.Coordenadores).filter(models.Coordenadores.id == coordenador_id).first()
+    if not coordenador:
+        raise HTTPException(status_code=404, detail="Coordenador não encontrado")
+    db.delete(coordenador)
+    db.commit()
+    indice.invalidar()
+    return {"detail": "Coordenador deletado com sucesso"}
@@ -1,51 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app import models, schemas, crud
-from app.database import get_db
-
-router = APIRouter(prefix="/cursos", tags=["Cursos"])
-
-@router.post("/", response_model=schemas.Curso)
-def create_curso(curso_data: schemas.CursoCreate, db: Session = Depends(get_db)):
-    """Cria um novo curso"""
-    return crud.create_curso(db, curso_data)
-
-
-@router.get("/", response_model=list[schemas.Curso])
-def get_cursos(db: Session = Depends(get_db)):
-    """Consulta de todos os cursos no banco de dados."""
-    return db.query(models.Cursos).all()
-
-
-@router.get("/{curso_id}", response_model=schemas.Curso)
-def get_curso(curso_id: int, db: Session = Depends(get_db)):
-    """Consulta de um curso específico."""
-    curso = db.query(models.Cursos).filter(models.Cursos.id == curso_id).first()
-    if not curso:
-        raise HTTPException(status_code=404, detail="Curso não encontrado")
-    return curso
-
-
-@router.put("/{curso_id}", response_model=schemas.Curso)
-def update_curso(curso_id: int, curso_data: schemas.CursoCreate, db: Session = Depends(get_db)):
-    """Altera/atualiza as informações de um curso."""
-    curso = db.query(models.Cursos).filter(models.Cursos.id == curso_id).first()
-    if not curso:
-        raise HTTPException(status_code=404, detail="Curso não encontrado")
-
-    curso.nome = curso_data.nome
-
-    db.commit()
-    db.refresh(curso)
-    return curso
-
-
-@router.delete("/{curso_id}")
-def delete_curso(curso_id: int, db: Session = Depends(get_db)):
-    """Deleta um curso."""
-    curso = db.query(models.Cursos).filter(models.Cursos.id == curso_id).first()
-    if not curso:
-        raise HTTPException(status_code=404, detail="Curso não encontrado")
-    db.delete(curso)
-    db.commit()
-    return {"detail": "Curso deletado com sucesso"}
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from app import config, models, schemas, crud
+from app.cache import cache
+from app.database import get_db, get_db_leitura
+from app.indice_reservas import indice
+from app.paginacao import Paginacao, listar
+
+router = APIRouter(prefix="/cursos", tags=["Cursos"])
+
+@router.post("/", response_model=schemas.Curso)
+def create_curso(curso_data: schemas.CursoCreate, db: Session = Depends(get_db)):
+    """Cria um novo curso"""
+    curso = crud.create_curso(db, curso_data)
+    cache.invalidar("cursos")
+    return curso
+
+
+@router.get("/", response_model=list[schemas.Curso])
+def get_cursos(request: Request, response: Response, pagina: Paginacao = Depends(), db: Session = Depends(get_db_leitura)):
+    """Consulta de todos os cursos no banco de dados. (paginada por id; o cabeçalho X-Proximo-Cursor indica o `apos_id` da próxima página)"""
+    def consultar(resposta: Response):
+        return listar(lambda sessao: sessao.query(models.Cursos), models.Cursos, schemas.Curso, db, resposta, pagina)
+
+    if not config.CACHE_ATIVO or pagina.formato == "ndjson":
+        return consultar(response)
+    return cache.responder(request, db, "cursos", schemas.Curso, consultar)
+
+
+@router.get("/{curso_id}", response_model=schemas.Curso)
+def get_curso(curso_id: int, db: Session = Depends(get_db_leitura)):
+    """Consulta de um curso específico."""
+    curso = db.query(models.Cursos).filter(models.Cursos.id == curso_id).first()
+    if not curso:
+        raise HTTPException(status_code=404, detail="Curso não encontrado")
+    return curso
+
+
+@router.put("/{curso_id}", response_model=schemas.Curso)
+def update_curso(curso_id: int, curso_data: schemas.CursoCreate, db: Session = Depends(get_db)):
+    """Altera/atualiza as informações de um curso."""
+    curso = db.query(models.Cursos).filter(models.Cursos.id == curso_id).first()
+    if not curso:
+        raise HTTPException(status_code=404, detail="Curso não encontrado")
+
+    curso.nome = curso_data.nome
+
+    db.commit()
+    db.refresh(curso)
+    cache.invalidar("cursos")
+    return curso
+
+
+@router.patch("/{curso_id}", response_model=schemas.Curso)
+def patch_curso(curso_id: int, curso_data: schemas.CursoUpdate, db: Session = Depends(get_db)):
+    """Atualiza apenas os campos enviados de um curso, em um único UPDATE ... RETURNING."""
+    curso = crud.patch_curso(db, curso_id, curso_data)
+    cache.invalidar("cursos")
+    return curso
+
+@router.delete("/{curso_id}")
+def delete_curso(curso_id: int, db: Session = Depends(get_db)):
+    """Deleta um curso."""
+    curso = db.query(models.Cursos).filter(models.Cursos.id == curso_id).first()
+    if not curso:
+        raise HTTPException(status_code=404, detail="Curso não encontrado")
+    db.delete(curso)
+    db.commit()
+    indice.invalidar()
+    cache.invalidar("cursos", "blocos", "salas")
+    return {"detail": "Curso deletado com sucesso"}
@@ -0,0 +1,34 @@
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app import ocupacao, schemas
+from app.database import get_db_leitura
+
+router = APIRouter(prefix="/ocupacao", tags=["Ocupação"])
+
+def _validar_periodo(inicio: date, fim: date):
+    if fim < inicio:
+        raise HTTPException(status_code=400, detail="Erro: A data final deve ser igual ou posterior à inicial.")
+
+@router.get("/", response_model=list[schemas.Utilizacao])
+def get_utilizacao(inicio: date, fim: date, agrupar_por: Literal["sala", "bloco", "curso"] = "sala",
+                   bloco_id: Optional[int] = None, curso_id: Optional[int] = None, db: Session = Depends(get_db_leitura)):
+    """Horas reservadas x horas disponíveis (horário de funcionamento de AGENDA_ABERTURA a AGENDA_FECHAMENTO) no período."""
+    _validar_periodo(inicio, fim)
+    return ocupacao.utilizacao(db, inicio, fim, agrupar_por, bloco_id, curso_id)
+
+@router.get("/picos", response_model=list[schemas.PicoOcupacao])
+def get_picos(inicio: date, fim: date, bloco_id: Optional[int] = None, curso_id: Optional[int] = None,
+              limite: int = Query(10, ge=1, le=168), db: Session = Depends(get_db_leitura)):
+    """Faixas de dia da semana e hora mais ocupadas no período."""
+    _validar_periodo(inicio, fim)
+    return ocupacao.picos(db, inicio, fim, bloco_id, curso_id, limite)
+
+@router.get("/ociosas", response_model=list[schemas.Sala])
+def get_salas_ociosas(inicio: date, fim: date, bloco_id: Optional[int] = None, curso_id: Optional[int] = None,
+                      db: Session = Depends(get_db_leitura)):
+    """Salas que não tiveram nenhuma reserva no período."""
+    _validar_periodo(inicio, fim)
+    return ocupacao.ociosas(db, inicio, fim, bloco_id, curso_id)
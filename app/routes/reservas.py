@@ -1,80 +1,176 @@
-import datetime
-
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app import models, schemas, crud
-from app.database import get_db
-from datetime import date, time, timedelta
-
-router = APIRouter(prefix="/reservas", tags=["Reservas"])
-
-@router.post("/", response_model=schemas.Reserva)
-def create_reserva(reserva_data: schemas.ReservaCreate, db: Session = Depends(get_db)):
-    """Cria uma nova reserva"""
-    return crud.create_reserva(db, reserva_data)
-
-
-@router.get("/", response_model=list[schemas.Reserva])
-def get_reservas(db: Session = Depends(get_db)):
-    """Consulta de todos as reservas no banco de dados."""
-    return db.query(models.Reservas).all()
-
-@router.get("/proxima_semana")
-def alerta_reservas(db: Session = Depends(get_db)):
-    """Consulta das reservas para os próximos 7 dias."""
-    reservas_futuras = db.query(models.Reservas).filter(
-        models.Reservas.data_reserva >= datetime.datetime.now(),
-        models.Reservas.data_reserva <= datetime.datetime.now() + timedelta(days=7)
-    ).all()
-
-    return reservas_futuras
-
-@router.get("/{reserva_id}", response_model=schemas.Reserva)
-def get_reserva(reserva_id: int, db: Session = Depends(get_db)):
-    """Consulta de uma reserva específica."""
-    reserva = db.query(models.Reservas).filter(models.Reservas.id == reserva_id).first()
-    if not reserva:
-        raise HTTPException(status_code=404, detail="Reserva não encontrada")
-    return reserva
-
-
-@router.put("/{reserva_id}", response_model=schemas.Reserva)
-def update_reserva(reserva_id: int, reserva_data: schemas.ReservaCreate, db: Session = Depends(get_db)):
-    """Altera/atualiza as informações de uma reserva."""
-    reserva = db.query(models.Reservas).filter(models.Reservas.id == reserva_id).first()
-    if not reserva:
-        raise HTTPException(status_code=404, detail="Reserva não encontrada")
-
-    reserva.sala_id = reserva_data.sala_id
-    reserva.coordenador_id = reserva_data.coordenador_id
-    reserva.data_reserva = reserva_data.data_reserva
-    reserva.hora_inicio = reserva_data.hora_inicio
-    reserva.hora_fim = reserva_data.hora_fim
-    reserva.motivo = reserva_data.motivo
-    db.commit()
-    db.refresh(reserva)
-    return reserva
-
-@router.delete("/{reserva_id}")
-def delete_reserva(reserva_id: int, db: Session = Depends(get_db)):
-    """Cancela uma reserva uma reserva."""
-    reserva = db.query(models.Reservas).filter(models.Reservas.id == reserva_id).first()
-    if not reserva:
-        raise HTTPException(status_code=404, detail="Reserva não encontrada")
-    db.delete(reserva)
-    db.commit()
-    return {"detail": "Reserva cancelada com sucesso"}
-
-@router.get("/disponibilidade/")
-def verificar_disponibilidade(sala_id: int, data: date, hora_inicio: time, hora_fim: time, db: Session = Depends(get_db)):
-    """Verifica se uma sala está disponível em um determinado horário. (data: aaaa-mm-dd | hora: hh:mm:ss)"""
-    reserva_existente = db.query(models.Reservas).filter(
-        models.Reservas.sala_id == sala_id,
-        models.Reservas.data_reserva == data,
-        models.Reservas.hora_inicio < hora_fim,
-        models.Reservas.hora_fim > hora_inicio
-    ).first()
-
-    if reserva_existente:
-        return {"disponivel": False, "mensagem": "A sala já está reservada nesse horário."}
-    return {"disponivel": True, "mensagem": "A sala está disponível para reserva."}
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app import alocacao, config, eventos, importacao, models, particoes, schemas, serializacao, crud
+from app.database import get_db, get_db_leitura
+from app.indice_reservas import indice
+from app.paginacao import Paginacao, listar, listar_linhas
+from datetime import date, time, timedelta
+from typing import Optional
+
+router = APIRouter(prefix="/reservas", tags=["Reservas"])
+
+@router.post("/", response_model=schemas.Reserva)
+def create_reserva(reserva_data: schemas.ReservaCreate, db: Session = Depends(get_db)):
+    """Cria uma nova reserva"""
+    reserva = crud.create_reserva(db, reserva_data)
+    indice.registrar(reserva)
+    return reserva
+
+
+@router.post("/lote", response_model=schemas.ReservaLoteResultado)
+def create_reservas_lote(lote: schemas.ReservaLoteCreate, db: Session = Depends(get_db)):
+    """Cria várias reservas em uma única transação (tudo ou nada, ou aceitando parcialmente)."""
+    resultado = crud.create_reservas_lote(db, lote)
+    for item in resultado.resultados:
+        if item.reserva:
+            indice.registrar(item.reserva)
+    return resultado
+
+
+@router.post("/recorrentes", response_model=schemas.ReservaSerie)
+def create_reservas_recorrentes(recorrencia: schemas.ReservaRecorrenteCreate, db: Session = Depends(get_db)):
+    """Cria uma série de reservas semanais/quinzenais entre duas datas, ignorando as exceções."""
+    serie = crud.create_reservas_recorrentes(db, recorrencia)
+    for reserva in serie.reservas:
+        indice.registrar(reserva)
+    return serie
+
+
+@router.post("/alocar", response_model=schemas.AlocacaoResultado)
+def alocar_salas(pedido: schemas.AlocacaoCreate, db: Session = Depends(get_db)):
+    """Escolhe as salas de um conjunto de demandas (recorrência, capacidade mínima, recursos, bloco) de uma só vez
+    e cria uma série de reservas para cada demanda atendida. (gravar=false apenas simula)"""
+    resultado, criadas = alocacao.alocar(db, pedido)
+    for reserva in criadas:
+        indice.registrar(reserva)
+    return resultado
+
+
+@router.get("/series/{serie_id}", response_model=schemas.ReservaSerie)
+def get_serie(serie_id: str, db: Session = Depends(get_db_leitura)):
+    """Consulta todas as ocorrências de uma série."""
+    return crud.get_serie(db, serie_id)
+
+
+@router.put("/series/{serie_id}", response_model=schemas.ReservaSerie)
+def update_serie(serie_id: str, dados: schemas.ReservaSerieUpdate, db: Session = Depends(get_db)):
+    """Move as ocorrências de uma série para outra sala e/ou horário."""
+    salas_anteriores = {sala_id for (sala_id,) in db.query(models.Reservas.sala_id).filter(models.Reservas.serie_id == serie_id).distinct()}
+    serie = crud.update_serie(db, serie_id, dados)
+    for sala_id in salas_anteriores | {reserva.sala_id for reserva in serie.reservas}:
+        indice.invalidar(sala_id=sala_id)
+    return serie
+
+
+@router.delete("/series/{serie_id}")
+def delete_serie(serie_id: str, a_partir_de: Optional[date] = None, db: Session = Depends(get_db)):
+    """Cancela todas as ocorrências de uma série (ou apenas as que ocorrem a partir de uma data)."""
+    removidas = crud.delete_serie(db, serie_id, a_partir_de)
+    for reserva_id, sala_id, data_reserva in removidas:
+        indice.remover(reserva_id, sala_id, data_reserva)
+    return {"detail": f"{len(removidas)} reservas da série canceladas com sucesso"}
+
+
+@router.get("/", response_model=list[schemas.Reserva])
+def get_reservas(response: Response, pagina: Paginacao = Depends(), data_inicio: Optional[date] = None,
+                 data_fim: Optional[date] = None, sala_id: Optional[int] = None, coordenador_id: Optional[int] = None,
+                 db: Session = Depends(get_db_leitura)):
+    """Consulta de todos as reservas no banco de dados. (paginada por id; o cabeçalho X-Proximo-Cursor indica o `apos_id` da próxima página)"""
+    modelo = particoes.modelo_reservas(db, data_inicio)
+    filtros = crud.filtros_reservas(data_inicio, data_fim, sala_id, coordenador_id, modelo)
+    if config.JSON_RAPIDO and pagina.formato == "json":
+        return listar_linhas(lambda sessao: sessao.query(modelo).filter(*filtros), modelo, schemas.Reserva, db, pagina)
+    return listar(lambda sessao: sessao.query(modelo).filter(*filtros), modelo, schemas.Reserva, db, response, pagina)
+
+@router.get("/proxima_semana", response_model=list[schemas.Reserva])
+def alerta_reservas(db: Session = Depends(get_db_leitura)):
+    """Consulta das reservas para os próximos 7 dias."""
+    # Limites do tipo date (e não datetime) permitem ao PostgreSQL descartar as partições fora da semana.
+    hoje = date.today()
+    filtros = (models.Reservas.data_reserva > hoje, models.Reservas.data_reserva <= hoje + timedelta(days=7))
+    if config.JSON_RAPIDO:
+        linhas = db.query(*serializacao.colunas(models.Reservas, schemas.Reserva)).filter(*filtros).all()
+        return serializacao.resposta_linhas(linhas, schemas.Reserva)
+    reservas_futuras = db.query(models.Reservas).filter(*filtros).all()
+
+    return reservas_futuras
+
+@router.post("/importar", response_model=schemas.ResultadoImportacao)
+async def importar_reservas(request: Request, formato: Optional[importacao.Formato] = None, db: Session = Depends(get_db)):
+    """Importa reservas de um arquivo CSV (com cabeçalho) ou NDJSON enviado no corpo; retorna os erros por linha.
+    (sem `formato`, usa o Content-Type: text/csv ou application/x-ndjson)"""
+    return await importacao.importar_requisicao(request, "reservas", formato, db)
+
+@router.get("/exportar")
+def exportar_reservas(formato: importacao.Formato = "csv", data_inicio: Optional[date] = None, data_fim: Optional[date] = None,
+                      sala_id: Optional[int] = None, coordenador_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Exporta as reservas (com os mesmos filtros da listagem) em CSV ou NDJSON, em streaming."""
+    modelo = particoes.modelo_reservas(db, data_inicio)
+    filtros = crud.filtros_reservas(data_inicio, data_fim, sala_id, coordenador_id, modelo)
+    return importacao.exportar(lambda sessao: sessao.query(modelo).filter(*filtros), modelo, schemas.Reserva, formato, "reservas")
+
+@router.get("/eventos")
+async def eventos_reservas(sala_id: Optional[int] = None, bloco_id: Optional[int] = None, data_inicio: Optional[date] = None,
+                           data_fim: Optional[date] = None,
+                           desde: Optional[str] = Query(None, description="Token do último evento recebido (o mesmo do cabeçalho Last-Event-ID)"),
+                           last_event_id: Optional[str] = Header(None)):
+    """Feed (Server-Sent Events) das reservas criadas, alteradas e removidas, com filtros por sala, bloco e período.
+    (ao reconectar, o navegador envia Last-Event-ID e recebe apenas os eventos perdidos; `reinicio` pede para recarregar tudo)"""
+    if not config.EVENTOS_ATIVOS:
+        raise HTTPException(status_code=404, detail="Feed de eventos desativado")
+    filtro = eventos.Filtro(sala_id, bloco_id, data_inicio, data_fim)
+    return StreamingResponse(eventos.transmitir(filtro, desde or last_event_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/{reserva_id}", response_model=schemas.Reserva)
+def get_reserva(reserva_id: int, db: Session = Depends(get_db_leitura)):
+    """Consulta de uma reserva específica."""
+    reserva = db.query(models.Reservas).filter(models.Reservas.id == reserva_id).first()
+    if not reserva:
+        reserva = db.get(models.ReservasArquivo, reserva_id)
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva não encontrada")
+    return reserva
+
+
+@router.put("/{reserva_id}", response_model=schemas.Reserva)
+def update_reserva(reserva_id: int, reserva_data: schemas.ReservaCreate, db: Session = Depends(get_db)):
+    """Altera/atualiza as informações de uma reserva."""
+    reserva, (sala_anterior, data_anterior) = crud.update_reserva(db, reserva_id, reserva_data)
+    indice.remover(reserva.id, sala_anterior, data_anterior)
+    indice.registrar(reserva)
+    return reserva
+
+@router.patch("/{reserva_id}", response_model=schemas.Reserva)
+def patch_reserva(reserva_id: int, reserva_data: schemas.ReservaUpdate, db: Session = Depends(get_db)):
+    """Atualiza apenas os campos enviados de uma reserva, em um único UPDATE ... RETURNING.
+    (versao: quando informada, a alteração só é aplicada se a reserva não mudou desde a leitura; senão, 409)"""
+    reserva, (sala_anterior, data_anterior, _, _) = crud.patch_reserva(db, reserva_id, reserva_data)
+    indice.remover(reserva_id, sala_anterior, data_anterior)
+    indice.registrar(reserva)
+    return reserva
+
+@router.delete("/{reserva_id}")
+def delete_reserva(reserva_id: int, db: Session = Depends(get_db)):
+    """Cancela uma reserva uma reserva."""
+    reserva = db.query(models.Reservas).filter(models.Reservas.id == reserva_id).first()
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva não encontrada")
+    sala_id, data_reserva = reserva.sala_id, reserva.data_reserva
+    try:
+        db.delete(reserva)
+        db.commit()
+    except SQLAlchemyError as e:
+        # Alterada por outra requisição entre a leitura e o DELETE (versao diferente): 409.
+        raise crud.erro_ao_salvar(db, e)
+    indice.remover(reserva_id, sala_id, data_reserva)
+    return {"detail": "Reserva cancelada com sucesso"}
+
+@router.get("/disponibilidade/")
+def verificar_disponibilidade(sala_id: int, data: date, hora_inicio: time, hora_fim: time, db: Session = Depends(get_db_leitura)):
+    """Verifica se uma sala está disponível em um determinado horário. (data: aaaa-mm-dd | hora: hh:mm:ss)"""
+    if crud.reserva_em_conflito(db, sala_id, data, hora_inicio, hora_fim):
+        return {"disponivel": False, "mensagem": "A sala já está reservada nesse horário."}
+    return {"disponivel": True, "mensagem": "A sala está disponível para reserva."}
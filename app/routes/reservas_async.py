@@ -0,0 +1,111 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import config, models, particoes, schemas, serializacao, crud, crud_async
+from app.database import get_async_db, get_async_db_leitura
+from app.indice_reservas import indice
+from app.paginacao import Paginacao, listar_async, listar_linhas_async
+from datetime import date, time, timedelta
+from typing import Optional
+
+# Rotas de reservas mais acessadas em versão async, ativadas com MODO_ASYNC.
+# São registradas antes de app/routes/reservas.py, que continua atendendo as demais.
+# As escritas com regras mais longas (lote, recorrentes, PUT e PATCH) reaproveitam as funções de
+# app/crud.py por AsyncSession.run_sync: a sessão síncrona roda sobre a conexão async, sem ocupar o threadpool.
+router = APIRouter(prefix="/reservas", tags=["Reservas"])
+
+@router.post("/", response_model=schemas.Reserva)
+async def create_reserva(reserva_data: schemas.ReservaCreate, db: AsyncSession = Depends(get_async_db)):
+    """Cria uma nova reserva"""
+    reserva = await crud_async.create_reserva(db, reserva_data)
+    indice.registrar(reserva)
+    return reserva
+
+@router.post("/lote", response_model=schemas.ReservaLoteResultado)
+async def create_reservas_lote(lote: schemas.ReservaLoteCreate, db: AsyncSession = Depends(get_async_db)):
+    """Cria várias reservas em uma única transação (tudo ou nada, ou aceitando parcialmente)."""
+    resultado = await db.run_sync(crud.create_reservas_lote, lote)
+    for item in resultado.resultados:
+        if item.reserva:
+            indice.registrar(item.reserva)
+    return resultado
+
+@router.post("/recorrentes", response_model=schemas.ReservaSerie)
+async def create_reservas_recorrentes(recorrencia: schemas.ReservaRecorrenteCreate, db: AsyncSession = Depends(get_async_db)):
+    """Cria uma série de reservas semanais/quinzenais entre duas datas, ignorando as exceções."""
+    serie = await db.run_sync(crud.create_reservas_recorrentes, recorrencia)
+    for reserva in serie.reservas:
+        indice.registrar(reserva)
+    return serie
+
+@router.get("/", response_model=list[schemas.Reserva])
+async def get_reservas(response: Response, pagina: Paginacao = Depends(), data_inicio: Optional[date] = None,
+                       data_fim: Optional[date] = None, sala_id: Optional[int] = None, coordenador_id: Optional[int] = None,
+                       db: AsyncSession = Depends(get_async_db_leitura)):
+    """Consulta de todos as reservas no banco de dados. (paginada por id; o cabeçalho X-Proximo-Cursor indica o `apos_id` da próxima página)"""
+    modelo = await particoes.modelo_reservas_async(db, data_inicio)
+    consulta = select(modelo).where(*crud.filtros_reservas(data_inicio, data_fim, sala_id, coordenador_id, modelo))
+    if config.JSON_RAPIDO and pagina.formato == "json":
+        return await listar_linhas_async(consulta, modelo, schemas.Reserva, db, pagina)
+    return await listar_async(consulta, modelo, schemas.Reserva, db, response, pagina)
+
+@router.get("/proxima_semana", response_model=list[schemas.Reserva])
+async def alerta_reservas(db: AsyncSession = Depends(get_async_db_leitura)):
+    """Consulta das reservas para os próximos 7 dias."""
+    hoje = date.today()
+    filtros = (models.Reservas.data_reserva > hoje, models.Reservas.data_reserva <= hoje + timedelta(days=7))
+    if config.JSON_RAPIDO:
+        linhas = (await db.execute(select(*serializacao.colunas(models.Reservas, schemas.Reserva)).where(*filtros))).all()
+        return serializacao.resposta_linhas(linhas, schemas.Reserva)
+    reservas_futuras = await db.scalars(select(models.Reservas).where(*filtros))
+
+    return reservas_futuras.all()
+
+@router.get("/{reserva_id:int}", response_model=schemas.Reserva)
+async def get_reserva(reserva_id: int, db: AsyncSession = Depends(get_async_db_leitura)):
+    """Consulta de uma reserva específica."""
+    reserva = await db.get(models.Reservas, reserva_id) or await db.get(models.ReservasArquivo, reserva_id)
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva não encontrada")
+    return reserva
+
+@router.put("/{reserva_id:int}", response_model=schemas.Reserva)
+async def update_reserva(reserva_id: int, reserva_data: schemas.ReservaCreate, db: AsyncSession = Depends(get_async_db)):
+    """Altera/atualiza as informações de uma reserva."""
+    reserva, (sala_anterior, data_anterior) = await db.run_sync(crud.update_reserva, reserva_id, reserva_data)
+    indice.remover(reserva.id, sala_anterior, data_anterior)
+    indice.registrar(reserva)
+    return reserva
+
+@router.patch("/{reserva_id:int}", response_model=schemas.Reserva)
+async def patch_reserva(reserva_id: int, reserva_data: schemas.ReservaUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Atualiza apenas os campos enviados de uma reserva, em um único UPDATE ... RETURNING.
+    (versao: quando informada, a alteração só é aplicada se a reserva não mudou desde a leitura; senão, 409)"""
+    reserva, (sala_anterior, data_anterior, _, _) = await db.run_sync(crud.patch_reserva, reserva_id, reserva_data)
+    indice.remover(reserva_id, sala_anterior, data_anterior)
+    indice.registrar(reserva)
+    return reserva
+
+@router.delete("/{reserva_id:int}")
+async def delete_reserva(reserva_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Cancela uma reserva uma reserva."""
+    reserva = await db.get(models.Reservas, reserva_id)
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva não encontrada")
+    sala_id, data_reserva = reserva.sala_id, reserva.data_reserva
+    try:
+        await db.delete(reserva)
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise crud.erro_do_banco(e)
+    indice.remover(reserva_id, sala_id, data_reserva)
+    return {"detail": "Reserva cancelada com sucesso"}
+
+@router.get("/disponibilidade/")
+async def verificar_disponibilidade(sala_id: int, data: date, hora_inicio: time, hora_fim: time, db: AsyncSession = Depends(get_async_db_leitura)):
+    """Verifica se uma sala está disponível em um determinado horário. (data: aaaa-mm-dd | hora: hh:mm:ss)"""
+    if await crud_async.reserva_em_conflito(db, sala_id, data, hora_inicio, hora_fim):
+        return {"disponivel": False, "mensagem": "A sala já está reservada nesse horário."}
+    return {"disponivel": True, "mensagem": "A sala está disponível para reserva."}
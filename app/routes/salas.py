@@ -1,57 +1,144 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app import models, schemas, crud
-from app.database import get_db
-
-router = APIRouter(prefix="/salas", tags=["Salas"])
-
-@router.post("/", response_model=schemas.Sala)
-def create_sala(sala_data: schemas.SalaCreate, db: Session = Depends(get_db)):
-    """Cria uma nova sala"""
-    return crud.create_sala(db, sala_data)
-
-@router.get("/", response_model=list[schemas.Sala])
-def get_salas(db: Session = Depends(get_db)):
-    """Consulta de todas as salas no banco de dados."""
-    return db.query(models.Salas).all()
-
-@router.get("/{sala_id}", response_model=schemas.Sala)
-def get_sala(sala_id: int, db: Session = Depends(get_db)):
-    """Consulta de uma sala específica."""
-    sala = db.query(models.Salas).filter(models.Salas.id == sala_id).first()
-    if not sala:
-        raise HTTPException(status_code=404, detail="Sala não encontrada")
-    return sala
-
-
-@router.put("/{sala_id}", response_model=schemas.Sala)
-def update_sala(sala_id: int, sala_data: schemas.SalaCreate, db: Session = Depends(get_db)):
-    """Altera/atualiza as informações de uma sala."""
-    bloco = db.query(models.Blocos).filter(models.Blocos.id == sala_data.bloco_id).first()
-    if not bloco:
-        raise HTTPException(status_code=404, detail="Bloco não encontrado")
-
-    sala = db.query(models.Salas).filter(models.Salas.id == sala_id).first()
-    if not sala:
-        raise HTTPException(status_code=404, detail="Sala não encontrada")
-
-    sala.numero = sala_data.numero
-    sala.capacidade = sala_data.capacidade
-    sala.recursos = sala_data.recursos
-    sala.bloco_id = sala_data.bloco_id
-    sala.curso_id = bloco.curso_id
-    sala.exclusivo = sala_data.exclusivo
-    db.commit()
-    db.refresh(sala)
-    return sala
-
-
-@router.delete("/{sala_id}")
-def delete_sala(sala_id: int, db: Session = Depends(get_db)):
-    """Deleta uma sala."""
-    sala = db.query(models.Salas).filter(models.Salas.id == sala_id).first()
-    if not sala:
-        raise HTTPException(status_code=404, detail="Sala não encontrada")
-    db.delete(sala)
-    db.commit()
-    return {"detail": "Sala deletada com sucesso"}
+from datetime import date, time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import exists, or_
+from sqlalchemy.orm import Session
+from app import agenda, config, importacao, models, ocupacao, schemas, crud
+from app.cache import cache
+from app.database import get_db, get_db_leitura
+from app.indice_reservas import indice
+from app.paginacao import Paginacao, listar
+from app.recursos import filtros_sql, mapa_recursos, normalizar
+
+router = APIRouter(prefix="/salas", tags=["Salas"])
+
+@router.post("/", response_model=schemas.Sala)
+def create_sala(sala_data: schemas.SalaCreate, db: Session = Depends(get_db)):
+    """Cria uma nova sala"""
+    sala = crud.create_sala(db, sala_data)
+    cache.invalidar("salas")
+    return sala
+
+@router.get("/", response_model=list[schemas.Sala])
+def get_salas(request: Request, response: Response, pagina: Paginacao = Depends(),
+              recursos: Optional[str] = Query(None, description="Etiquetas exigidas, separadas por vírgula"),
+              capacidade_min: Optional[int] = Query(None, gt=0), bloco_id: Optional[int] = None,
+              db: Session = Depends(get_db_leitura)):
+    """Consulta de todas as salas no banco de dados. (paginada por id; o cabeçalho X-Proximo-Cursor indica o `apos_id` da próxima página)"""
+    etiquetas = normalizar(recursos)
+    filtros = filtros_sql(etiquetas, capacidade_min, bloco_id)
+
+    def consultar(resposta: Response):
+        if filtros and config.RECURSOS_MAPA_ATIVO and pagina.formato == "json":
+            # O mapa em memória resolve os filtros; o banco só lê as salas da página pela chave primária.
+            ids = mapa_recursos.filtrar(db, etiquetas, capacidade_min, bloco_id, pagina.apos_id, pagina.limite + 1)
+            return listar(lambda sessao: sessao.query(models.Salas).filter(models.Salas.id.in_(ids)),
+                          models.Salas, schemas.Sala, db, resposta, pagina)
+        return listar(lambda sessao: sessao.query(models.Salas).filter(*filtros), models.Salas, schemas.Sala, db, resposta, pagina)
+
+    if not config.CACHE_ATIVO or pagina.formato == "ndjson":
+        return consultar(response)
+    return cache.responder(request, db, "salas", schemas.Sala, consultar)
+
+@router.get("/livres", response_model=list[schemas.Sala])
+def get_salas_livres(data: date, hora_inicio: time, hora_fim: time, capacidade_min: Optional[int] = None,
+                     bloco_id: Optional[int] = None, recursos: Optional[str] = None,
+                     coordenador_id: Optional[int] = None, db: Session = Depends(get_db_leitura)):
+    """Salas livres no horário que atendem aos filtros, da menor capacidade suficiente para a maior.
+    (recursos: etiquetas separadas por vírgula | coordenador_id: inclui as salas exclusivas do seu curso)"""
+    if hora_inicio >= hora_fim:
+        raise HTTPException(status_code=400, detail="Erro: O horário de início deve ser anterior ao horário de fim.")
+    ocupada = exists().where(
+        models.Reservas.sala_id == models.Salas.id,
+        models.Reservas.data_reserva == data,
+        models.Reservas.hora_inicio < hora_fim,
+        models.Reservas.hora_fim > hora_inicio
+    )
+    query = db.query(models.Salas).filter(~ocupada, *filtros_sql(normalizar(recursos), capacidade_min, bloco_id))
+
+    if coordenador_id is not None:
+        curso_do_coordenador = db.query(models.Coordenadores.curso_id).filter(
+            models.Coordenadores.id == coordenador_id
+        ).scalar_subquery()
+        query = query.filter(or_(models.Salas.exclusivo.is_(False), models.Salas.curso_id == curso_do_coordenador))
+    else:
+        query = query.filter(models.Salas.exclusivo.is_(False))
+
+    return query.order_by(models.Salas.capacidade, models.Salas.id).all()
+
+@router.post("/importar", response_model=schemas.ResultadoImportacao)
+async def importar_salas(request: Request, formato: Optional[importacao.Formato] = None, db: Session = Depends(get_db)):
+    """Importa salas de um arquivo CSV (com cabeçalho) ou NDJSON enviado no corpo; retorna os erros por linha.
+    (sem `formato`, usa o Content-Type: text/csv ou application/x-ndjson)"""
+    return await importacao.importar_requisicao(request, "salas", formato, db)
+
+@router.get("/exportar")
+def exportar_salas(formato: importacao.Formato = "csv"):
+    """Exporta todas as salas em CSV ou NDJSON, em streaming."""
+    return importacao.exportar(lambda sessao: sessao.query(models.Salas), models.Salas, schemas.Sala, formato, "salas")
+
+@router.get("/{sala_id}/agenda", response_model=schemas.AgendaSala, response_model_exclude_none=True)
+def get_agenda_sala(sala_id: int, inicio: date, fim: date, granularidade: Optional[int] = Query(None, ge=5, le=240),
+                    db: Session = Depends(get_db_leitura)):
+    """Agenda da sala no período: intervalos livres e ocupados de cada dia dentro do horário de funcionamento.
+    (granularidade: tamanho da faixa em minutos; quando informada, retorna um bitmap de ocupação por dia)"""
+    agenda.validar_periodo(inicio, fim)
+    if not db.query(exists().where(models.Salas.id == sala_id)).scalar():
+        raise HTTPException(status_code=404, detail="Sala não encontrada")
+    ocupados = agenda.ocupacao(db, [sala_id], inicio, fim)
+    return agenda.montar_agenda(sala_id, ocupados.get(sala_id, {}), inicio, fim, granularidade)
+
+@router.get("/{sala_id}", response_model=schemas.Sala)
+def get_sala(sala_id: int, db: Session = Depends(get_db_leitura)):
+    """Consulta de uma sala específica."""
+    sala = db.query(models.Salas).filter(models.Salas.id == sala_id).first()
+    if not sala:
+        raise HTTPException(status_code=404, detail="Sala não encontrada")
+    return sala
+
+
+@router.put("/{sala_id}", response_model=schemas.Sala)
+def update_sala(sala_id: int, sala_data: schemas.SalaCreate, db: Session = Depends(get_db)):
+    """Altera/atualiza as informações de uma sala."""
+    bloco = db.query(models.Blocos).filter(models.Blocos.id == sala_data.bloco_id).first()
+    if not bloco:
+        raise HTTPException(status_code=404, detail="Bloco não encontrado")
+
+    sala = db.query(models.Salas).filter(models.Salas.id == sala_id).first()
+    if not sala:
+        raise HTTPException(status_code=404, detail="Sala não encontrada")
+
+    if config.OCUPACAO_ATIVA and sala.bloco_id != sala_data.bloco_id:
+        ocupacao.mover_sala(db, sala_id, sala.bloco_id, sala_data.bloco_id)
+
+    sala.numero = sala_data.numero
+    sala.capacidade = sala_data.capacidade
+    sala.recursos = sala_data.recursos
+    sala.bloco_id = sala_data.bloco_id
+    sala.curso_id = bloco.curso_id
+    sala.exclusivo = sala_data.exclusivo
+    db.commit()
+    db.refresh(sala)
+    cache.invalidar("salas")
+    return sala
+
+
+@router.patch("/{sala_id}", response_model=schemas.Sala)
+def patch_sala(sala_id: int, sala_data: schemas.SalaUpdate, db: Session = Depends(get_db)):
+    """Atualiza apenas os campos enviados de uma sala, em um único UPDATE ... RETURNING."""
+    sala = crud.patch_sala(db, sala_id, sala_data)
+    cache.invalidar("salas")
+    return sala
+
+@router.delete("/{sala_id}")
+def delete_sala(sala_id: int, db: Session = Depends(get_db)):
+    """Deleta uma sala."""
+    sala = db.query(models.Salas).filter(models.Salas.id == sala_id).first()
+    if not sala:
+        raise HTTPException(status_code=404, detail="Sala não encontrada")
+    db.delete(sala)
+    db.commit()
+    indice.invalidar(sala_id=sala_id)
+    cache.invalidar("salas")
+    return {"detail": "Sala deletada com sucesso"}
@@ -1,76 +1,231 @@
-from pydantic import BaseModel, Field
-from datetime import date, time
-from typing import List, Optional
-
-class BlocoBase(BaseModel):
-    curso_id: int
-    nome: str = Field(..., max_length=100)
-
-class BlocoCreate(BlocoBase):
-    pass
-
-class Bloco(BlocoBase):
-    id: int
-
-    class Config:
-        from_attributes = True
-
-class SalaBase(BaseModel):
-    bloco_id: int
-    numero: int = Field(..., gt=0)
-    capacidade: int = Field(..., gt=0)
-    recursos: str = Field(..., max_length=100)
-    exclusivo: bool = Field(default=False, description="Indica se a sala é exclusiva para um curso")
-
-class SalaCreate(SalaBase):
-    pass
-
-class Sala(SalaBase):
-    id: int
-
-    class Config:
-        from_attributes = True
-
-class CoordenadorBase(BaseModel):
-    curso_id: int
-    nome: str = Field(..., max_length=100)
-    email: str = Field(..., max_length=100)
-    senha: str = Field(..., max_length=255)
-
-class CoordenadorCreate(CoordenadorBase):
-    pass
-
-class Coordenador(CoordenadorBase):
-    id: int
-
-    class Config:
-        from_attributes = True
-
-class ReservaBase(BaseModel):
-    sala_id: int
-    coordenador_id: int
-    data_reserva: date
-    hora_inicio: time
-    hora_fim: time
-    motivo: str = Field(..., max_length=100)
-
-class ReservaCreate(ReservaBase):
-    pass
-
-class Reserva(ReservaBase):
-    id: int
-
-    class Config:
-        from_attributes = True
-
-class CursoBase(BaseModel):
-    nome: str = Field(..., max_length=100)
-
-class CursoCreate(CursoBase):
-    pass
-
-class Curso(CursoBase):
-    id: int
-
-    class Config:
-        from_attributes = True
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from datetime import date, time
+from typing import List, Literal, Optional
+
+def _validar_horario(hora_fim: Optional[time], info: ValidationInfo) -> Optional[time]:
+    hora_inicio = info.data.get("hora_inicio")
+    if hora_inicio is not None and hora_fim is not None and hora_inicio >= hora_fim:
+        raise ValueError("O horário de início deve ser anterior ao horário de fim.")
+    return hora_fim
+
+class BlocoBase(BaseModel):
+    curso_id: int
+    nome: str = Field(..., max_length=100)
+
+class BlocoCreate(BlocoBase):
+    pass
+
+class BlocoUpdate(BaseModel):
+    curso_id: Optional[int] = None
+    nome: Optional[str] = Field(default=None, max_length=100)
+
+class Bloco(BlocoBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class SalaBase(BaseModel):
+    bloco_id: int
+    numero: int = Field(..., gt=0)
+    capacidade: int = Field(..., gt=0)
+    recursos: str = Field(..., max_length=100)
+    exclusivo: bool = Field(default=False, description="Indica se a sala é exclusiva para um curso")
+
+class SalaCreate(SalaBase):
+    pass
+
+class SalaUpdate(BaseModel):
+    bloco_id: Optional[int] = None
+    numero: Optional[int] = Field(default=None, gt=0)
+    capacidade: Optional[int] = Field(default=None, gt=0)
+    recursos: Optional[str] = Field(default=None, max_length=100)
+    exclusivo: Optional[bool] = None
+
+class Sala(SalaBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class CoordenadorBase(BaseModel):
+    curso_id: int
+    nome: str = Field(..., max_length=100)
+    email: str = Field(..., max_length=100)
+    senha: str = Field(..., max_length=255)
+
+class CoordenadorCreate(CoordenadorBase):
+    pass
+
+class CoordenadorUpdate(BaseModel):
+    curso_id: Optional[int] = None
+    nome: Optional[str] = Field(default=None, max_length=100)
+    email: Optional[str] = Field(default=None, max_length=100)
+    senha: Optional[str] = Field(default=None, max_length=255)
+
+class Coordenador(CoordenadorBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class ReservaBase(BaseModel):
+    sala_id: int
+    coordenador_id: int
+    data_reserva: date
+    hora_inicio: time
+    hora_fim: time
+    motivo: str = Field(..., max_length=100)
+
+class ReservaCreate(ReservaBase):
+    _horario = field_validator("hora_fim")(_validar_horario)
+
+class ReservaUpdate(BaseModel):
+    sala_id: Optional[int] = None
+    coordenador_id: Optional[int] = None
+    data_reserva: Optional[date] = None
+    hora_inicio: Optional[time] = None
+    hora_fim: Optional[time] = None
+    motivo: Optional[str] = Field(default=None, max_length=100)
+    versao: Optional[int] = Field(default=None, description="Versão lida da reserva; se informada e a reserva tiver sido alterada depois, o PATCH é recusado com 409")
+
+    _horario = field_validator("hora_fim")(_validar_horario)
+
+class Reserva(ReservaBase):
+    id: int
+    serie_id: Optional[str] = None
+    versao: int = 1
+
+    class Config:
+        from_attributes = True
+
+class ReservaRecorrenteCreate(BaseModel):
+    sala_id: int
+    coordenador_id: int
+    data_inicio: date
+    data_fim: date
+    hora_inicio: time
+    hora_fim: time
+    motivo: str = Field(..., max_length=100)
+    frequencia: Literal["semanal", "quinzenal"] = "semanal"
+    excecoes: List[date] = Field(default_factory=list, description="Datas em que não haverá reserva (feriados, recessos)")
+
+    _horario = field_validator("hora_fim")(_validar_horario)
+
+class ReservaSerieUpdate(BaseModel):
+    sala_id: Optional[int] = None
+    hora_inicio: Optional[time] = None
+    hora_fim: Optional[time] = None
+    a_partir_de: Optional[date] = Field(default=None, description="Altera apenas as ocorrências a partir dessa data")
+
+class ReservaSerie(BaseModel):
+    serie_id: str
+    reservas: List[Reserva]
+
+class ReservaLoteCreate(BaseModel):
+    reservas: List[ReservaCreate] = Field(..., min_length=1)
+    tudo_ou_nada: bool = Field(default=True, description="Se verdadeiro, nenhuma reserva é criada quando algum item falhar")
+
+class ReservaLoteItem(BaseModel):
+    indice: int
+    status_code: int
+    reserva: Optional[Reserva] = None
+    erro: Optional[str] = None
+
+class ReservaLoteResultado(BaseModel):
+    criadas: int
+    resultados: List[ReservaLoteItem]
+
+class IntervaloAgenda(BaseModel):
+    inicio: time
+    fim: time
+
+class DiaAgenda(BaseModel):
+    data: date
+    ocupados: Optional[List[IntervaloAgenda]] = None
+    livres: Optional[List[IntervaloAgenda]] = None
+    bitmap: Optional[str] = Field(default=None, description="Uma posição por faixa a partir da abertura ('1' = ocupada)")
+
+class AgendaSala(BaseModel):
+    sala_id: int
+    dias: List[DiaAgenda]
+
+class OcupacaoDia(BaseModel):
+    data: date
+    salas_ocupadas: List[int] = Field(..., description="Quantidade de salas ocupadas em cada faixa")
+
+class AgendaBloco(BaseModel):
+    bloco_id: int
+    abertura: time
+    fechamento: time
+    granularidade: int
+    salas: List[AgendaSala]
+    ocupacao: List[OcupacaoDia]
+
+class Utilizacao(BaseModel):
+    id: int = Field(..., description="Id da sala, do bloco ou do curso, conforme o agrupamento")
+    salas: int
+    reservas: int
+    horas_reservadas: float
+    horas_disponiveis: float
+    taxa_ocupacao: float
+
+class PicoOcupacao(BaseModel):
+    dia_semana: int = Field(..., description="0 = segunda-feira ... 6 = domingo")
+    hora: time
+    horas_reservadas: float
+    taxa_ocupacao: float
+
+class ErroImportacao(BaseModel):
+    linha: int
+    erro: str
+
+class ResultadoImportacao(BaseModel):
+    importados: int
+    erros: List[ErroImportacao]
+
+class DemandaAlocacao(BaseModel):
+    coordenador_id: int = Field(..., description="Define o curso, usado na regra das salas exclusivas")
+    data_inicio: date
+    data_fim: date
+    hora_inicio: time
+    hora_fim: time
+    motivo: str = Field(..., max_length=100)
+    frequencia: Literal["semanal", "quinzenal"] = "semanal"
+    excecoes: List[date] = Field(default_factory=list, description="Datas em que não haverá reserva (feriados, recessos)")
+    capacidade_min: int = Field(1, gt=0)
+    recursos: List[str] = Field(default_factory=list, description="Etiquetas de recursos exigidas na sala (comparadas já normalizadas)")
+    bloco_id: Optional[int] = None
+
+class AlocacaoCreate(BaseModel):
+    demandas: List[DemandaAlocacao] = Field(..., min_length=1)
+    gravar: bool = Field(default=True, description="Se falso, apenas calcula a alocação, sem criar reservas")
+    tudo_ou_nada: bool = Field(default=False, description="Se verdadeiro, nada é gravado quando alguma demanda ficar sem sala")
+
+class AlocacaoItem(BaseModel):
+    indice: int
+    sala_id: Optional[int] = None
+    serie_id: Optional[str] = None
+    reservas: int = 0
+    erro: Optional[str] = None
+
+class AlocacaoResultado(BaseModel):
+    alocadas: int
+    nao_alocadas: int
+    aproveitamento: Optional[float] = Field(default=None, description="Média de capacidade_min / capacidade das salas atribuídas")
+    itens: List[AlocacaoItem]
+
+class CursoBase(BaseModel):
+    nome: str = Field(..., max_length=100)
+
+class CursoCreate(CursoBase):
+    pass
+
+class CursoUpdate(BaseModel):
+    nome: Optional[str] = Field(default=None, max_length=100)
+
+class Curso(CursoBase):
+    id: int
+
+    class Config:
+        from_attributes = True
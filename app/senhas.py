@@ -0,0 +1,61 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from passlib.context import CryptContext
+
+from app import config
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=config.BCRYPT_ROUNDS)
+
+# O bcrypt ocupa a CPU por centenas de milissegundos; os hashes são calculados em
+# um pool de processos limitado a SENHAS_PROCESSOS (0 calcula no próprio processo).
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=config.SENHAS_PROCESSOS)
+    return _executor
+
+
+def _hash(senha: str) -> str:
+    return pwd_context.hash(senha)
+
+
+def hash_senha(senha: str) -> str:
+    if config.SENHAS_PROCESSOS <= 0:
+        return _hash(senha)
+    return _pool().submit(_hash, senha).result()
+
+
+async def hash_senha_async(senha: str) -> str:
+    """Como hash_senha, mas aguardando o pool sem ocupar uma thread do worker (rotas async)."""
+    if config.SENHAS_PROCESSOS <= 0:
+        return await asyncio.to_thread(_hash, senha)
+    return await asyncio.wrap_future(_pool().submit(_hash, senha))
+
+
+def hash_senhas(senhas: List[str]) -> List[str]:
+    """Calcula vários hashes em paralelo, distribuídos entre os processos do pool."""
+    if config.SENHAS_PROCESSOS <= 0:
+        return [_hash(senha) for senha in senhas]
+    return list(_pool().map(_hash, senhas))
+
+
+async def hash_senhas_async(senhas: List[str]) -> List[str]:
+    return list(await asyncio.gather(*(hash_senha_async(senha) for senha in senhas)))
+
+
+def precisa_novo_hash(senha_enviada: str, hash_atual: str) -> bool:
+    """Indica se a senha enviada em uma atualização precisa ser gravada com um novo hash.
+
+    Não precisa quando o cliente reenvia o próprio hash, como recebido no GET. A
+    comparação é direta: conferir a senha com o bcrypt custaria o mesmo que refazer o hash.
+    """
+    return senha_enviada != hash_atual
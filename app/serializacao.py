@@ -0,0 +1,45 @@
+"""Serialização das listagens grandes sem o caminho padrão do FastAPI (JSON_RAPIDO).
+
+O caminho padrão carrega entidades ORM, valida cada uma contra o `response_model`
+e codifica o resultado com o `json` da biblioteca padrão. Aqui a consulta traz
+apenas as colunas do schema, como tuplas, e elas são codificadas diretamente:
+com o orjson, se estiver instalado, ou com o serializador do Pydantic sobre
+instâncias montadas sem validação (`model_construct`).
+"""
+from functools import lru_cache
+from typing import Iterable, List, Sequence, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # dependência opcional
+    orjson = None
+
+
+@lru_cache(maxsize=None)
+def adaptador_lista(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+@lru_cache(maxsize=None)
+def campos(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    return tuple(schema.model_fields)
+
+
+def colunas(modelo, schema: Type[BaseModel]) -> list:
+    """Atributos de `modelo` (classe ou alias ORM) correspondentes aos campos do schema, na mesma ordem."""
+    return [getattr(modelo, campo) for campo in campos(schema)]
+
+
+def json_linhas(linhas: Iterable[Sequence], schema: Type[BaseModel]) -> bytes:
+    """Codifica linhas já no formato do schema (as datas e horários saem em ISO 8601, como no Pydantic)."""
+    nomes = campos(schema)
+    if orjson is not None:
+        return orjson.dumps([dict(zip(nomes, linha)) for linha in linhas])
+    return adaptador_lista(schema).dump_json([schema.model_construct(**dict(zip(nomes, linha))) for linha in linhas])
+
+
+def resposta_linhas(linhas: Iterable[Sequence], schema: Type[BaseModel], cabecalhos=None) -> Response:
+    return Response(content=json_linhas(linhas, schema), media_type="application/json", headers=cabecalhos)
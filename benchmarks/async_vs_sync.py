@@ -0,0 +1,66 @@
+"""Compara as rotas de reservas em modo síncrono (threadpool) e async (AsyncSession).
+
+Cada modo roda em um subprocesso próprio, pois MODO_ASYNC é lido na importação de app.main.
+
+    python -m benchmarks.async_vs_sync --url sqlite:///bench.db --concorrencia 200 --requisicoes 4000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+
+async def disparar(app, requisicoes: int, concorrencia: int, sala_ids):
+    import httpx
+
+    from benchmarks.medicao import medir
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        return await medir(requisicoes, concorrencia, lambda i: client.get("/reservas/disponibilidade/", params={
+            "sala_id": sala_ids[i % len(sala_ids)], "data": "2026-03-02",
+            "hora_inicio": "08:00:00", "hora_fim": "09:00:00",
+        }))
+
+
+def executar_modo(args):
+    from app import database, models
+    from app.main import app
+    from benchmarks.semear import semear
+
+    semear(cursos=2, blocos_por_curso=2, salas_por_bloco=50, semanas=2)
+    with database.Sessionlocal() as db:
+        sala_ids = [sala_id for (sala_id,) in db.query(models.Salas.id).limit(200)]
+
+    resultado = asyncio.run(disparar(app, args.requisicoes, args.concorrencia, sala_ids))
+    print(json.dumps(resultado))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///bench.db")
+    parser.add_argument("--concorrencia", type=int, default=200)
+    parser.add_argument("--requisicoes", type=int, default=4000)
+    parser.add_argument("--modo", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        executar_modo(args)
+        return
+
+    resultados = {}
+    for modo in ("sync", "async"):
+        ambiente = dict(os.environ, URL_DATABASE=args.url, MODO_ASYNC="1" if modo == "async" else "0",
+                        INDICE_CONFLITOS_ATIVO="0")
+        saida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.async_vs_sync", "--modo", modo, "--url", args.url,
+             "--concorrencia", str(args.concorrencia), "--requisicoes", str(args.requisicoes)],
+            env=ambiente, check=True, capture_output=True, text=True
+        )
+        resultados[modo] = json.loads(saida.stdout.strip().splitlines()[-1])
+        print(modo, resultados[modo])
+
+
+if __name__ == "__main__":
+    main()
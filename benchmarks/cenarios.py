@@ -0,0 +1,99 @@
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List
+
+from sqlalchemy import func
+
+TURNOS = [("07:30:00", "09:10:00"), ("09:20:00", "11:00:00"), ("13:30:00", "15:10:00"),
+          ("15:20:00", "17:00:00"), ("19:00:00", "20:40:00"), ("20:50:00", "22:30:00")]
+
+
+@dataclass
+class Contexto:
+    salas: List[int]
+    salas_populares: List[int]
+    coordenadores: Dict[int, int]
+    primeira_data: date
+    ultima_data: date
+    maior_reserva_id: int
+    aleatorio: random.Random
+
+    def data_no_semestre(self) -> date:
+        dias = (self.ultima_data - self.primeira_data).days
+        return self.primeira_data + timedelta(days=self.aleatorio.randint(0, max(dias, 0)))
+
+
+def carregar_contexto(semente: int = 7) -> Contexto:
+    from app import database, models
+
+    with database.Sessionlocal() as db:
+        salas = [sala_id for (sala_id,) in db.query(models.Salas.id).order_by(models.Salas.id)]
+        populares = [sala_id for (sala_id,) in db.query(models.Salas.id).filter(
+            models.Salas.exclusivo.is_(False)).order_by(models.Salas.id).limit(10)]
+        coordenadores = dict(db.query(models.Coordenadores.id, models.Coordenadores.curso_id))
+        primeira, ultima, maior_id = db.query(
+            func.min(models.Reservas.data_reserva), func.max(models.Reservas.data_reserva), func.max(models.Reservas.id)
+        ).one()
+    return Contexto(salas, populares, coordenadores, primeira or date.today(), ultima or date.today(),
+                    maior_id or 0, random.Random(semente))
+
+
+def reservas_concorrentes(client, ctx: Contexto, i: int):
+    """POST /reservas/ disputando poucos horários das salas mais procuradas (muitos 400 esperados)."""
+    hora_inicio, hora_fim = ctx.aleatorio.choice(TURNOS)
+    data_reserva = ctx.ultima_data + timedelta(days=ctx.aleatorio.randint(1, 5))
+    return client.post("/reservas/", json={
+        "sala_id": ctx.aleatorio.choice(ctx.salas_populares),
+        "coordenador_id": ctx.aleatorio.choice(list(ctx.coordenadores)),
+        "data_reserva": data_reserva.isoformat(), "hora_inicio": hora_inicio, "hora_fim": hora_fim,
+        "motivo": "Benchmark",
+    })
+
+
+def disponibilidade(client, ctx: Contexto, i: int):
+    """GET /reservas/disponibilidade/ em salas e horários aleatórios do semestre."""
+    hora_inicio, hora_fim = ctx.aleatorio.choice(TURNOS)
+    return client.get("/reservas/disponibilidade/", params={
+        "sala_id": ctx.aleatorio.choice(ctx.salas), "data": ctx.data_no_semestre().isoformat(),
+        "hora_inicio": hora_inicio, "hora_fim": hora_fim,
+    })
+
+
+def listagem_reservas(client, ctx: Contexto, i: int):
+    """GET /reservas/ com páginas de 1000 registros a partir de cursores aleatórios."""
+    return client.get("/reservas/", params={"limite": 1000, "apos_id": ctx.aleatorio.randint(0, ctx.maior_reserva_id)})
+
+
+def listagem_salas(client, ctx: Contexto, i: int):
+    """GET /salas/ com a página máxima."""
+    return client.get("/salas/", params={"limite": 1000})
+
+
+def filtro_salas(client, ctx: Contexto, i: int):
+    """GET /salas/ filtrando por recursos, capacidade mínima e bloco, a partir de cursores aleatórios."""
+    return client.get("/salas/", params={
+        "recursos": ",".join(ctx.aleatorio.sample(["projetor", "ar-condicionado", "computadores", "som"], 2)),
+        "capacidade_min": ctx.aleatorio.choice([30, 40, 60]),
+        "apos_id": ctx.aleatorio.choice(ctx.salas), "limite": 100,
+    })
+
+
+def criacao_coordenadores(client, ctx: Contexto, i: int):
+    """POST /coordenadores/ (inclui o hash bcrypt da senha)."""
+    return client.post("/coordenadores/", json={
+        "curso_id": ctx.aleatorio.choice(list(ctx.coordenadores.values())),
+        "nome": f"Benchmark {i}", "email": f"bench-{ctx.aleatorio.getrandbits(48):x}@bench.local",
+        "senha": "benchmark",
+    })
+
+
+# nome -> (função, requisições padrão)
+CENARIOS: Dict[str, tuple] = {
+    "reservas_concorrentes": (reservas_concorrentes, 2000),
+    "disponibilidade": (disponibilidade, 5000),
+    "listagem_reservas": (listagem_reservas, 200),
+    "listagem_salas": (listagem_salas, 500),
+    "filtro_salas": (filtro_salas, 2000),
+    "criacao_coordenadores": (criacao_coordenadores, 100),
+}
@@ -0,0 +1,72 @@
+"""Compara GET /reservas/ e /reservas/proxima_semana com e sem JSON_RAPIDO em respostas de ~100 mil reservas.
+
+Cada modo roda em um subprocesso próprio, pois a configuração é lida na importação de app.config.
+Os corpos das respostas dos dois modos são comparados pelo hash, para garantir que são idênticos.
+
+    python -m benchmarks.json_rapido --url sqlite:///bench_json.db --linhas 100000
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from datetime import date, timedelta
+
+
+async def disparar(app, rota: str, params: dict, requisicoes: int) -> dict:
+    import httpx
+
+    from benchmarks.medicao import medir
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        resposta = await client.get(rota, params=params)
+        resultado = await medir(requisicoes, 1, lambda i: client.get(rota, params=params))
+    corpo = resposta.content
+    resultado.update(itens=len(json.loads(corpo)), bytes=len(corpo), sha1=hashlib.sha1(corpo).hexdigest()[:12])
+    return resultado
+
+
+def executar_modo(args):
+    from app.main import app
+    from benchmarks.semear import semear
+
+    # 200 salas x 6 dias x 3 reservas = 3.600 reservas por semana; as duas últimas semanas ficam no futuro.
+    semanas = -(-args.linhas // 3600)
+    inicio = date.today() - timedelta(weeks=semanas - 2)
+    semear(cursos=2, blocos_por_curso=2, salas_por_bloco=50, semanas=semanas, inicio_semestre=inicio - timedelta(days=inicio.weekday()))
+
+    resultados = {
+        "listagem": asyncio.run(disparar(app, "/reservas/", {"limite": args.linhas}, args.requisicoes)),
+        "proxima_semana": asyncio.run(disparar(app, "/reservas/proxima_semana", {}, args.requisicoes)),
+    }
+    print(json.dumps(resultados))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///bench_json.db")
+    parser.add_argument("--linhas", type=int, default=100_000, help="Reservas semeadas e tamanho da página pedida")
+    parser.add_argument("--requisicoes", type=int, default=10)
+    parser.add_argument("--modo", choices=["padrao", "rapido"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        executar_modo(args)
+        return
+
+    for modo in ("padrao", "rapido"):
+        ambiente = dict(os.environ, URL_DATABASE=args.url, JSON_RAPIDO="1" if modo == "rapido" else "0",
+                        PAGINACAO_LIMITE_MAXIMO=str(args.linhas), METRICAS_ATIVAS="0")
+        saida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.json_rapido", "--modo", modo, "--url", args.url,
+             "--linhas", str(args.linhas), "--requisicoes", str(args.requisicoes)],
+            env=ambiente, check=True, capture_output=True, text=True
+        )
+        for rota, resultado in json.loads(saida.stdout.strip().splitlines()[-1]).items():
+            print(modo, rota, resultado)
+
+
+if __name__ == "__main__":
+    main()
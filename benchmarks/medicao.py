@@ -0,0 +1,41 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Awaitable, Callable
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+async def medir(requisicoes: int, concorrencia: int, requisitar: Callable[[int], Awaitable]) -> dict:
+    """Executa `requisitar(i)` para i em 0..requisicoes-1 com `concorrencia` tarefas simultâneas.
+
+    `requisitar` devolve a resposta httpx; os códigos de status são contados à parte
+    porque alguns cenários esperam respostas 400 (conflitos de reserva).
+    """
+    latencias = []
+    status = Counter()
+    proxima = iter(range(requisicoes))
+
+    async def trabalhador():
+        for i in proxima:
+            inicio = time.perf_counter()
+            resposta = await requisitar(i)
+            latencias.append(time.perf_counter() - inicio)
+            status[resposta.status_code] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "requisicoes": requisicoes,
+        "concorrencia": concorrencia,
+        "throughput_rps": round(requisicoes / duracao, 1),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "status": {str(codigo): quantidade for codigo, quantidade in sorted(status.items())},
+    }
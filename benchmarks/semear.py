@@ -0,0 +1,91 @@
+import random
+from datetime import date, time, timedelta
+
+from sqlalchemy import func, insert
+
+
+def semear(cursos: int = 8, blocos_por_curso: int = 3, salas_por_bloco: int = 60, semanas: int = 18,
+           reservas_por_sala_dia: int = 3, inicio_semestre: date = date(2026, 2, 2), semente: int = 42) -> dict:
+    """Popula o banco configurado em URL_DATABASE com um semestre de reservas.
+
+    Os registros são gravados com INSERTs de várias linhas. Todos os coordenadores
+    usam o mesmo hash de senha, para o bcrypt não dominar o tempo de preparação.
+    Se o banco já tiver salas, nada é inserido e o resumo do que existe é devolvido.
+    """
+    from app import database, models, ocupacao, senhas
+    from app import recursos as recursos_salas
+
+    aleatorio = random.Random(semente)
+    database.Base.metadata.create_all(database.engine)
+
+    with database.Sessionlocal() as db:
+        if db.query(func.count(models.Salas.id)).scalar():
+            return resumo(db)
+
+        db.execute(insert(models.Cursos), [{"nome": f"Curso {i}"} for i in range(cursos)])
+        curso_ids = [curso_id for (curso_id,) in db.query(models.Cursos.id).order_by(models.Cursos.id)]
+
+        db.execute(insert(models.Blocos), [
+            {"nome": f"Bloco {curso_id}-{i}", "curso_id": curso_id}
+            for curso_id in curso_ids for i in range(blocos_por_curso)
+        ])
+        blocos = db.query(models.Blocos.id, models.Blocos.curso_id).all()
+
+        recursos = ["projetor", "ar-condicionado", "computadores", "quadro digital", "som"]
+        db.execute(insert(models.Salas), [
+            {
+                "bloco_id": bloco_id, "curso_id": curso_id, "numero": numero,
+                "capacidade": aleatorio.choice([20, 30, 40, 50, 60, 80, 120]),
+                "recursos": ", ".join(aleatorio.sample(recursos, aleatorio.randint(1, 3))),
+                "exclusivo": aleatorio.random() < 0.15,
+            }
+            for bloco_id, curso_id in blocos for numero in range(1, salas_por_bloco + 1)
+        ])
+        # INSERT em massa: as etiquetas de recursos são extraídas à parte.
+        recursos_salas.sincronizar_faltantes(db.connection())
+
+        senha = senhas.hash_senha("benchmark")
+        db.execute(insert(models.Coordenadores), [
+            {"curso_id": curso_id, "nome": f"Coordenador {curso_id}-{i}", "email": f"coord{curso_id}-{i}@bench.local", "senha": senha}
+            for curso_id in curso_ids for i in range(3)
+        ])
+        coordenadores_por_curso = {}
+        for coordenador_id, curso_id in db.query(models.Coordenadores.id, models.Coordenadores.curso_id):
+            coordenadores_por_curso.setdefault(curso_id, []).append(coordenador_id)
+
+        # Turnos sem sobreposição, para respeitar a restrição reservas_sem_sobreposicao.
+        turnos = [(time(7, 30), time(9, 10)), (time(9, 20), time(11, 0)), (time(13, 30), time(15, 10)),
+                  (time(15, 20), time(17, 0)), (time(19, 0), time(20, 40)), (time(20, 50), time(22, 30))]
+        salas = db.query(models.Salas.id, models.Salas.curso_id).all()
+        lote = []
+        for semana in range(semanas):
+            for dia in range(6):
+                data_reserva = inicio_semestre + timedelta(weeks=semana, days=dia)
+                for sala_id, curso_id in salas:
+                    for hora_inicio, hora_fim in aleatorio.sample(turnos, reservas_por_sala_dia):
+                        lote.append({
+                            "sala_id": sala_id, "coordenador_id": aleatorio.choice(coordenadores_por_curso[curso_id]),
+                            "data_reserva": data_reserva, "hora_inicio": hora_inicio, "hora_fim": hora_fim,
+                            "motivo": "Aula",
+                        })
+                if len(lote) >= 20000:
+                    db.execute(insert(models.Reservas), lote)
+                    lote = []
+        if lote:
+            db.execute(insert(models.Reservas), lote)
+        db.commit()
+        # Os INSERTs em massa não passam pelo flush da sessão; os agregados são recalculados de uma vez.
+        ocupacao.reconstruir(db)
+        return resumo(db)
+
+
+def resumo(db) -> dict:
+    from app import models
+
+    return {
+        "cursos": db.query(func.count(models.Cursos.id)).scalar(),
+        "blocos": db.query(func.count(models.Blocos.id)).scalar(),
+        "salas": db.query(func.count(models.Salas.id)).scalar(),
+        "coordenadores": db.query(func.count(models.Coordenadores.id)).scalar(),
+        "reservas": db.query(func.count(models.Reservas.id)).scalar(),
+    }
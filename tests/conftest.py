@@ -0,0 +1,61 @@
+import os
+
+# Os testes usam SQLite em memória; as triggers de models.py fazem o papel da restrição de exclusão.
+os.environ.setdefault("URL_DATABASE", "sqlite://")
+# Hashes baratos e calculados no próprio processo.
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("SENHAS_PROCESSOS", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import database, models
+from app.indice_reservas import indice
+from app.main import app
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.Base.metadata.create_all(engine)
+    database.Sessionlocal.configure(bind=engine)
+    indice.invalidar()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    return TestClient(app)
+
+
+@pytest.fixture
+def dados(client):
+    """Curso, bloco, sala e coordenador para as reservas dos testes."""
+    curso = client.post("/cursos/", json={"nome": "Engenharia"}).json()
+    bloco = client.post("/blocos/", json={"nome": "A", "curso_id": curso["id"]}).json()
+    sala = client.post("/salas/", json={"bloco_id": bloco["id"], "numero": 1, "capacidade": 40,
+                                        "recursos": "projetor", "exclusivo": False}).json()
+    coordenador = client.post("/coordenadores/", json={"curso_id": curso["id"], "nome": "Ana",
+                                                       "email": "ana@x", "senha": "abc"}).json()
+    return {"sala_id": sala["id"], "coordenador_id": coordenador["id"]}
+
+
+@pytest.fixture
+def reserva(dados):
+    """Corpo de uma reserva; os argumentos nomeados substituem os campos padrão."""
+    def montar(**campos):
+        return {**dados, "data_reserva": "2026-04-06", "hora_inicio": "08:00:00", "hora_fim": "09:00:00",
+                "motivo": "Aula", **campos}
+    return montar
+
+
+@pytest.fixture
+def contar_reservas(engine):
+    def contar() -> int:
+        with Session(engine) as db:
+            return db.scalar(select(func.count()).select_from(models.Reservas))
+    return contar
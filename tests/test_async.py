@@ -0,0 +1,93 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import database
+from app.indice_reservas import indice
+from app.main import app as app_principal
+from app.routes import reservas, reservas_async
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Rotas de reservas como com MODO_ASYNC: as async antes das síncronas, num SQLite em arquivo."""
+    arquivo = tmp_path / "reservas.db"
+    engine = create_engine(f"sqlite:///{arquivo}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(engine)
+    database.Sessionlocal.configure(bind=engine)
+    engine_async = create_async_engine(f"sqlite+aiosqlite:///{arquivo}")
+    monkeypatch.setattr(database, "_sessionlocal_async",
+                        async_sessionmaker(engine_async, class_=AsyncSession, autoflush=False, expire_on_commit=False))
+    indice.invalidar()
+
+    app = FastAPI()
+    app.include_router(reservas_async.router)
+    app.include_router(reservas.router)
+    # Cursos, salas e coordenadores são criados pelas rotas síncronas da aplicação.
+    yield TestClient(app), TestClient(app_principal)
+    engine.dispose()
+
+
+@pytest.fixture
+def reserva(client):
+    _, principal = client
+    curso = principal.post("/cursos/", json={"nome": "Engenharia"}).json()
+    bloco = principal.post("/blocos/", json={"nome": "A", "curso_id": curso["id"]}).json()
+    sala = principal.post("/salas/", json={"bloco_id": bloco["id"], "numero": 1, "capacidade": 40,
+                                           "recursos": "projetor", "exclusivo": False}).json()
+    coordenador = principal.post("/coordenadores/", json={"curso_id": curso["id"], "nome": "Ana",
+                                                          "email": "ana@x", "senha": "abc"}).json()
+
+    def montar(**campos):
+        return {"sala_id": sala["id"], "coordenador_id": coordenador["id"], "data_reserva": "2026-04-06",
+                "hora_inicio": "08:00:00", "hora_fim": "09:00:00", "motivo": "Aula", **campos}
+    return montar
+
+
+def test_criacao_e_sobreposicao(client, reserva):
+    assincrono, _ = client
+    criada = assincrono.post("/reservas/", json=reserva())
+    assert criada.status_code == 200
+    sobreposta = assincrono.post("/reservas/", json=reserva(hora_inicio="08:30:00", hora_fim="09:30:00"))
+    assert sobreposta.status_code == 400
+    assert assincrono.get(f"/reservas/{criada.json()['id']}").json() == criada.json()
+
+
+def test_put_e_patch(client, reserva):
+    assincrono, _ = client
+    criada = assincrono.post("/reservas/", json=reserva()).json()
+    assincrono.post("/reservas/", json=reserva(hora_inicio="10:00:00", hora_fim="11:00:00"))
+
+    alterada = assincrono.put(f"/reservas/{criada['id']}", json=reserva(hora_inicio="07:00:00", motivo="Prova"))
+    assert alterada.status_code == 200
+    assert alterada.json()["hora_inicio"] == "07:00:00"
+    assert assincrono.put(f"/reservas/{criada['id']}", json=reserva(hora_fim="10:30:00")).status_code == 400
+
+    versao = alterada.json()["versao"]
+    assert assincrono.patch(f"/reservas/{criada['id']}", json={"motivo": "Reposição", "versao": versao}).status_code == 200
+    assert assincrono.patch(f"/reservas/{criada['id']}", json={"motivo": "Outra", "versao": versao}).status_code == 409
+    assert assincrono.patch(f"/reservas/{criada['id']}", json={"hora_fim": "10:30:00"}).status_code == 400
+
+
+def test_lote_e_recorrentes(client, reserva):
+    assincrono, _ = client
+    lote = assincrono.post("/reservas/lote", json={"tudo_ou_nada": False, "reservas": [
+        reserva(), reserva(hora_inicio="08:30:00", hora_fim="09:30:00")
+    ]}).json()
+    assert [item["status_code"] for item in lote["resultados"]] == [200, 400]
+
+    recorrencia = {**reserva(), "data_inicio": "2026-04-13", "data_fim": "2026-04-27"}
+    del recorrencia["data_reserva"]
+    serie = assincrono.post("/reservas/recorrentes", json=recorrencia)
+    assert serie.status_code == 200
+    assert len(serie.json()["reservas"]) == 3
+    assert assincrono.post("/reservas/recorrentes", json=recorrencia).status_code == 400
+
+
+def test_remocao(client, reserva):
+    assincrono, _ = client
+    criada = assincrono.post("/reservas/", json=reserva()).json()
+    assert assincrono.delete(f"/reservas/{criada['id']}").status_code == 200
+    assert assincrono.get(f"/reservas/{criada['id']}").status_code == 404
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app import schemas
+from app.cache import BackendCache, CacheLRU, CacheRespostas, cache
+
+
+@pytest.fixture(autouse=True)
+def cache_vazio(monkeypatch):
+    monkeypatch.setattr(cache, "backend", CacheLRU())
+
+
+def test_segunda_leitura_vem_do_cache(client, dados):
+    primeira = client.get("/cursos/")
+    segunda = client.get("/cursos/")
+    assert (primeira.headers["x-cache"], segunda.headers["x-cache"]) == ("MISS", "HIT")
+    assert segunda.content == primeira.content
+    assert segunda.headers["etag"] == primeira.headers["etag"]
+
+
+def test_etag_conferido_retorna_304(client, dados):
+    etag = client.get("/salas/").headers["etag"]
+    resposta = client.get("/salas/", headers={"If-None-Match": etag})
+    assert resposta.status_code == 304
+    assert resposta.content == b""
+    assert client.get("/salas/", headers={"If-None-Match": '"outro"'}).status_code == 200
+
+
+def test_escrita_invalida_a_listagem(client, dados):
+    etag = client.get("/cursos/").headers["etag"]
+    client.post("/cursos/", json={"nome": "Direito"})
+    resposta = client.get("/cursos/", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["x-cache"] == "MISS"
+    assert "Direito" in resposta.text
+
+
+def test_etag_depende_so_do_corpo(client, dados):
+    etag = client.get("/blocos/").headers["etag"]
+    # Outro worker, com outro cache, chega ao mesmo ETag para o mesmo conteúdo.
+    cache.backend = CacheLRU()
+    assert client.get("/blocos/", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_leitura_de_replica_nao_e_guardada(engine, dados):
+    respostas = CacheRespostas(CacheLRU())
+    requisicao = Request({"type": "http", "method": "GET", "scheme": "http", "server": ("testserver", 80),
+                          "path": "/cursos/", "root_path": "", "query_string": b"", "headers": []})
+
+    def consultar(resposta):
+        return [{"id": 1, "nome": "Engenharia"}]
+
+    with Session(engine) as db:
+        db.info["replica"] = True
+        primeira = respostas.responder(requisicao, db, "cursos", schemas.Curso, consultar)
+        segunda = respostas.responder(requisicao, db, "cursos", schemas.Curso, consultar)
+    assert (primeira.headers["x-cache"], segunda.headers["x-cache"]) == ("MISS", "MISS")
+
+    with Session(engine) as db:
+        respostas.responder(requisicao, db, "cursos", schemas.Curso, consultar)
+        assert respostas.responder(requisicao, db, "cursos", schemas.Curso, consultar).headers["x-cache"] == "HIT"
+
+
+def test_backend_incompleto_falha_na_construcao():
+    class SemVersoes(BackendCache):
+        def obter(self, chave):
+            return None
+
+        def guardar(self, chave, resposta):
+            pass
+
+    with pytest.raises(TypeError):
+        SemVersoes()
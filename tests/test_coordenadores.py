@@ -0,0 +1,62 @@
+import pytest
+
+from app import senhas
+
+
+@pytest.fixture
+def coordenador(client, dados):
+    return client.get(f"/coordenadores/{dados['coordenador_id']}").json()
+
+
+def corpo(coordenador, **campos):
+    return {"curso_id": coordenador["curso_id"], "nome": coordenador["nome"], "email": coordenador["email"],
+            "senha": coordenador["senha"], **campos}
+
+
+def test_senha_gravada_como_hash(coordenador):
+    assert coordenador["senha"] != "abc"
+    assert senhas.pwd_context.verify("abc", coordenador["senha"])
+
+
+def test_put_com_o_hash_atual_nao_refaz_o_hash(client, coordenador):
+    resposta = client.put(f"/coordenadores/{coordenador['id']}", json=corpo(coordenador, nome="Ana Maria"))
+    assert resposta.status_code == 200
+    assert resposta.json()["nome"] == "Ana Maria"
+    assert resposta.json()["senha"] == coordenador["senha"]
+
+
+def test_put_com_nova_senha(client, coordenador):
+    resposta = client.put(f"/coordenadores/{coordenador['id']}", json=corpo(coordenador, senha="nova"))
+    assert senhas.pwd_context.verify("nova", resposta.json()["senha"])
+
+
+def test_patch_com_o_hash_atual_nao_refaz_o_hash(client, coordenador):
+    resposta = client.patch(f"/coordenadores/{coordenador['id']}", json={"senha": coordenador["senha"], "nome": "Bia"})
+    assert resposta.status_code == 200
+    assert resposta.json()["senha"] == coordenador["senha"]
+    assert resposta.json()["nome"] == "Bia"
+
+
+def test_patch_com_nova_senha(client, coordenador):
+    resposta = client.patch(f"/coordenadores/{coordenador['id']}", json={"senha": "nova"})
+    assert senhas.pwd_context.verify("nova", resposta.json()["senha"])
+
+
+def test_put_e_patch_de_coordenador_inexistente(client, coordenador):
+    assert client.put("/coordenadores/999", json=corpo(coordenador, senha="nova")).status_code == 404
+    assert client.patch("/coordenadores/999", json={"senha": "nova"}).status_code == 404
+
+
+def test_email_repetido_recusado(client, coordenador):
+    novo = {"curso_id": coordenador["curso_id"], "nome": "Outra", "email": coordenador["email"], "senha": "abc"}
+    assert client.post("/coordenadores/", json=novo).status_code == 400
+    lote = [{**novo, "email": "c@x"}, {**novo, "email": "c@x"}]
+    resposta = client.post("/coordenadores/lote", json=lote)
+    assert resposta.status_code == 400
+    assert "c@x" in resposta.json()["detail"]
+
+
+def test_lote_calcula_um_hash_por_coordenador(client, coordenador):
+    lote = [{"curso_id": coordenador["curso_id"], "nome": f"N{i}", "email": f"n{i}@x", "senha": f"s{i}"} for i in range(3)]
+    criados = client.post("/coordenadores/lote", json=lote).json()
+    assert [senhas.pwd_context.verify(f"s{i}", criado["senha"]) for i, criado in enumerate(criados)] == [True] * 3
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import pytest
+
+from app import eventos
+
+
+@pytest.fixture(autouse=True)
+def difusor(monkeypatch):
+    difusor = eventos.Difusor(historico=3)
+    monkeypatch.setattr(eventos, "difusor", difusor)
+    return difusor
+
+
+def criados(*ids, sala_id=1):
+    return [{"id": f"e{numero}", "tipo": "criada",
+             "reserva": {"id": numero, "sala_id": sala_id, "bloco_id": 1, "data_reserva": "2026-04-06"}}
+            for numero in ids]
+
+
+def assinar(difusor, token, filtro=None):
+    async def executar():
+        assinatura, atual, perdidos = difusor.assinar(filtro or eventos.Filtro(), token)
+        difusor.cancelar(assinatura)
+        return atual, perdidos
+    return asyncio.run(executar())
+
+
+def ler(token, quantidade):
+    """As primeiras `quantidade` mensagens SSE enviadas a um cliente que reconecta com `token`."""
+    async def executar():
+        corpo = eventos.transmitir(eventos.Filtro(), token)
+        try:
+            return [await corpo.__anext__() for _ in range(quantidade)]
+        finally:
+            await corpo.aclose()
+    return asyncio.run(executar())
+
+
+def campos(mensagem):
+    linhas = dict(linha.split(": ", 1) for linha in mensagem.strip().splitlines())
+    return linhas.get("id"), linhas["event"], json.loads(linhas["data"])
+
+
+def test_retomada_pelo_ultimo_id(difusor):
+    difusor.receber(criados(1, 2, 3))
+    atual, perdidos = assinar(difusor, "e1")
+    assert atual == "e3"
+    assert [dados["id"] for dados in perdidos] == ["e2", "e3"]
+    assert assinar(difusor, "e3")[1] == []
+
+
+def test_geracao_recebe_todo_o_historico(difusor):
+    atual, perdidos = assinar(difusor, None)
+    assert (atual, perdidos) == (difusor.geracao, [])
+    difusor.receber(criados(1, 2))
+    assert [dados["id"] for dados in assinar(difusor, atual)[1]] == ["e1", "e2"]
+
+
+def test_token_fora_do_historico(difusor):
+    difusor.receber(criados(1, 2, 3, 4))
+    assert assinar(difusor, "e1")[1] is None
+    assert assinar(difusor, "desconhecido")[1] is None
+    assert [dados["id"] for dados in assinar(difusor, "e2")[1]] == ["e3", "e4"]
+
+
+def test_reinicio_invalida_os_tokens(difusor):
+    difusor.receber(criados(1, 2))
+    geracao = difusor.geracao
+    difusor.reiniciar()
+    assert assinar(difusor, "e1")[1] is None
+    assert assinar(difusor, geracao)[1] is None
+    assert assinar(difusor, None)[0] == difusor.geracao != geracao
+
+
+def test_perdidos_respeitam_o_filtro(difusor):
+    difusor.receber(criados(1) + criados(2, sala_id=2) + criados(3))
+    perdidos = assinar(difusor, difusor.geracao, eventos.Filtro(sala_id=2))[1]
+    assert [dados["id"] for dados in perdidos] == ["e2"]
+
+
+def test_transmissao_reenvia_os_perdidos(difusor):
+    difusor.receber(criados(1, 2, 3))
+    retry, segundo, terceiro, conectado = ler("e1", 4)
+    assert retry.startswith("retry:")
+    assert [campos(mensagem)[:2] for mensagem in (segundo, terceiro)] == [("e2", "reserva.criada"), ("e3", "reserva.criada")]
+    assert campos(conectado)[:2] == ("e3", "conectado")
+
+
+def test_transmissao_pede_reinicio_para_token_desconhecido(difusor):
+    difusor.receber(criados(1))
+    _, reinicio = ler("desconhecido", 2)
+    assert campos(reinicio)[:2] == ("e1", "reinicio")
+
+
+def test_escritas_confirmadas_viram_eventos(client, reserva, difusor):
+    criada = client.post("/reservas/", json=reserva()).json()
+    client.post("/reservas/", json=reserva(hora_inicio="08:30:00", hora_fim="09:30:00"))
+    client.patch(f"/reservas/{criada['id']}", json={"hora_fim": "10:00:00"})
+    client.delete(f"/reservas/{criada['id']}")
+    perdidos = assinar(difusor, difusor.geracao)[1]
+    assert [dados["tipo"] for dados in perdidos] == ["criada", "alterada", "removida"]
+    assert perdidos[1]["anterior"]["hora_fim"] == "09:00:00"
+    assert perdidos[0]["reserva"]["bloco_id"] is not None
+
+
+def test_broker_sem_registrar_nao_instancia():
+    class Incompleto(eventos.BrokerEventos):
+        pass
+
+    with pytest.raises(TypeError):
+        Incompleto()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.idempotencia import BackendIdempotencia
+from app.main import app
+
+
+def test_repeticao_devolve_a_resposta_guardada(client, reserva, contar_reservas):
+    cabecalhos = {"Idempotency-Key": "repeticao"}
+    primeira = client.post("/reservas/", json=reserva(), headers=cabecalhos)
+    segunda = client.post("/reservas/", json=reserva(), headers=cabecalhos)
+    assert primeira.status_code == segunda.status_code == 200
+    assert segunda.json() == primeira.json()
+    assert segunda.headers["idempotent-replayed"] == "true"
+    assert contar_reservas() == 1
+
+
+def test_chave_reutilizada_com_outro_corpo_retorna_422(client, reserva):
+    cabecalhos = {"Idempotency-Key": "outro-corpo"}
+    client.post("/reservas/", json=reserva(), headers=cabecalhos)
+    resposta = client.post("/reservas/", json=reserva(motivo="Prova"), headers=cabecalhos)
+    assert resposta.status_code == 422
+
+
+def test_corpo_invalido_nao_e_guardado(client, reserva, contar_reservas):
+    cabecalhos = {"Idempotency-Key": "corpo-invalido", "content-type": "application/json"}
+    assert client.post("/reservas/", content=b'{"sala_id": 1', headers=cabecalhos).status_code == 422
+    resposta = client.post("/reservas/", json=reserva(), headers={"Idempotency-Key": "corpo-invalido"})
+    assert resposta.status_code == 200
+    assert "idempotent-replayed" not in resposta.headers
+    assert contar_reservas() == 1
+
+
+def test_desconexao_nao_executa_nem_guarda(client, reserva, contar_reservas):
+    corpo = json.dumps(reserva()).encode()
+    mensagens = [{"type": "http.request", "body": corpo[:20], "more_body": True}, {"type": "http.disconnect"}]
+    enviadas = []
+
+    async def receive():
+        return mensagens.pop(0)
+
+    async def send(mensagem):
+        enviadas.append(mensagem)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/reservas/", "raw_path": b"/reservas/", "root_path": "", "query_string": b"",
+        "headers": [(b"idempotency-key", b"desconexao"), (b"content-type", b"application/json")],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    assert enviadas == []
+    assert contar_reservas() == 0
+
+    resposta = client.post("/reservas/", json=reserva(), headers={"Idempotency-Key": "desconexao"})
+    assert resposta.status_code == 200
+    assert "idempotent-replayed" not in resposta.headers
+    assert contar_reservas() == 1
+
+
+def test_repeticoes_simultaneas_executam_uma_vez(engine, reserva, contar_reservas):
+    async def enviar_todas():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://testserver") as cliente:
+            return await asyncio.gather(*[
+                cliente.post("/reservas/", json=reserva(), headers={"Idempotency-Key": "simultaneas"}) for _ in range(5)
+            ])
+
+    respostas = asyncio.run(enviar_todas())
+    assert {resposta.status_code for resposta in respostas} == {200}
+    assert len({resposta.json()["id"] for resposta in respostas}) == 1
+    assert contar_reservas() == 1
+
+
+def test_importacao_ignora_a_chave(client, dados, contar_reservas):
+    csv = ("sala_id,coordenador_id,data_reserva,hora_inicio,hora_fim,motivo\n"
+           f"{dados['sala_id']},{dados['coordenador_id']},2026-04-06,08:00,09:00,Aula\n")
+    cabecalhos = {"content-type": "text/csv", "Idempotency-Key": "importacao"}
+    resposta = client.post("/reservas/importar", content=csv, headers=cabecalhos)
+    assert resposta.status_code == 200
+    assert resposta.json()["importados"] == 1
+    assert "idempotent-replayed" not in client.post("/reservas/importar", content=csv, headers=cabecalhos).headers
+
+
+def test_backend_incompleto_nao_instancia():
+    class SoObter(BackendIdempotencia):
+        def obter(self, chave):
+            return None
+
+    with pytest.raises(TypeError):
+        SoObter()
@@ -0,0 +1,107 @@
+import json
+
+from app import config
+from app.importacao import ERRO_SOBREPOSICAO, LeitorIncremental
+
+
+def importar(client, recurso, corpo, tipo="text/csv"):
+    resposta = client.post(f"/{recurso}/importar", content=corpo.encode(), headers={"Content-Type": tipo})
+    assert resposta.status_code == 200
+    return resposta.json()
+
+
+def erros_por_linha(resultado):
+    return {erro["linha"]: erro["erro"] for erro in resultado["erros"]}
+
+
+def test_leitor_junta_linhas_partidas_entre_pedacos():
+    leitor = LeitorIncremental("csv")
+    registros = []
+    for pedaco in (b"nome,motivo\nA,\"Aula", b" de\nreforco\"\nB,Pro", "va\n".encode()):
+        registros += leitor.alimentar(pedaco)
+    registros += leitor.finalizar()
+    assert registros == [(2, {"nome": "A", "motivo": "Aula de\nreforco"}), (4, {"nome": "B", "motivo": "Prova"})]
+    assert leitor.erros == []
+
+
+def test_leitor_aponta_aspas_nao_fechadas():
+    leitor = LeitorIncremental("csv")
+    leitor.alimentar(b'nome,motivo\nA,"sem fim\n')
+    leitor.finalizar()
+    assert [(erro.linha, erro.erro) for erro in leitor.erros] == [(2, "Aspas não fechadas até o fim do arquivo.")]
+
+
+def test_reservas_csv_grava_as_validas_e_reporta_cada_linha(client, dados, contar_reservas, monkeypatch):
+    monkeypatch.setattr(config, "IMPORTACAO_TAMANHO_LOTE", 2)
+    sala, coordenador = dados["sala_id"], dados["coordenador_id"]
+    corpo = "\n".join([
+        "sala_id,coordenador_id,data_reserva,hora_inicio,hora_fim,motivo",
+        f"{sala},{coordenador},2026-04-06,08:00,09:00,Aula",
+        f"{sala},{coordenador},2026-04-06,08:30,09:30,Sobreposta",
+        f"999,{coordenador},2026-04-06,10:00,11:00,Sem sala",
+        f"{sala},{coordenador},2026-04-06,10:00,11:00,",
+        f"{sala},{coordenador},2026-04-06,12:00,11:00,Invertida",
+        f"{sala},{coordenador},2026-04-07,08:00,09:00,Outro dia",
+    ])
+    resultado = importar(client, "reservas", corpo)
+    assert resultado["importados"] == 2
+    erros = erros_por_linha(resultado)
+    assert sorted(erros) == [3, 4, 5, 6]
+    assert erros[3] == ERRO_SOBREPOSICAO
+    assert erros[4] == "Erro: Sala não encontrada."
+    assert "motivo" in erros[5]
+    assert contar_reservas() == 2
+
+
+def test_reservas_ndjson_com_linhas_malformadas(client, reserva, contar_reservas):
+    client.post("/reservas/", json=reserva())
+    corpo = "\n".join([
+        json.dumps(reserva(hora_inicio="10:00:00", hora_fim="11:00:00")),
+        "{nao e json",
+        "[1, 2]",
+        "",
+        json.dumps(reserva(hora_inicio="08:30:00", hora_fim="09:30:00")),
+    ])
+    resultado = importar(client, "reservas", corpo, "application/x-ndjson")
+    assert resultado["importados"] == 1
+    erros = erros_por_linha(resultado)
+    assert sorted(erros) == [2, 3, 5]
+    assert erros[2].startswith("JSON inválido")
+    assert erros[3] == "Cada linha deve conter um objeto JSON."
+    assert erros[5] == ERRO_SOBREPOSICAO
+    assert contar_reservas() == 2
+
+
+def test_csv_com_numero_errado_de_campos(client, dados):
+    resultado = importar(client, "salas", "bloco_id,numero,capacidade,recursos\n1,2,30\n1,3,30,lab\n")
+    assert resultado["importados"] == 1
+    assert erros_por_linha(resultado) == {2: "Esperados 4 campos, encontrados 3."}
+
+
+def test_coordenadores_com_email_repetido_no_banco_e_no_arquivo(client, dados):
+    curso = client.get("/cursos/").json()[0]["id"]
+    corpo = "\n".join([
+        "curso_id,nome,email,senha",
+        f"{curso},Ana,ana@x,abc",
+        f"{curso},Bia,bia@x,abc",
+        f"{curso},Bia de novo,bia@x,abc",
+        "999,Caio,caio@x,abc",
+    ])
+    resultado = importar(client, "coordenadores", corpo)
+    assert resultado["importados"] == 1
+    assert erros_por_linha(resultado) == {2: "Erro: Email já cadastrado!", 4: "Erro: Email já cadastrado!",
+                                          5: "Curso não encontrado"}
+
+
+def test_exportacao_reimportavel(client, reserva):
+    for hora in (8, 10):
+        client.post("/reservas/", json=reserva(hora_inicio=f"{hora:02d}:00:00", hora_fim=f"{hora + 1:02d}:00:00"))
+    exportado = client.get("/reservas/exportar", params={"formato": "csv"})
+    assert exportado.headers["content-disposition"] == 'attachment; filename="reservas.csv"'
+    linhas = exportado.text.splitlines()
+    assert "id" in linhas[0].split(",")
+    assert len(linhas) == 3
+    # As mesmas reservas importadas de novo conflitam com as existentes.
+    resultado = importar(client, "reservas", exportado.text)
+    assert resultado["importados"] == 0
+    assert set(erros_por_linha(resultado).values()) == {ERRO_SOBREPOSICAO}
@@ -0,0 +1,95 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app import models
+from app.indice_reservas import IndiceConflitos, IntervalosDia
+
+DIA = date(2026, 4, 6)
+
+
+@pytest.fixture
+def sala(engine, dados):
+    """Sala com uma reserva das 8h às 9h em DIA, gravada direto no banco."""
+    with Session(engine) as db:
+        db.add(models.Reservas(**dados, data_reserva=DIA, hora_inicio=time(8), hora_fim=time(9), motivo="Aula"))
+        db.commit()
+    return dados["sala_id"]
+
+
+def test_intervalos_dia_usa_o_maior_fim_anterior():
+    dia = IntervalosDia([(1, time(8), time(12)), (2, time(9), time(10))], carregado_em=0)
+    assert dia.conflita(time(11), time(13))
+    assert not dia.conflita(time(12), time(13))
+    assert not dia.conflita(time(7), time(8))
+
+
+def test_intervalos_dia_ignora_a_propria_reserva():
+    dia = IntervalosDia([(1, time(8), time(9))], carregado_em=0)
+    assert dia.conflita(time(8, 30), time(9, 30))
+    assert not dia.conflita(time(8, 30), time(9, 30), ignorar_id=1)
+
+
+def test_intervalos_dia_adicionar_e_remover():
+    dia = IntervalosDia([(1, time(8), time(9))], carregado_em=0)
+    dia.adicionar(2, time(10), time(11))
+    assert dia.conflita(time(10, 30), time(12))
+    dia.remover(2)
+    assert not dia.conflita(time(10, 30), time(12))
+    assert dia.ids == [1]
+
+
+def test_indice_guarda_o_dia_carregado(engine, dados, sala):
+    indice = IndiceConflitos(ttl=60)
+    with Session(engine) as db:
+        assert indice.conflita(db, sala, DIA, time(8, 30), time(9, 30))
+        # Uma reserva gravada por fora do índice (outro worker) não é vista até o dia expirar ou ser invalidado.
+        db.add(models.Reservas(**dados, data_reserva=DIA, hora_inicio=time(10),
+                               hora_fim=time(11), motivo="Aula"))
+        db.commit()
+        assert not indice.conflita(db, sala, DIA, time(10), time(11))
+
+        indice.invalidar(sala_id=sala)
+        assert indice.conflita(db, sala, DIA, time(10), time(11))
+
+
+def test_indice_expira_pelo_ttl(engine, dados, sala):
+    indice = IndiceConflitos(ttl=0)
+    with Session(engine) as db:
+        assert not indice.conflita(db, sala, DIA, time(10), time(11))
+        db.add(models.Reservas(**dados, data_reserva=DIA, hora_inicio=time(10),
+                               hora_fim=time(11), motivo="Aula"))
+        db.commit()
+        assert indice.conflita(db, sala, DIA, time(10), time(11))
+
+
+def test_indice_acompanha_as_escritas_do_processo(engine, dados, sala):
+    indice = IndiceConflitos(ttl=60)
+    with Session(engine) as db:
+        assert not indice.conflita(db, sala, DIA, time(10), time(11))
+        nova = models.Reservas(**dados, data_reserva=DIA, hora_inicio=time(10),
+                               hora_fim=time(11), motivo="Aula")
+        db.add(nova)
+        db.commit()
+        indice.registrar(nova)
+        assert indice.conflita(db, sala, DIA, time(10), time(11))
+        indice.remover(nova.id, sala, DIA)
+        assert not indice.conflita(db, sala, DIA, time(10), time(11))
+
+
+def test_carga_de_replica_nao_entra_no_indice(engine, dados, sala):
+    indice = IndiceConflitos(ttl=60)
+    with Session(engine) as db:
+        db.info["replica"] = True
+        assert indice.conflita(db, sala, DIA, time(8), time(9))
+    assert indice._em_memoria((sala, DIA)) is None
+
+
+def test_disponibilidade(client, reserva):
+    client.post("/reservas/", json=reserva())
+    parametros = {"sala_id": reserva()["sala_id"], "data": "2026-04-06"}
+    ocupada = client.get("/reservas/disponibilidade/", params={**parametros, "hora_inicio": "08:30:00", "hora_fim": "09:30:00"})
+    livre = client.get("/reservas/disponibilidade/", params={**parametros, "hora_inicio": "09:00:00", "hora_fim": "10:00:00"})
+    assert ocupada.json()["disponivel"] is False
+    assert livre.json()["disponivel"] is True
@@ -0,0 +1,35 @@
+def test_lote_tudo_ou_nada_nao_cria_nada_se_um_item_falha(client, reserva, contar_reservas):
+    lote = {"reservas": [
+        reserva(),
+        reserva(hora_inicio="08:30:00", hora_fim="09:30:00"),
+        reserva(sala_id=999),
+    ]}
+    resultado = client.post("/reservas/lote", json=lote).json()
+    assert resultado["criadas"] == 0
+    assert [item["status_code"] for item in resultado["resultados"]] == [424, 400, 404]
+    assert contar_reservas() == 0
+
+
+def test_lote_parcial_cria_os_itens_validos(client, reserva, contar_reservas):
+    client.post("/reservas/", json=reserva(hora_inicio="14:00:00", hora_fim="15:00:00"))
+    lote = {"tudo_ou_nada": False, "reservas": [
+        reserva(),
+        reserva(hora_inicio="08:30:00", hora_fim="09:30:00"),
+        reserva(hora_inicio="14:30:00", hora_fim="15:30:00"),
+        reserva(hora_inicio="09:00:00", hora_fim="10:00:00"),
+    ]}
+    resultado = client.post("/reservas/lote", json=lote).json()
+    assert resultado["criadas"] == 2
+    assert [item["status_code"] for item in resultado["resultados"]] == [200, 400, 400, 200]
+    assert resultado["resultados"][0]["reserva"]["hora_inicio"] == "08:00:00"
+    assert contar_reservas() == 3
+
+
+def test_lote_respeita_sala_exclusiva(client, dados, reserva):
+    outro_curso = client.post("/cursos/", json={"nome": "Direito"}).json()
+    bloco = client.post("/blocos/", json={"nome": "B", "curso_id": outro_curso["id"]}).json()
+    laboratorio = client.post("/salas/", json={"bloco_id": bloco["id"], "numero": 2, "capacidade": 20,
+                                               "recursos": "lab", "exclusivo": True}).json()
+    lote = {"tudo_ou_nada": False, "reservas": [reserva(sala_id=laboratorio["id"])]}
+    resultado = client.post("/reservas/lote", json=lote).json()
+    assert resultado["resultados"][0]["status_code"] == 403
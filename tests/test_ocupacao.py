@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models, ocupacao
+
+
+def agregados(engine):
+    with Session(engine) as db:
+        salas = {(linha.sala_id, linha.data): (linha.reservas, linha.minutos)
+                 for linha in db.scalars(select(models.OcupacaoSalaDia)) if linha.reservas or linha.minutos}
+        horas = {(linha.bloco_id, linha.data, linha.hora): linha.minutos
+                 for linha in db.scalars(select(models.OcupacaoBlocoHora)) if linha.minutos}
+    return salas, horas
+
+
+@pytest.fixture
+def bloco_id(client, dados):
+    return client.get(f"/salas/{dados['sala_id']}").json()["bloco_id"]
+
+
+def test_criacao_soma_os_deltas(client, engine, reserva, dados, bloco_id):
+    client.post("/reservas/", json=reserva(hora_inicio="08:30:00", hora_fim="10:15:00"))
+    client.post("/reservas/", json=reserva(hora_inicio="14:00:00", hora_fim="15:00:00"))
+    salas, horas = agregados(engine)
+    dia = date(2026, 4, 6)
+    assert salas == {(dados["sala_id"], dia): (2, 165)}
+    assert horas == {(bloco_id, dia, 8): 30, (bloco_id, dia, 9): 60, (bloco_id, dia, 10): 15, (bloco_id, dia, 14): 60}
+
+
+def test_alteracao_e_remocao_descontam(client, engine, reserva, dados, bloco_id):
+    criada = client.post("/reservas/", json=reserva()).json()
+    client.put(f"/reservas/{criada['id']}", json=reserva(data_reserva="2026-04-07", hora_fim="08:30:00"))
+    salas, horas = agregados(engine)
+    assert salas == {(dados["sala_id"], date(2026, 4, 7)): (1, 30)}
+    assert horas == {(bloco_id, date(2026, 4, 7), 8): 30}
+
+    client.patch(f"/reservas/{criada['id']}", json={"hora_fim": "09:00:00"})
+    assert agregados(engine)[0] == {(dados["sala_id"], date(2026, 4, 7)): (1, 60)}
+
+    client.delete(f"/reservas/{criada['id']}")
+    assert agregados(engine) == ({}, {})
+
+
+def test_reconstruir_reproduz_os_deltas(client, engine, reserva):
+    client.post("/reservas/", json=reserva(hora_inicio="07:45:00", hora_fim="09:10:00"))
+    client.post("/reservas/", json=reserva(data_reserva="2026-04-08", hora_inicio="13:00:00", hora_fim="13:20:00"))
+    incrementais = agregados(engine)
+    with Session(engine) as db:
+        resultado = ocupacao.reconstruir(db)
+    assert agregados(engine) == incrementais
+    assert resultado == {"salas_dia": 2, "blocos_hora": 4}
+
+
+def test_reconstruir_um_periodo(client, engine, reserva, dados):
+    client.post("/reservas/", json=reserva())
+    client.post("/reservas/", json=reserva(data_reserva="2026-04-08"))
+    with Session(engine) as db:
+        db.query(models.OcupacaoSalaDia).delete()
+        db.commit()
+        ocupacao.reconstruir(db, inicio=date(2026, 4, 8), fim=date(2026, 4, 8))
+    assert agregados(engine)[0] == {(dados["sala_id"], date(2026, 4, 8)): (1, 60)}
+
+
+def test_utilizacao(client, reserva, dados):
+    client.post("/reservas/", json=reserva(hora_inicio="08:00:00", hora_fim="10:00:00"))
+    resposta = client.get("/ocupacao/", params={"inicio": "2026-04-06", "fim": "2026-04-06"}).json()
+    assert resposta[0]["id"] == dados["sala_id"]
+    assert resposta[0]["reservas"] == 1
+    assert resposta[0]["horas_reservadas"] == 2
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from app.paginacao import CABECALHO_PROXIMO_CURSOR
+
+
+@pytest.fixture
+def reservas(client, reserva):
+    """Cinco reservas em horários seguidos."""
+    return [client.post("/reservas/", json=reserva(hora_inicio=f"{hora:02d}:00:00", hora_fim=f"{hora + 1:02d}:00:00")).json()["id"]
+            for hora in range(8, 13)]
+
+
+def test_cursor_percorre_todas_as_paginas(client, reservas):
+    vistos, parametros = [], {"limite": 2}
+    while True:
+        resposta = client.get("/reservas/", params=parametros)
+        vistos += [reserva["id"] for reserva in resposta.json()]
+        cursor = resposta.headers.get(CABECALHO_PROXIMO_CURSOR)
+        if cursor is None:
+            break
+        assert int(cursor) == vistos[-1]
+        parametros = {"limite": 2, "apos_id": cursor}
+    assert vistos == reservas
+
+
+def test_ultima_pagina_sem_cursor(client, reservas):
+    resposta = client.get("/reservas/", params={"limite": 5})
+    assert len(resposta.json()) == 5
+    assert CABECALHO_PROXIMO_CURSOR not in resposta.headers
+
+
+def test_limite_acima_do_maximo_recusado(client, reservas):
+    assert client.get("/reservas/", params={"limite": 100000}).status_code == 422
+
+
+def test_ndjson_transmite_todos_os_registros(client, reservas):
+    resposta = client.get("/reservas/", params={"formato": "ndjson", "limite": 2})
+    assert resposta.headers["content-type"].startswith("application/x-ndjson")
+    linhas = [json.loads(linha) for linha in resposta.text.splitlines()]
+    assert [linha["id"] for linha in linhas] == reservas
+    assert CABECALHO_PROXIMO_CURSOR not in resposta.headers
+
+
+def test_ndjson_a_partir_do_cursor(client, reservas):
+    resposta = client.get("/reservas/", params={"formato": "ndjson", "apos_id": reservas[2]})
+    assert [json.loads(linha)["id"] for linha in resposta.text.splitlines()] == reservas[3:]
+
+
+def test_listagens_de_cadastro_paginadas(client, dados):
+    for nome in ("Direito", "Medicina"):
+        client.post("/cursos/", json={"nome": nome})
+    resposta = client.get("/cursos/", params={"limite": 2})
+    assert len(resposta.json()) == 2
+    assert CABECALHO_PROXIMO_CURSOR in resposta.headers
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app import particoes
+
+
+@pytest.fixture(autouse=True)
+def limite_arquivo():
+    particoes._limite_arquivo.update(valor=None, lido_em=None)
+    yield
+    particoes._limite_arquivo.update(valor=None, lido_em=None)
+
+
+@pytest.fixture
+def arquivadas(client, engine, reserva):
+    """Duas reservas de 2025 arquivadas e uma de 2026 ainda ativa."""
+    antigas = [client.post("/reservas/", json=reserva(data_reserva=data)).json()["id"] for data in ("2025-03-10", "2025-06-02")]
+    ativa = client.post("/reservas/", json=reserva()).json()["id"]
+    with Session(engine) as db:
+        assert particoes.arquivar(db, date(2025, 6, 30)) == 2
+    return antigas, ativa
+
+
+def ids(resposta):
+    assert resposta.status_code == 200
+    return [reserva["id"] for reserva in resposta.json()]
+
+
+def test_semestre_fechado():
+    assert particoes.fim_ultimo_semestre_fechado(date(2026, 3, 1)) == date(2025, 12, 31)
+    assert particoes.fim_ultimo_semestre_fechado(date(2026, 10, 18)) == date(2026, 6, 30)
+
+
+def test_arquivar_move_as_reservas(arquivadas, contar_reservas):
+    assert contar_reservas() == 1
+
+
+def test_listagem_sem_periodo_le_apenas_as_ativas(client, arquivadas):
+    _, ativa = arquivadas
+    assert ids(client.get("/reservas/")) == [ativa]
+    assert ids(client.get("/reservas/", params={"data_inicio": "2025-07-01"})) == [ativa]
+
+
+def test_periodo_que_alcanca_o_arquivo_inclui_as_arquivadas(client, arquivadas):
+    antigas, ativa = arquivadas
+    assert ids(client.get("/reservas/", params={"data_inicio": "2025-01-01"})) == [*antigas, ativa]
+    assert ids(client.get("/reservas/", params={"data_inicio": "2025-04-01", "data_fim": "2025-12-31"})) == antigas[1:]
+
+
+def test_reserva_arquivada_pelo_id(client, arquivadas):
+    antigas, _ = arquivadas
+    resposta = client.get(f"/reservas/{antigas[0]}")
+    assert resposta.status_code == 200
+    assert resposta.json()["data_reserva"] == "2025-03-10"
@@ -0,0 +1,62 @@
+from sqlalchemy import create_engine, event, text
+
+from app import database, migracoes
+
+
+def test_patch_altera_so_os_campos_enviados(client, reserva):
+    criada = client.post("/reservas/", json=reserva()).json()
+    resposta = client.patch(f"/reservas/{criada['id']}", json={"hora_fim": "09:30:00"})
+    assert resposta.status_code == 200
+    alterada = resposta.json()
+    assert alterada["hora_fim"] == "09:30:00"
+    assert alterada["hora_inicio"] == criada["hora_inicio"]
+    assert alterada["motivo"] == criada["motivo"]
+    assert alterada["versao"] == criada["versao"] + 1
+
+
+def test_patch_de_reserva_inexistente_retorna_404(client, dados):
+    assert client.patch("/reservas/999", json={"motivo": "Prova"}).status_code == 404
+
+
+def test_patch_com_versao_desatualizada_retorna_409(client, reserva):
+    criada = client.post("/reservas/", json=reserva()).json()
+    atualizada = client.patch(f"/reservas/{criada['id']}", json={"motivo": "Prova", "versao": criada["versao"]})
+    assert atualizada.status_code == 200
+    assert atualizada.json()["versao"] == criada["versao"] + 1
+
+    resposta = client.patch(f"/reservas/{criada['id']}", json={"motivo": "Reposição", "versao": criada["versao"]})
+    assert resposta.status_code == 409
+    assert client.get(f"/reservas/{criada['id']}").json()["motivo"] == "Prova"
+
+
+def test_patch_de_sala(client, dados):
+    resposta = client.patch(f"/salas/{dados['sala_id']}", json={"capacidade": 55})
+    assert resposta.status_code == 200
+    assert resposta.json()["capacidade"] == 55
+
+
+def test_delete_concorrente_com_alteracao_retorna_409(client, engine, reserva):
+    criada = client.post("/reservas/", json=reserva()).json()
+
+    # Outra requisição altera a reserva entre a leitura e o DELETE da rota.
+    def alterar_antes(session, contexto, instancias):
+        session.connection().execute(text("UPDATE reservas SET versao = versao + 1"))
+
+    event.listen(database.Sessionlocal, "before_flush", alterar_antes)
+    try:
+        resposta = client.delete(f"/reservas/{criada['id']}")
+    finally:
+        event.remove(database.Sessionlocal, "before_flush", alterar_antes)
+    assert resposta.status_code == 409
+    assert client.get(f"/reservas/{criada['id']}").status_code == 200
+
+
+def test_migracao_acrescenta_serie_id_e_versao():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conexao:
+        conexao.execute(text("CREATE TABLE reservas (id INTEGER PRIMARY KEY, sala_id INTEGER NOT NULL, "
+                             "data_reserva DATE NOT NULL, motivo VARCHAR(100) NOT NULL)"))
+        conexao.execute(text("INSERT INTO reservas VALUES (1, 1, '2026-04-06', 'Aula')"))
+        assert migracoes.migrar(conexao) == ["reservas.serie_id", "reservas.versao", "ix_reservas_serie_id"]
+        assert conexao.execute(text("SELECT serie_id, versao FROM reservas")).one() == (None, 1)
+        assert migracoes.migrar(conexao) == []
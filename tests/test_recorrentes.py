@@ -0,0 +1,74 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app import config, crud, schemas
+
+
+@pytest.fixture
+def recorrencia(dados):
+    """Corpo de uma série semanal às segundas de abril de 2026."""
+    def montar(**campos):
+        return {**dados, "data_inicio": "2026-04-06", "data_fim": "2026-04-27", "hora_inicio": "08:00:00",
+                "hora_fim": "10:00:00", "motivo": "Disciplina", **campos}
+    return montar
+
+
+def test_expansao_semanal_e_quinzenal_sem_as_excecoes():
+    base = dict(sala_id=1, coordenador_id=1, data_inicio=date(2026, 4, 6), data_fim=date(2026, 5, 4),
+                hora_inicio="08:00", hora_fim="10:00", motivo="Aula")
+    semanal = schemas.ReservaRecorrenteCreate(**base, excecoes=[date(2026, 4, 20)])
+    assert crud.contar_ocorrencias(semanal) == 5
+    assert crud.expandir_recorrencia(semanal) == [date(2026, 4, 6), date(2026, 4, 13), date(2026, 4, 27), date(2026, 5, 4)]
+    quinzenal = schemas.ReservaRecorrenteCreate(**base, frequencia="quinzenal")
+    assert crud.expandir_recorrencia(quinzenal) == [date(2026, 4, 6), date(2026, 4, 20), date(2026, 5, 4)]
+
+
+def test_expansao_acima_do_limite_recusada(monkeypatch):
+    monkeypatch.setattr(config, "RECORRENCIA_MAX_OCORRENCIAS", 3)
+    recorrencia = schemas.ReservaRecorrenteCreate(sala_id=1, coordenador_id=1, data_inicio=date(2026, 4, 6),
+                                                  data_fim=date(2026, 4, 27), hora_inicio="08:00", hora_fim="10:00",
+                                                  motivo="Aula", excecoes=[date(2026, 4, 13)])
+    with pytest.raises(HTTPException) as erro:
+        crud.expandir_recorrencia(recorrencia)
+    assert erro.value.status_code == 400
+
+
+def test_serie_criada_com_o_mesmo_serie_id(client, recorrencia, contar_reservas):
+    resposta = client.post("/reservas/recorrentes", json=recorrencia(excecoes=["2026-04-20"]))
+    assert resposta.status_code == 200
+    serie = resposta.json()
+    assert [reserva["data_reserva"] for reserva in serie["reservas"]] == ["2026-04-06", "2026-04-13", "2026-04-27"]
+    assert {reserva["serie_id"] for reserva in serie["reservas"]} == {serie["serie_id"]}
+    assert client.get(f"/reservas/series/{serie['serie_id']}").json() == serie
+    assert contar_reservas() == 3
+
+
+def test_serie_com_conflito_lista_as_datas_e_nao_cria_nada(client, reserva, recorrencia, contar_reservas):
+    client.post("/reservas/", json=reserva(data_reserva="2026-04-13", hora_inicio="09:00:00", hora_fim="11:00:00"))
+    resposta = client.post("/reservas/recorrentes", json=recorrencia())
+    assert resposta.status_code == 400
+    assert "2026-04-13" in resposta.json()["detail"]
+    assert contar_reservas() == 1
+
+
+def test_serie_sem_datas_recusada(client, recorrencia):
+    resposta = client.post("/reservas/recorrentes", json=recorrencia(data_fim="2026-04-06", excecoes=["2026-04-06"]))
+    assert resposta.status_code == 400
+
+
+def test_serie_movida_a_partir_de_uma_data(client, recorrencia):
+    serie = client.post("/reservas/recorrentes", json=recorrencia()).json()
+    resposta = client.put(f"/reservas/series/{serie['serie_id']}",
+                          json={"hora_inicio": "14:00:00", "hora_fim": "16:00:00", "a_partir_de": "2026-04-20"})
+    assert resposta.status_code == 200
+    horarios = {reserva["data_reserva"]: reserva["hora_inicio"] for reserva in resposta.json()["reservas"]}
+    assert horarios == {"2026-04-06": "08:00:00", "2026-04-13": "08:00:00", "2026-04-20": "14:00:00", "2026-04-27": "14:00:00"}
+
+
+def test_serie_cancelada_a_partir_de_uma_data(client, recorrencia, contar_reservas):
+    serie = client.post("/reservas/recorrentes", json=recorrencia()).json()
+    resposta = client.delete(f"/reservas/series/{serie['serie_id']}", params={"a_partir_de": "2026-04-20"})
+    assert resposta.status_code == 200
+    assert contar_reservas() == 2
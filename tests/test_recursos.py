@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from app import config, models, recursos
+from app.cache import CacheLRU, cache
+
+
+@pytest.fixture(autouse=True)
+def estado_limpo(monkeypatch):
+    monkeypatch.setattr(cache, "backend", CacheLRU())
+    monkeypatch.setattr(recursos, "mapa_recursos", recursos.MapaRecursos())
+    monkeypatch.setattr("app.routes.salas.mapa_recursos", recursos.mapa_recursos)
+
+
+@pytest.fixture(params=[True, False], ids=["mapa", "sql"])
+def mapa_ativo(request, monkeypatch):
+    monkeypatch.setattr(config, "RECURSOS_MAPA_ATIVO", request.param)
+    return request.param
+
+
+@pytest.fixture
+def salas(client, dados):
+    """A sala de `dados` (projetor, 40 lugares) e mais três no mesmo bloco ou num segundo bloco."""
+    bloco_a = client.get(f"/salas/{dados['sala_id']}").json()["bloco_id"]
+    curso = client.get("/cursos/").json()[0]["id"]
+    bloco_b = client.post("/blocos/", json={"nome": "B", "curso_id": curso}).json()["id"]
+
+    def criar(bloco, numero, capacidade, texto):
+        return client.post("/salas/", json={"bloco_id": bloco, "numero": numero, "capacidade": capacidade,
+                                            "recursos": texto}).json()["id"]
+
+    return {"projetor": dados["sala_id"],
+            "lab": criar(bloco_a, 2, 20, "Projetor; Ar  Condicionado, lab"),
+            "auditorio": criar(bloco_b, 1, 200, "projetor, ar condicionado"),
+            "vazia": criar(bloco_b, 2, 10, ""),
+            "bloco_b": bloco_b}
+
+
+def ids(client, **parametros):
+    resposta = client.get("/salas/", params=parametros)
+    assert resposta.status_code == 200
+    return [sala["id"] for sala in resposta.json()]
+
+
+def test_normalizar():
+    assert recursos.normalizar(" Projetor ;ar   condicionado,,PROJETOR ") == ["projetor", "ar condicionado"]
+    assert recursos.normalizar(None) == []
+
+
+def test_filtro_por_etiquetas(client, salas, mapa_ativo):
+    assert ids(client, recursos="projetor") == [salas["projetor"], salas["lab"], salas["auditorio"]]
+    assert ids(client, recursos="Ar Condicionado, projetor") == [salas["lab"], salas["auditorio"]]
+    assert ids(client, recursos="inexistente") == []
+
+
+def test_filtro_por_capacidade_e_bloco(client, salas, mapa_ativo):
+    assert ids(client, capacidade_min=30) == [salas["projetor"], salas["auditorio"]]
+    assert ids(client, capacidade_min=201) == []
+    assert ids(client, bloco_id=salas["bloco_b"]) == [salas["auditorio"], salas["vazia"]]
+    assert ids(client, recursos="projetor", bloco_id=salas["bloco_b"], capacidade_min=100) == [salas["auditorio"]]
+
+
+def test_filtro_paginado(client, salas, mapa_ativo):
+    primeira = client.get("/salas/", params={"recursos": "projetor", "limite": 2})
+    assert [sala["id"] for sala in primeira.json()] == [salas["projetor"], salas["lab"]]
+    cursor = primeira.headers["x-proximo-cursor"]
+    assert ids(client, recursos="projetor", limite=2, apos_id=cursor) == [salas["auditorio"]]
+
+
+def test_alteracao_do_texto_atualiza_o_filtro(client, salas, mapa_ativo):
+    assert ids(client, recursos="lab") == [salas["lab"]]
+    client.patch(f"/salas/{salas['vazia']}", json={"recursos": "lab"})
+    client.patch(f"/salas/{salas['lab']}", json={"recursos": "projetor"})
+    assert ids(client, recursos="lab") == [salas["vazia"]]
+
+
+def test_reconstruir_refaz_as_ligacoes(engine, salas):
+    with Session(engine) as db:
+        db.query(models.SalasRecursos).delete()
+        db.commit()
+        assert recursos.reconstruir(db) == {"salas": 4, "recursos": 3}
+        assert recursos.mapa_recursos.filtrar(db, ["lab"]) == [salas["lab"]]
+
+
+def test_mapa_lido_de_replica_nao_e_compartilhado(engine, salas):
+    with Session(engine) as db:
+        db.info["replica"] = True
+        assert recursos.mapa_recursos.filtrar(db, ["projetor"]) == [salas["projetor"], salas["lab"], salas["auditorio"]]
+    assert recursos.mapa_recursos._estado is None
+    with Session(engine) as db:
+        recursos.mapa_recursos.filtrar(db, ["projetor"])
+    assert recursos.mapa_recursos._estado is not None
@@ -0,0 +1,58 @@
+import itertools
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app import config, database
+from app.main import app
+
+
+@pytest.fixture
+def replica(engine, monkeypatch):
+    """Uma réplica vazia: o que é gravado no primário nunca chega a ela."""
+    replica = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.Base.metadata.create_all(replica)
+    monkeypatch.setattr(database, "URLS_REPLICAS", ["sqlite://"])
+    monkeypatch.setattr(database, "engines_replicas", [replica])
+    monkeypatch.setattr(database, "_proxima_replica", itertools.cycle([0]))
+    yield replica
+    replica.dispose()
+
+
+def test_escrita_mantem_o_cliente_no_primario(replica):
+    cliente = TestClient(app)
+    resposta = cliente.post("/cursos/", json={"nome": "Engenharia"})
+    assert database.COOKIE_ADERENCIA in resposta.cookies
+    curso_id = resposta.json()["id"]
+    assert cliente.get(f"/cursos/{curso_id}").status_code == 200
+    # Sem o cookie, a leitura vai para a réplica, que ainda não tem o curso.
+    assert TestClient(app).get(f"/cursos/{curso_id}").status_code == 404
+
+
+def test_cookie_vencido_ou_invalido_volta_para_a_replica(replica):
+    curso_id = TestClient(app).post("/cursos/", json={"nome": "Engenharia"}).json()["id"]
+    for valor in (f"{time.time() - 1:.3f}", "abc"):
+        cliente = TestClient(app, cookies={database.COOKIE_ADERENCIA: valor})
+        assert cliente.get(f"/cursos/{curso_id}").status_code == 404
+
+
+def test_escrita_recusada_nao_grava_o_cookie(replica):
+    resposta = TestClient(app).patch("/reservas/999", json={"motivo": "Prova"})
+    assert resposta.status_code == 404
+    assert database.COOKIE_ADERENCIA not in resposta.cookies
+
+
+def test_cookie_dura_o_tempo_configurado(replica, monkeypatch):
+    monkeypatch.setattr(config, "REPLICA_ADERENCIA_SEGUNDOS", 30)
+    antes = time.time()
+    resposta = TestClient(app).post("/cursos/", json={"nome": "Engenharia"})
+    assert antes + 29 < float(resposta.cookies[database.COOKIE_ADERENCIA]) <= time.time() + 30
+
+
+def test_sem_replicas_nao_ha_cookie(client):
+    resposta = client.post("/cursos/", json={"nome": "Engenharia"})
+    assert database.COOKIE_ADERENCIA not in resposta.cookies
+    assert client.get(f"/cursos/{resposta.json()['id']}").status_code == 200
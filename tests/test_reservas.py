@@ -0,0 +1,80 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+
+ERRO_SOBREPOSICAO = "Erro: A sala já está reservada para esse horário!"
+
+
+def nova_reserva(dados, inicio: time, fim: time) -> models.Reservas:
+    return models.Reservas(**dados, data_reserva=date(2026, 4, 6), hora_inicio=inicio, hora_fim=fim, motivo="Aula")
+
+
+# Triggers de sobreposição (SQLite)
+
+def test_trigger_barra_insert_sobreposto(engine, dados):
+    with Session(engine) as db:
+        db.add(nova_reserva(dados, time(8), time(10)))
+        db.commit()
+        db.add(nova_reserva(dados, time(9), time(11)))
+        with pytest.raises(IntegrityError, match=models.RESTRICAO_SOBREPOSICAO):
+            db.commit()
+
+
+def test_trigger_barra_update_sobreposto(engine, dados):
+    with Session(engine) as db:
+        db.add_all([nova_reserva(dados, time(8), time(9)), nova_reserva(dados, time(10), time(11))])
+        db.commit()
+        segunda = db.scalars(select(models.Reservas).where(models.Reservas.hora_inicio == time(10))).one()
+        segunda.hora_inicio = time(8, 30)
+        with pytest.raises(IntegrityError, match=models.RESTRICAO_SOBREPOSICAO):
+            db.commit()
+
+
+def test_trigger_permite_update_da_propria_reserva(engine, dados):
+    with Session(engine) as db:
+        reserva = nova_reserva(dados, time(8), time(9))
+        db.add(reserva)
+        db.commit()
+        reserva.hora_fim = time(9, 30)
+        db.commit()
+        assert reserva.hora_fim == time(9, 30)
+
+
+def test_post_sobreposto_retorna_400(client, reserva, contar_reservas):
+    assert client.post("/reservas/", json=reserva()).status_code == 200
+    resposta = client.post("/reservas/", json=reserva(hora_inicio="08:30:00", hora_fim="09:30:00"))
+    assert resposta.status_code == 400
+    assert resposta.json()["detail"] == ERRO_SOBREPOSICAO
+    assert contar_reservas() == 1
+
+
+def test_put_sobreposto_retorna_400(client, reserva):
+    client.post("/reservas/", json=reserva())
+    segunda = client.post("/reservas/", json=reserva(hora_inicio="10:00:00", hora_fim="11:00:00")).json()
+    resposta = client.put(f"/reservas/{segunda['id']}", json=reserva(hora_inicio="08:30:00", hora_fim="10:30:00"))
+    assert resposta.status_code == 400
+    assert resposta.json()["detail"] == ERRO_SOBREPOSICAO
+    assert client.get(f"/reservas/{segunda['id']}").json()["hora_inicio"] == "10:00:00"
+
+
+def test_patch_sobreposto_retorna_400(client, reserva):
+    client.post("/reservas/", json=reserva())
+    segunda = client.post("/reservas/", json=reserva(hora_inicio="10:00:00", hora_fim="11:00:00")).json()
+    resposta = client.patch(f"/reservas/{segunda['id']}", json={"hora_inicio": "08:30:00"})
+    assert resposta.status_code == 400
+    assert resposta.json()["detail"] == ERRO_SOBREPOSICAO
+
+
+# Ordem dos horários
+
+def test_horario_invertido_recusado(client, reserva, contar_reservas):
+    resposta = client.post("/reservas/", json=reserva(hora_inicio="10:00:00", hora_fim="09:00:00"))
+    assert resposta.status_code == 422
+    criada = client.post("/reservas/", json=reserva()).json()
+    assert client.patch(f"/reservas/{criada['id']}", json={"hora_fim": "07:00:00"}).status_code == 400
+    assert contar_reservas() == 1
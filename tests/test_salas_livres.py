@@ -0,0 +1,44 @@
+import pytest
+
+
+@pytest.fixture
+def salas(client, dados):
+    """Além da sala de `dados` (40 lugares), um laboratório exclusivo de outro curso e uma sala de 20 lugares."""
+    sala = client.get(f"/salas/{dados['sala_id']}").json()
+    outro_curso = client.post("/cursos/", json={"nome": "Direito"}).json()
+    bloco = client.post("/blocos/", json={"nome": "B", "curso_id": outro_curso["id"]}).json()
+    laboratorio = client.post("/salas/", json={"bloco_id": bloco["id"], "numero": 1, "capacidade": 30,
+                                               "recursos": "lab", "exclusivo": True}).json()
+    pequena = client.post("/salas/", json={"bloco_id": sala["bloco_id"], "numero": 2, "capacidade": 20,
+                                           "recursos": "", "exclusivo": False}).json()
+    coordenador = client.post("/coordenadores/", json={"curso_id": outro_curso["id"], "nome": "Bia",
+                                                       "email": "bia@x", "senha": "abc"}).json()
+    return {"sala": sala["id"], "laboratorio": laboratorio["id"], "pequena": pequena["id"],
+            "coordenador_laboratorio": coordenador["id"]}
+
+
+def livres(client, **parametros):
+    parametros = {"data": "2026-04-06", "hora_inicio": "08:00:00", "hora_fim": "09:00:00", **parametros}
+    resposta = client.get("/salas/livres", params=parametros)
+    assert resposta.status_code == 200
+    return [sala["id"] for sala in resposta.json()]
+
+
+def test_sem_coordenador_exclui_salas_exclusivas(client, salas):
+    assert livres(client) == [salas["pequena"], salas["sala"]]
+
+
+def test_coordenador_ve_as_exclusivas_do_seu_curso(client, dados, salas):
+    assert livres(client, coordenador_id=salas["coordenador_laboratorio"]) == [salas["pequena"], salas["laboratorio"], salas["sala"]]
+    assert salas["laboratorio"] not in livres(client, coordenador_id=dados["coordenador_id"])
+
+
+def test_exclui_salas_ocupadas_e_filtra_capacidade(client, reserva, salas):
+    client.post("/reservas/", json=reserva(hora_inicio="08:30:00", hora_fim="10:00:00"))
+    assert livres(client) == [salas["pequena"]]
+    assert livres(client, hora_inicio="10:00:00", hora_fim="11:00:00", capacidade_min=25) == [salas["sala"]]
+
+
+def test_horario_invertido_retorna_400(client, salas):
+    resposta = client.get("/salas/livres", params={"data": "2026-04-06", "hora_inicio": "09:00:00", "hora_fim": "09:00:00"})
+    assert resposta.status_code == 400